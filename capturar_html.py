@@ -5,6 +5,7 @@ Script para capturar el HTML completo de Wallapop en 3 puntos:
   3. Detalle de un item
 
 Guarda los HTML en html_capturas/ para análisis posterior de selectores.
+Cada carpeta sirve también de corpus para el modo replay (medir_scraper.py).
 """
 
 import sys
@@ -3,6 +3,9 @@ import logging
 import uvicorn
 
 from src.database import init_db
+from src.config import Config
+from src.driver import get_shared_pool
+from src.processes import start_reaper
 from src.scheduler import run_scheduler
 from src.api import app
 
@@ -16,6 +19,12 @@ def main():
     # Inicializar la base de datos
     init_db()
 
+    # Precalentar los Chromes del pool para que el primer scrape no espere
+    get_shared_pool().prewarm()
+
+    # Limpiar periódicamente procesos de Chrome de drivers perdidos
+    start_reaper(Config.REAPER_INTERVAL)
+
     # Lanzar scheduler en un thread daemon
     scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
     scheduler_thread.start()
@@ -0,0 +1,87 @@
+"""
+Script para medir el efecto del bloqueo de recursos en la carga de páginas.
+
+Carga una búsqueda y el detalle de su primer item con y sin el perfil de
+bloqueo de cada tipo de página, y muestra tiempo de carga, nº de requests
+y bytes transferidos (media de N repeticiones). Compara también el HTML
+que viaja por WebDriver con page_source frente a la captura acotada.
+
+Uso: python medir_carga.py "macbook" [repeticiones]
+"""
+
+import sys
+
+from src.driver import init_driver
+from src.config import Config
+from src.pages import HomePage, SearchResultsPage, ItemDetailPage
+from src.processes import quit_driver
+from src.resource_blocking import set_resource_blocking, page_load_metrics
+
+
+def medir(driver, url, perfil, repeticiones):
+    """Carga la URL `repeticiones` veces con el perfil dado y devuelve las medias."""
+    set_resource_blocking(driver, perfil)
+    muestras = []
+    for _ in range(repeticiones):
+        driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+        driver.get(url)
+        muestras.append(page_load_metrics(driver))
+
+    def media(clave):
+        valores = [m[clave] for m in muestras if m.get(clave) is not None]
+        return sum(valores) / len(valores) if valores else 0
+
+    return {clave: media(clave) for clave in ("load_ms", "dom_ready_ms", "requests", "bytes")}
+
+
+def imprimir(pagina, perfil, m):
+    print(f"  {pagina:<8} {perfil or 'sin bloqueo':<12} "
+          f"load={m['load_ms']:>7.0f}ms  dom={m['dom_ready_ms']:>7.0f}ms  "
+          f"requests={m['requests']:>5.0f}  bytes={m['bytes'] / 1024:>8.0f}KB")
+
+
+def comparar(query, repeticiones):
+    driver = None
+    try:
+        print("Inicializando driver...")
+        # Carga completa: con "eager" driver.get() vuelve en DOMContentLoaded y
+        # loadEventEnd y los bytes se leerían antes de que termine la página
+        driver = init_driver(headless=True, page_load_strategy="normal")
+        driver.get(Config.BASE_URL)
+        home = HomePage(driver, Config.TIMEOUT_DEFAULT)
+        home.accept_cookies()
+        home.search(query)
+
+        url_busqueda = driver.current_url
+        items = SearchResultsPage(driver, Config.TIMEOUT_DEFAULT).extract_items(max_items=1)
+
+        paginas = [("search", url_busqueda)]
+        if items:
+            paginas.append(("detail", items[0]['url']))
+
+        print(f"\nMedias de {repeticiones} cargas:")
+        for tipo, url in paginas:
+            for perfil in (None, tipo):
+                imprimir(tipo, perfil, medir(driver, url, perfil, repeticiones))
+
+        print("\nHTML transferido por WebDriver:")
+        clases = {"search": SearchResultsPage, "detail": ItemDetailPage}
+        for tipo, url in paginas:
+            page = clases[tipo](driver, Config.TIMEOUT_DEFAULT)
+            page.wait_until_ready(page.navigate(url))
+            completo = len(driver.page_source)
+            acotado = len(page.get_scoped_html() or "")
+            print(f"  {tipo:<8} page_source={completo / 1024:>8.0f}KB  acotado={acotado / 1024:>8.0f}KB")
+
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        if driver:
+            quit_driver(driver)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print('Uso: python medir_carga.py "búsqueda" [repeticiones]')
+    else:
+        comparar(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 3)
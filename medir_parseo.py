@@ -0,0 +1,180 @@
+"""
+Benchmark del parseo de detalles fuera del proceso principal.
+
+Ejecuta WallapopScraper.run en modo replay (src.replay, sin red ni
+Chrome) parseando los detalles en el thread del driver (0 procesos) y en
+un ParsePool con N procesos, y mientras tanto lanza peticiones a la API
+de FastAPI (src.api.app) desde otro thread del mismo proceso, como en
+main_server.py. Por cada modo informa de:
+  - tiempo ocioso del driver: huecos entre el fin de una navegación de
+    detalle y el inicio de la siguiente (espera, captura y, sin pool,
+    parseo), total y por item;
+  - latencia de la API durante el scrape: p50, p99 y máxima;
+  - tiempo total del run() e items por segundo.
+
+El corpus es el mismo que el de medir_scraper.py (carpeta de
+capturar_html.py, la captura más reciente de html_capturas/ o los
+fixtures de tests/).
+
+Uso: python medir_parseo.py [carpeta] [-n repeticiones] [--procesos N]
+         [--latencia s] [--http] [--max-items N] [--endpoint ruta]
+         [--parser auto|lxml|html.parser]
+"""
+
+import time
+import logging
+import argparse
+import tempfile
+import threading
+
+import src.database as database
+from src.config import Config
+from src.driver import DriverPool
+from src.parse_pool import ParsePool
+from src.pages.item_detail_page import parse_detail_html
+from src.rate_limiter import RateLimiter
+from src.replay import ReplayDriver, ReplayAdapter
+from src.scraper import WallapopScraper
+from medir_scraper import cargar_corpus
+
+
+class DriverCronometrado(ReplayDriver):
+    """ReplayDriver que apunta (inicio, fin) de cada navegación con get()."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.navegaciones = []
+
+    def get(self, url):
+        inicio = time.perf_counter()
+        super().get(url)
+        self.navegaciones.append((url, inicio, time.perf_counter()))
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def carga_api(cliente, endpoint, parar, latencias):
+    """Pide el endpoint en bucle hasta que se active `parar`."""
+    while not parar.is_set():
+        inicio = time.perf_counter()
+        cliente.get(endpoint)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        time.sleep(0.005)
+
+
+def tiempo_ocioso(navegaciones):
+    """Suma de los huecos entre navegaciones de detalle consecutivas."""
+    detalle = [(inicio, fin) for url, inicio, fin in navegaciones if "/item/" in url]
+    return sum(max(0.0, siguiente[0] - actual[1]) for actual, siguiente in zip(detalle, detalle[1:])), len(detalle)
+
+
+def medir_run(corpus, args, procesos, cliente):
+    pool_parseo = ParsePool(processes=procesos)
+    if procesos:
+        # Arrancar los workers antes de medir (spawn tarda en importar los módulos)
+        for future in [pool_parseo.submit(parse_detail_html, "<html></html>") for _ in range(procesos)]:
+            future.result()
+
+    drivers = []
+
+    def fabrica():
+        driver = DriverCronometrado(corpus, latency=args.latencia)
+        drivers.append(driver)
+        return driver
+
+    pool = DriverPool(size=1, headless=True, factory=fabrica, max_age=0, max_uses=0)
+    scraper = WallapopScraper(
+        headless=True,
+        http_details=args.http,
+        pool=pool,
+        detail_tabs=1,
+        incremental=False,
+        rate_limiter=RateLimiter(rate=1e6, burst=1e6, jitter=0),
+        http_adapter=ReplayAdapter(corpus, latency=args.latencia),
+        parse_pool=pool_parseo,
+    )
+
+    latencias = []
+    parar = threading.Event()
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_DIR = tmp
+        Config.OUTPUT_DIR = tmp
+        Config.LOG_DIR = tmp
+        database.init_db()
+        carga = threading.Thread(target=carga_api, args=(cliente, args.endpoint, parar, latencias), daemon=True)
+        carga.start()
+        inicio = time.perf_counter()
+        try:
+            scraper.run("replay", max_items=args.max_items)
+        finally:
+            total = time.perf_counter() - inicio
+            parar.set()
+            carga.join()
+            pool.close()
+            pool_parseo.close()
+        items = database.get_items(limit=1)["total"]
+
+    navegaciones = [n for driver in drivers for n in driver.navegaciones]
+    ocioso, detalles = tiempo_ocioso(navegaciones)
+    return {
+        'total': total,
+        'items': items,
+        'items_s': items / total if total else 0.0,
+        'ocioso': ocioso,
+        'ocioso_item_ms': ocioso / max(1, detalles - 1) * 1000,
+        'detalles_selenium': detalles,
+        'p50': percentil(latencias, 50),
+        'p99': percentil(latencias, 99),
+        'max': max(latencias, default=0.0),
+        'peticiones': len(latencias),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parseo en el driver frente a un pool de procesos")
+    parser.add_argument("carpeta", nargs="?", help="Carpeta de capturas (por defecto la más reciente)")
+    parser.add_argument("-n", "--repeticiones", type=int, default=3)
+    parser.add_argument("--procesos", type=int, default=Config.PARSE_PROCESSES or 2,
+                        help="Procesos del pool a comparar con 0")
+    parser.add_argument("--latencia", type=float, default=0.05, help="Segundos por página (default 0.05)")
+    parser.add_argument("--http", action="store_true", help="Detalle por HTTP (por defecto solo Selenium)")
+    parser.add_argument("--max-items", type=int, default=None)
+    parser.add_argument("--endpoint", default="/api/items?limit=20", help="Ruta de la API a cargar")
+    parser.add_argument("--parser", default=Config.HTML_PARSER, help="Backend HTML (ver src.parsing)")
+    args = parser.parse_args()
+    Config.HTML_PARSER = args.parser
+
+    # Los logs del scraper taparían el informe
+    logging.disable(logging.INFO)
+
+    corpus, origen = cargar_corpus(args.carpeta)
+    print(f"Corpus: {origen} ({len(corpus.details)} detalles)")
+    print(f"Latencia: {args.latencia}s/página | detalle: {'HTTP' if args.http else 'Selenium'}"
+          f" | parser: {args.parser} | API: {args.endpoint}\n")
+
+    # Aquí y no arriba: los workers (spawn) reimportan este módulo y no necesitan la API
+    from fastapi.testclient import TestClient
+    from src.api import app
+    cliente = TestClient(app)
+    for procesos in (0, args.procesos):
+        print(f"Parseo {'en el thread del driver' if not procesos else f'en {procesos} procesos'}:")
+        resultados = []
+        for i in range(1, args.repeticiones + 1):
+            r = medir_run(corpus, args, procesos, cliente)
+            resultados.append(r)
+            print(f"  [{i}] total={r['total']:.2f}s  {r['items_s']:.1f} items/s  "
+                  f"driver ocioso={r['ocioso']:.2f}s ({r['ocioso_item_ms']:.1f}ms/item, "
+                  f"{r['detalles_selenium']} detalles)  API p50={r['p50']:.1f}ms p99={r['p99']:.1f}ms "
+                  f"max={r['max']:.1f}ms ({r['peticiones']} peticiones)")
+        n = len(resultados)
+        print(f"  Media: driver ocioso={sum(r['ocioso'] for r in resultados) / n:.2f}s  "
+              f"API p99={sum(r['p99'] for r in resultados) / n:.1f}ms\n")
+
+
+if __name__ == "__main__":
+    main()
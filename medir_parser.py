@@ -0,0 +1,79 @@
+"""
+Script para medir el tiempo de parseo por página con cada backend HTML.
+
+Para cada fichero HTML (por defecto los fixtures de tests/ y, si existen,
+las capturas de html_capturas/) mide la media de:
+  - parse: construir el árbol con el backend.
+  - campos: extraer título/precio/ubicación/descripción y cards del listado.
+Como referencia incluye la versión original: BeautifulSoup + html.parser
+y búsqueda por patrón de clase con una lambda por llamada.
+
+Uso: python medir_parser.py [fichero.html ...] [-n repeticiones]
+"""
+
+import sys
+import glob
+import time
+from unittest.mock import MagicMock
+
+from bs4 import BeautifulSoup
+
+from src.parsing import parse_html, available_backends, find_all, select_first_by_class
+from src.pages import ItemDetailPage, SearchResultsPage
+
+CAMPOS = ["title", "price", "location", "description"]
+PATRONES = ["item-detail-price", "price", "ItemCard__title", "location", "description"]
+
+
+def buscar_con_lambda(parent, pattern):
+    """Búsqueda por patrón de clase tal como se hacía antes (una lambda por llamada)."""
+    return parent.find(
+        lambda tag: tag.name and 'class' in tag.attrs
+        and any(pattern in c for c in tag['class'])
+    )
+
+
+def cronometrar(funcion, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+def medir_fichero(ruta, repeticiones):
+    with open(ruta, "r", encoding="utf-8") as f:
+        html = f.read()
+    detalle = ItemDetailPage(MagicMock(), timeout=1)
+    listado = SearchResultsPage(MagicMock(), timeout=1)
+
+    print(f"\n{ruta} ({len(html) / 1024:.0f}KB)")
+
+    # Referencia: árbol BeautifulSoup y una lambda por búsqueda
+    soup = BeautifulSoup(html, 'html.parser')
+    parse_ms = cronometrar(lambda: BeautifulSoup(html, 'html.parser'), repeticiones)
+    patrones_ms = cronometrar(lambda: [buscar_con_lambda(soup, p) for p in PATRONES], repeticiones)
+    print(f"  {'original':<12} parse={parse_ms:>8.2f}ms  patrones={patrones_ms:>7.2f}ms")
+
+    for backend in available_backends():
+        arbol = parse_html(html, backend)
+        parse_ms = cronometrar(lambda: parse_html(html, backend), repeticiones)
+        patrones_ms = cronometrar(lambda: [select_first_by_class(arbol, p) for p in PATRONES], repeticiones)
+        campos_ms = cronometrar(lambda: (
+            detalle.extract_fields(arbol, CAMPOS),
+            find_all(arbol, 'a', href=listado.CARD_HREF_RE),
+        ), repeticiones)
+        print(f"  {backend:<12} parse={parse_ms:>8.2f}ms  patrones={patrones_ms:>7.2f}ms  campos={campos_ms:>7.2f}ms")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    repeticiones = 20
+    if "-n" in args:
+        i = args.index("-n")
+        repeticiones = int(args[i + 1])
+        del args[i:i + 2]
+
+    ficheros = args or sorted(glob.glob("tests/fixtures/*.html") + glob.glob("html_capturas/*/*.html"))
+    print(f"Backends disponibles: {', '.join(available_backends())} | media de {repeticiones} repeticiones")
+    for ruta in ficheros:
+        medir_fichero(ruta, repeticiones)
@@ -0,0 +1,171 @@
+"""
+Benchmark del scraper completo en modo replay (sin red ni Chrome).
+
+Ejecuta WallapopScraper.run de principio a fin contra un corpus de HTML
+capturado (src.replay) con una latencia simulada fija y, por cada
+repetición, informa de:
+  - tiempo total de run() y por fase (arranque, apertura y listado,
+    detalle, guardado), a partir de los eventos de progreso;
+  - items por segundo;
+  - pico de memoria del proceso (RSS) y, con --memoria-python, pico del
+    heap de Python (tracemalloc, más lento).
+
+Cada repetición usa una DB y una carpeta de salida temporales, así que
+todas parten del mismo estado.
+
+El corpus es una carpeta de capturar_html.py (01_inicio.html,
+02_busqueda.html, 03_detalle*.html y, si existe, detalles/<slug>.html).
+Por defecto la captura más reciente de html_capturas/ o, si no hay, los
+fixtures de tests/.
+
+Uso: python medir_scraper.py [carpeta] [-n repeticiones] [--latencia s]
+         [--latencia-scroll s] [--cards-por-scroll N] [--selenium]
+         [--pestanas K] [--max-items N] [--memoria-python]
+"""
+
+import os
+import sys
+import glob
+import time
+import logging
+import argparse
+import resource
+import tempfile
+import tracemalloc
+
+import src.database as database
+from src.config import Config
+from src.driver import DriverPool
+from src.rate_limiter import RateLimiter
+from src.replay import ReplayCorpus, ReplayDriver, ReplayAdapter
+from src.scraper import WallapopScraper
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests", "fixtures")
+
+# Fase -> (evento de inicio, evento de fin)
+FASES = [
+    ("arranque", "run", "start"),
+    ("listado", "start", "items_found"),
+    ("detalle", "items_found", "last_item"),
+    ("guardado", "last_item", "done"),
+]
+
+
+def cargar_corpus(carpeta):
+    if carpeta:
+        return ReplayCorpus.from_dir(carpeta), carpeta
+    capturas = sorted(glob.glob(os.path.join("html_capturas", "*", ReplayCorpus.SEARCH_FILE)))
+    if capturas:
+        carpeta = os.path.dirname(capturas[-1])
+        return ReplayCorpus.from_dir(carpeta), carpeta
+    corpus = ReplayCorpus.from_files(
+        os.path.join(FIXTURES, "search_results.html"),
+        sorted(glob.glob(os.path.join(FIXTURES, "item_detail*.html"))),
+    )
+    return corpus, FIXTURES
+
+
+def pico_rss_mb():
+    # ru_maxrss viene en KB en Linux y en bytes en macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+
+def medir_run(corpus, args):
+    """Ejecuta un run() completo y devuelve sus tiempos y contadores."""
+    marcas = {}
+    items = 0
+
+    def on_progress(event):
+        nonlocal items
+        ahora = time.perf_counter()
+        marcas.setdefault(event['type'], ahora)
+        if event['type'] == 'item_scraped':
+            items += 1
+            marcas['last_item'] = ahora
+
+    fabrica = lambda: ReplayDriver(
+        corpus, latency=args.latencia, scroll_latency=args.latencia_scroll, page_size=args.cards_por_scroll
+    )
+    pool = DriverPool(size=1, headless=True, factory=fabrica, max_age=0, max_uses=0)
+    scraper = WallapopScraper(
+        headless=True,
+        on_progress=on_progress,
+        http_details=not args.selenium,
+        pool=pool,
+        detail_tabs=args.pestanas,
+        incremental=False,
+        # Sin esperas de cortesía: se mide el scraper, no la política de ritmo
+        rate_limiter=RateLimiter(rate=1e6, burst=1e6, jitter=0),
+        http_adapter=ReplayAdapter(corpus, latency=args.latencia),
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_DIR = tmp
+        Config.OUTPUT_DIR = tmp
+        Config.LOG_DIR = tmp
+        if args.memoria_python:
+            tracemalloc.start()
+        marcas['run'] = inicio = time.perf_counter()
+        try:
+            scraper.run("replay", max_items=args.max_items)
+        finally:
+            total = time.perf_counter() - inicio
+            heap_mb = None
+            if args.memoria_python:
+                heap_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+                tracemalloc.stop()
+            pool.close()
+
+    fases = {}
+    for nombre, desde, hasta in FASES:
+        if desde in marcas and hasta in marcas:
+            fases[nombre] = marcas[hasta] - marcas[desde]
+    return {
+        'total': total,
+        'fases': fases,
+        'items': items,
+        'items_s': items / total if total else 0.0,
+        'rss_mb': pico_rss_mb(),
+        'heap_mb': heap_mb,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del scraper en modo replay")
+    parser.add_argument("carpeta", nargs="?", help="Carpeta de capturas (por defecto la más reciente)")
+    parser.add_argument("-n", "--repeticiones", type=int, default=3)
+    parser.add_argument("--latencia", type=float, default=0.2, help="Segundos por página (default 0.2)")
+    parser.add_argument("--latencia-scroll", type=float, default=None, help="Segundos por tanda de scroll")
+    parser.add_argument("--cards-por-scroll", type=int, default=20)
+    parser.add_argument("--selenium", action="store_true", help="Detalle solo por Selenium (sin HTTP)")
+    parser.add_argument("--pestanas", type=int, default=Config.DETAIL_TABS, help="Pestañas de detalle")
+    parser.add_argument("--max-items", type=int, default=None)
+    parser.add_argument("--memoria-python", action="store_true", help="Medir el heap con tracemalloc")
+    args = parser.parse_args()
+
+    # Los logs del scraper taparían el informe
+    logging.disable(logging.INFO)
+
+    corpus, origen = cargar_corpus(args.carpeta)
+    print(f"Corpus: {origen} ({len(corpus.details)} detalles)")
+    print(f"Latencia: {args.latencia}s/página | detalle: {'Selenium' if args.selenium else 'HTTP'}"
+          f" | pestañas: {args.pestanas}\n")
+
+    resultados = []
+    for i in range(1, args.repeticiones + 1):
+        r = medir_run(corpus, args)
+        resultados.append(r)
+        fases = "  ".join(f"{nombre}={r['fases'].get(nombre, 0):.2f}s" for nombre, _, _ in FASES)
+        heap = f"  heap={r['heap_mb']:.1f}MB" if r['heap_mb'] is not None else ""
+        print(f"[{i}] total={r['total']:.2f}s  {fases}  items={r['items']}  "
+              f"{r['items_s']:.2f} items/s  rss={r['rss_mb']:.0f}MB{heap}")
+
+    if len(resultados) > 1:
+        mejor = min(resultados, key=lambda r: r['total'])
+        media = sum(r['total'] for r in resultados) / len(resultados)
+        print(f"\nMedia: {media:.2f}s  Mejor: {mejor['total']:.2f}s ({mejor['items_s']:.2f} items/s)")
+
+
+if __name__ == "__main__":
+    main()
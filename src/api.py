@@ -6,11 +6,14 @@ import threading
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, StreamingResponse
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from typing import Optional
 
 from src.database import get_items, get_item_by_id, get_stats, get_opportunities
 from src.scraper import WallapopScraper
+from src.driver import get_shared_pool
+from src.rate_limiter import get_rate_limiter
+from src.search_filters import normalize_filters
 import src.events as ev
 
 app = FastAPI(title="Wallapop Scraper API")
@@ -59,11 +62,34 @@ def _parse_price_history(item):
 class SearchCreate(BaseModel):
     query: str
     interval_minutes: int = 60
+    filters: Optional[dict] = None
+
+    @field_validator("filters")
+    @classmethod
+    def _valid_filters(cls, value):
+        return normalize_filters(value)
 
 
 class ScrapeRequest(BaseModel):
     query: str
     max_items: Optional[int] = None
+    filters: Optional[dict] = None  # None = los guardados para esa búsqueda
+
+    @field_validator("filters")
+    @classmethod
+    def _valid_filters(cls, value):
+        return None if value is None else normalize_filters(value)
+
+
+def _stored_filters(query):
+    """Filtros guardados en searches.json para una query (o {})."""
+    for s in _load_searches()["searches"]:
+        if s["query"].lower() == query.lower():
+            try:
+                return normalize_filters(s.get("filters"))
+            except ValueError:
+                return {}
+    return {}
 
 
 # _active_scrapes y _scrape_events ahora viven en src.events
@@ -113,10 +139,13 @@ def add_search(search: SearchCreate):
         if s["query"].lower() == search.query.lower():
             raise HTTPException(status_code=409, detail="La búsqueda ya existe")
 
-    data["searches"].append({
+    entry = {
         "query": search.query,
         "interval_minutes": search.interval_minutes,
-    })
+    }
+    if search.filters:
+        entry["filters"] = search.filters
+    data["searches"].append(entry)
     _save_searches(data)
     return {"message": "Búsqueda añadida", "query": search.query}
 
@@ -145,12 +174,15 @@ def force_scrape(req: ScrapeRequest):
     if query in ev.active_scrapes():
         raise HTTPException(status_code=409, detail=f"Ya hay un scrape en curso para '{query}'")
 
+    filters = req.filters if req.filters is not None else _stored_filters(query)
     ev.start_scrape(query)
 
     def _run():
         try:
-            scraper = WallapopScraper(headless=True, on_progress=ev.make_callback(query))
-            scraper.run(query, max_items=req.max_items)
+            scraper = WallapopScraper(
+                headless=True, on_progress=ev.make_callback(query), pool=get_shared_pool()
+            )
+            scraper.run(query, max_items=req.max_items, filters=filters)
         except Exception as e:
             logging.error(f"Error en scrape forzado '{query}': {e}")
             ev.finish_scrape(query, {'type': 'error', 'message': str(e)})
@@ -204,6 +236,12 @@ def scrape_status():
     return {"active": ev.active_scrapes()}
 
 
+@app.get("/api/metrics/rate-limit")
+def rate_limit_metrics():
+    """Ritmo actual, tokens y esperas del rate limiter por host."""
+    return {"hosts": get_rate_limiter().metrics()}
+
+
 @app.get("/api/opportunities")
 def list_opportunities(
     query: Optional[str] = Query(None, description="Filtrar por query exacta"),
@@ -9,3 +9,86 @@ class Config:
 
     # Límites
     MAX_ITEMS = None  # Máximo número de elementos a scrapear (None para todos)
+
+    # Scraping incremental: solo se visitan detalles nuevos o cambiados
+    INCREMENTAL = True
+    DETAIL_MAX_AGE_DAYS = 7  # Re-visitar el detalle si es más antiguo que esto
+    EARLY_STOP_KNOWN = 10    # Parar el scroll tras N items conocidos seguidos (0 = nunca)
+
+    # Ir directamente a la URL de resultados con los filtros (sin home ni buscador)
+    DIRECT_SEARCH_URL = True
+    SEARCH_PATH = "/app/search"  # Ruta de resultados bajo BASE_URL
+
+    # Búsquedas que tocan a la vez en el scheduler: un lote en una sesión de Chrome,
+    # cada URL se enriquece una vez y se asocia a todas las búsquedas que la listan
+    BATCH_RUNS = True
+
+    # Guardado incremental y reanudación de ejecuciones cortadas
+    DB_BATCH_SIZE = 10              # Items por transacción al guardar
+    DB_FLUSH_SECONDS = 5.0          # Espera máxima de un item enriquecido antes de guardarse
+    RESUME_RUNS = True              # Reanudar desde los pendientes si la ejecución anterior se cortó
+    CHECKPOINT_MAX_AGE_HOURS = 24   # Pendientes más antiguos se descartan
+
+    # Leer el listado de las respuestas JSON de la API de búsqueda (log de rendimiento
+    # de Chrome); si no se captura nada se leen los cards del DOM
+    SEARCH_API_CAPTURE = True
+
+    # Estrategia de listado: "browser" (resultados en Chrome con scroll) o "api"
+    # (páginas JSON por HTTP con la sesión del navegador; si falla, "browser")
+    SEARCH_CLIENT = "browser"
+    SEARCH_API_URL = "https://api.wallapop.com/api/v3/search"
+    SEARCH_API_MAX_PAGES = 50       # Páginas máximas por búsqueda con "api"
+
+    # Presupuesto por ejecución: el detalle va por prioridad (nuevos, bajadas de precio,
+    # detalle más antiguo) y lo que no cabe se aplaza a la siguiente ejecución
+    RUN_TIME_BUDGET = None      # Segundos por ejecución (None = sin límite)
+    RUN_ITEM_BUDGET = None      # Detalles por ejecución (None = sin límite)
+
+    # Detalle vía HTTP (fallback a Selenium si falla)
+    HTTP_DETAILS = True
+    HTTP_TIMEOUT = 10
+
+    # Enriquecimiento concurrente
+    DETAIL_WORKERS = 4           # Threads del pool de detalle HTTP
+    MAX_REQUESTS_PER_HOST = 4    # Peticiones simultáneas máximas por host (global)
+    DETAIL_TABS = 1              # Pestañas para solapar detalles por Selenium (1 = desactivado)
+
+    # Estrategia de carga de Chrome: "normal", "eager" (DOMContentLoaded) o "none".
+    # Con eager/none cada Page Object espera solo a sus nodos de datos.
+    PAGE_LOAD_STRATEGY = "eager"
+
+    # Transferir y parsear solo los contenedores de datos de cada página, no todo el DOM
+    SCOPED_CAPTURE = True
+
+    # Parser HTML: "auto" (lxml si está instalado), "lxml" o "html.parser"
+    HTML_PARSER = "auto"
+
+    # Procesos para parsear los detalles fuera del thread de Chrome y del servidor
+    # (0 = parsear en el mismo thread)
+    PARSE_PROCESSES = 2
+
+    # Bloqueo de imágenes, fuentes, media y trackers vía CDP (perfil por tipo de página)
+    BLOCK_RESOURCES = True
+
+    # Rate limiter compartido (token bucket por host: Selenium + HTTP de todos los scrapes)
+    RATE_LIMIT_PER_HOST = 1.0    # Peticiones/s por host (ritmo máximo)
+    RATE_LIMIT_BURST = 2         # Peticiones seguidas sin esperar
+    RATE_LIMIT_MIN = 0.1         # Suelo del ritmo tras errores/captchas
+    RATE_LIMIT_JITTER = 0.5      # Fracción del intervalo añadida al azar a cada espera
+
+    # Perfiles de Chrome persistentes (cookies de consentimiento y caché entre ejecuciones)
+    PERSISTENT_PROFILE = True
+    PROFILE_DIR = "profiles"   # Un subdirectorio slot-N por Chrome simultáneo
+    PROFILE_SLOTS = 4          # Perfiles máximos; si están todos en uso se usa uno temporal
+
+    # Pool de drivers compartido (scheduler + API)
+    DRIVER_POOL_SIZE = 2      # Chromes calientes como máximo
+    DRIVER_MAX_AGE = 3600     # Segundos antes de reciclar un Chrome
+    DRIVER_MAX_USES = 50      # Préstamos (ejecuciones) antes de reciclar
+    REAPER_INTERVAL = 60      # Segundos entre barridos de procesos Chrome huérfanos
+
+    # Reciclado del driver durante un scrape (sustituye al reinicio cada N items)
+    DRIVER_MAX_RSS_MB = 1500        # RSS del árbol de Chrome que fuerza reinicio
+    DRIVER_MAX_NAVIGATIONS = 150    # Navegaciones Selenium antes de reiniciar
+    DRIVER_MAX_SESSION_AGE = 1800   # Segundos de vida del driver dentro de un scrape
+    DRIVER_MEMORY_SAMPLE_EVERY = 10 # Navegaciones Selenium entre medidas de RSS (lee /proc)
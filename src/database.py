@@ -1,8 +1,9 @@
 import os
 import json
 import sqlite3
+import time
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 
 DB_DIR = "data"
 DB_NAME = "wallapop.db"
@@ -21,8 +22,11 @@ def get_connection():
 
 
 def init_db():
-    """Crea la tabla items si no existe."""
+    """Crea las tablas (items, item_queries, checkpoints y aplazados) si no existen."""
     conn = get_connection()
+    new_links_table = not conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'item_queries'"
+    ).fetchone()
     conn.execute("""
         CREATE TABLE IF NOT EXISTS items (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -37,19 +41,76 @@ def init_db():
             price_history TEXT NOT NULL DEFAULT '[]'
         )
     """)
+    _ensure_column(conn, "items", "detail_fetched_at", "TEXT")
     conn.execute("""
         CREATE INDEX IF NOT EXISTS idx_items_query ON items(query)
     """)
     conn.execute("""
         CREATE INDEX IF NOT EXISTS idx_items_price ON items(price)
     """)
+    # Búsquedas que han listado cada item (un item puede salir en varias);
+    # items.query se queda con la primera que lo encontró
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS item_queries (
+            item_id INTEGER NOT NULL REFERENCES items(id),
+            query TEXT NOT NULL,
+            first_seen TEXT NOT NULL,
+            last_seen TEXT NOT NULL,
+            PRIMARY KEY (item_id, query)
+        )
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_item_queries_query ON item_queries(query)
+    """)
+    if new_links_table:
+        # DB anterior a item_queries: cada item pertenecía solo a items.query
+        conn.execute("""
+            INSERT OR IGNORE INTO item_queries (item_id, query, first_seen, last_seen)
+            SELECT id, query, first_seen, last_seen FROM items WHERE query IS NOT NULL
+        """)
+    # Items pendientes de detalle de la ejecución en curso de cada query
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS scrape_checkpoints (
+            query TEXT NOT NULL,
+            wallapop_url TEXT NOT NULL,
+            item TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            PRIMARY KEY (query, wallapop_url)
+        )
+    """)
+    # Items que no cupieron en el presupuesto de una ejecución (ver defer_items)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS deferred_items (
+            query TEXT NOT NULL,
+            wallapop_url TEXT NOT NULL,
+            item TEXT NOT NULL,
+            deferred_at TEXT NOT NULL,
+            PRIMARY KEY (query, wallapop_url)
+        )
+    """)
     conn.commit()
     conn.close()
     logging.info("Base de datos inicializada.")
 
 
+def _ensure_column(conn, table, column, decl):
+    """Añade una columna a una tabla existente si todavía no la tiene."""
+    columns = {row['name'] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+# Valores de descripción que indican que el detalle no se obtuvo
+MISSING_DESCRIPTIONS = (None, "", "No disponible", "pending")
+
+
 def parse_price(price_str):
-    """Convierte texto de precio ('12,50\u20ac', '1.200\u20ac') a float."""
+    """Convierte texto de precio ('12,50\u20ac', '1.200\u20ac') a float.
+
+    Los precios ya numéricos (listado leído de la API) se devuelven tal cual.
+    """
+    if isinstance(price_str, (int, float)) and not isinstance(price_str, bool):
+        return float(price_str)
     if not price_str or price_str == "No disponible":
         return None
     try:
@@ -61,6 +122,84 @@ def parse_price(price_str):
         return None
 
 
+_LINK_QUERY_SQL = """
+    INSERT INTO item_queries (item_id, query, first_seen, last_seen) VALUES (?, ?, ?, ?)
+    ON CONFLICT(item_id, query) DO UPDATE SET last_seen = excluded.last_seen
+"""
+
+
+def _queries(query):
+    """Lista de queries a partir de una query suelta o de varias."""
+    return [query] if isinstance(query, str) else list(dict.fromkeys(query))
+
+
+def _upsert(conn, item, query, now):
+    """Inserta o actualiza un item usando una conexión ya abierta (sin commit).
+
+    query puede ser una búsqueda o una lista de búsquedas: el item queda
+    asociado a todas en item_queries.
+    """
+    queries = _queries(query)
+    price = parse_price(item.get('price', ''))
+    detail_fetched_at = now if item.get('description') not in MISSING_DESCRIPTIONS else None
+
+    existing = conn.execute(
+        "SELECT id, price, price_history FROM items WHERE wallapop_url = ?",
+        (item['url'],)
+    ).fetchone()
+
+    if existing:
+        history = json.loads(existing['price_history'])
+        old_price = existing['price']
+
+        # Si el precio cambió, añadir al historial
+        if price is not None and old_price != price:
+            history.append({"price": price, "date": now})
+            logging.info(f"Precio actualizado: {old_price} -> {price} | {item.get('title', '')[:40]}")
+
+        conn.execute("""
+            UPDATE items SET
+                title = ?, price = ?, description = ?, location = ?,
+                last_seen = ?, price_history = ?,
+                detail_fetched_at = COALESCE(?, detail_fetched_at)
+            WHERE id = ?
+        """, (
+            item.get('title', 'No disponible'),
+            price,
+            item.get('description', 'No disponible'),
+            item.get('location', 'No disponible'),
+            now,
+            json.dumps(history),
+            detail_fetched_at,
+            existing['id']
+        ))
+        item_id = existing['id']
+    else:
+        initial_history = []
+        if price is not None:
+            initial_history.append({"price": price, "date": now})
+
+        cursor = conn.execute("""
+            INSERT INTO items (wallapop_url, title, price, description, location,
+                               query, first_seen, last_seen, price_history,
+                               detail_fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            item['url'],
+            item.get('title', 'No disponible'),
+            price,
+            item.get('description', 'No disponible'),
+            item.get('location', 'No disponible'),
+            queries[0],
+            now, now,
+            json.dumps(initial_history),
+            detail_fetched_at
+        ))
+        item_id = cursor.lastrowid
+
+    conn.executemany(_LINK_QUERY_SQL, [(item_id, q, now, now) for q in queries])
+
+
 def upsert_item(item, query):
     """Inserta o actualiza un item en la DB.
 
@@ -70,61 +209,11 @@ def upsert_item(item, query):
 
     Args:
         item: dict con keys url, title, price, description, location
-        query: string de búsqueda que encontró este item
+        query: string de búsqueda que encontró este item (o lista de búsquedas)
     """
     conn = get_connection()
     try:
-        now = datetime.now().isoformat()
-        price = parse_price(item.get('price', ''))
-
-        existing = conn.execute(
-            "SELECT id, price, price_history FROM items WHERE wallapop_url = ?",
-            (item['url'],)
-        ).fetchone()
-
-        if existing:
-            history = json.loads(existing['price_history'])
-            old_price = existing['price']
-
-            # Si el precio cambió, añadir al historial
-            if price is not None and old_price != price:
-                history.append({"price": price, "date": now})
-                logging.info(f"Precio actualizado: {old_price} -> {price} | {item.get('title', '')[:40]}")
-
-            conn.execute("""
-                UPDATE items SET
-                    title = ?, price = ?, description = ?, location = ?,
-                    last_seen = ?, price_history = ?
-                WHERE id = ?
-            """, (
-                item.get('title', 'No disponible'),
-                price,
-                item.get('description', 'No disponible'),
-                item.get('location', 'No disponible'),
-                now,
-                json.dumps(history),
-                existing['id']
-            ))
-        else:
-            initial_history = []
-            if price is not None:
-                initial_history.append({"price": price, "date": now})
-
-            conn.execute("""
-                INSERT INTO items (wallapop_url, title, price, description, location,
-                                   query, first_seen, last_seen, price_history)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                item['url'],
-                item.get('title', 'No disponible'),
-                price,
-                item.get('description', 'No disponible'),
-                item.get('location', 'No disponible'),
-                query,
-                now, now,
-                json.dumps(initial_history)
-            ))
-
+        _upsert(conn, item, query, datetime.now().isoformat())
         conn.commit()
     finally:
         conn.close()
@@ -144,6 +233,266 @@ def save_items_to_db(items, query):
     return saved
 
 
+class ItemWriter:
+    """Guarda items a medida que se enriquecen, en transacciones pequeñas.
+
+    Los items se acumulan y se escriben en una sola transacción cada
+    batch_size items o cada max_delay segundos, lo que llegue antes. Con
+    checkpoint, la misma transacción quita los items guardados de los
+    pendientes de la query, así que tras un corte solo queda por hacer lo
+    que no llegó a la DB. Los items aplazados (deferred_items) que se
+    guardan dejan de estar aplazados en esa misma transacción.
+
+    Args:
+        query: Búsqueda a la que pertenecen los items.
+        batch_size: Items por transacción.
+        max_delay: Segundos máximos que un item espera en memoria.
+        checkpoint: Marcar los items guardados como hechos en scrape_checkpoints.
+        queries_by_url: Dict url -> búsquedas que listaron el item (ejecución
+            por lotes); los items que no estén se asocian solo a query.
+    """
+
+    def __init__(self, query, batch_size=10, max_delay=5.0, checkpoint=True, queries_by_url=None):
+        self.query = query
+        self.queries_by_url = queries_by_url if queries_by_url is not None else {}
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.checkpoint = checkpoint
+        self.saved = 0
+        self._pending = []
+        self._oldest = None
+
+    def add(self, item):
+        """Encola un item; escribe el lote si está lleno o es antiguo."""
+        if not self._pending:
+            self._oldest = time.monotonic()
+        self._pending.append(item)
+        if len(self._pending) >= self.batch_size or time.monotonic() - self._oldest >= self.max_delay:
+            self.flush()
+
+    def flush(self):
+        """Escribe los items pendientes en una transacción."""
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, []
+        conn = get_connection()
+        try:
+            now = datetime.now().isoformat()
+            written = []
+            for item in batch:
+                try:
+                    queries = self.queries_by_url.get(item['url']) or [self.query]
+                    _upsert(conn, item, queries, now)
+                    written.extend((query, item['url']) for query in queries)
+                except Exception as e:
+                    logging.error(f"Error guardando item {item.get('url', '?')}: {e}")
+            if self.checkpoint:
+                conn.executemany(
+                    "DELETE FROM scrape_checkpoints WHERE query = ? AND wallapop_url = ?",
+                    written
+                )
+            conn.executemany(
+                "DELETE FROM deferred_items WHERE query = ? AND wallapop_url = ?",
+                written
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        written = len({url for _, url in written})
+        self.saved += written
+        logging.info(f"[DB] Lote de {written} items guardado ({self.saved} en total)")
+        return written
+
+    def close(self):
+        self.flush()
+
+
+# ── Checkpoints de ejecución ────────────────────────────────
+
+def save_checkpoint(query, items):
+    """Apunta items pendientes de detalle para poder reanudar la ejecución."""
+    if not items:
+        return 0
+    conn = get_connection()
+    try:
+        now = datetime.now().isoformat()
+        conn.executemany("""
+            INSERT OR IGNORE INTO scrape_checkpoints (query, wallapop_url, item, created_at)
+            VALUES (?, ?, ?, ?)
+        """, [(query, item['url'], json.dumps(item, ensure_ascii=False), now) for item in items])
+        conn.commit()
+    finally:
+        conn.close()
+    return len(items)
+
+
+def get_checkpoint(query, max_age_hours=None):
+    """Items pendientes de una ejecución anterior de la query, en su orden.
+
+    Con max_age_hours, un checkpoint más antiguo se descarta (los
+    anuncios pendientes ya pueden haber cambiado o desaparecido).
+    """
+    conn = get_connection()
+    try:
+        rows = conn.execute(
+            "SELECT item, created_at FROM scrape_checkpoints WHERE query = ? ORDER BY rowid",
+            (query,)
+        ).fetchall()
+    finally:
+        conn.close()
+    if rows and max_age_hours is not None:
+        oldest = min(row['created_at'] for row in rows)
+        if oldest < (datetime.now() - timedelta(hours=max_age_hours)).isoformat():
+            logging.info(f"Checkpoint de '{query}' caducado, se descarta.")
+            clear_checkpoint(query)
+            return []
+    return [json.loads(row['item']) for row in rows]
+
+
+def clear_checkpoint(query):
+    """Borra los pendientes de la query (ejecución completada)."""
+    conn = get_connection()
+    try:
+        conn.execute("DELETE FROM scrape_checkpoints WHERE query = ?", (query,))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# ── Items aplazados ─────────────────────────────────────────
+
+def defer_items(query, items):
+    """Aplaza a la siguiente ejecución de la query items que no llegaron a enriquecerse."""
+    if not items:
+        return 0
+    conn = get_connection()
+    try:
+        now = datetime.now().isoformat()
+        conn.executemany("""
+            INSERT OR REPLACE INTO deferred_items (query, wallapop_url, item, deferred_at)
+            VALUES (?, ?, ?, ?)
+        """, [(query, item['url'], json.dumps(item, ensure_ascii=False), now) for item in items])
+        conn.commit()
+    finally:
+        conn.close()
+    return len(items)
+
+
+def get_deferred(query, max_age_hours=None):
+    """Items aplazados de la query, en el orden en que se aplazaron.
+
+    No se borran al leerlos: cada uno sale de deferred_items cuando se
+    guarda (ItemWriter) o se confirma sin cambios (touch_items), así que
+    si la ejecución se corta antes siguen para la próxima. Con
+    max_age_hours, los aplazados más antiguos se descartan (y se borran).
+    """
+    conn = get_connection()
+    try:
+        if max_age_hours is not None:
+            oldest = (datetime.now() - timedelta(hours=max_age_hours)).isoformat()
+            conn.execute("DELETE FROM deferred_items WHERE query = ? AND deferred_at < ?", (query, oldest))
+            conn.commit()
+        rows = conn.execute(
+            "SELECT item FROM deferred_items WHERE query = ? ORDER BY rowid",
+            (query,)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [json.loads(row['item']) for row in rows]
+
+
+def get_query_avg_price(query):
+    """Precio medio de los items de una búsqueda (None si no hay precios)."""
+    conn = get_connection()
+    try:
+        row = conn.execute("""
+            SELECT AVG(i.price) FROM items i
+            JOIN item_queries iq ON iq.item_id = i.id
+            WHERE iq.query = ? AND i.price IS NOT NULL AND i.price > 0
+        """, (query,)).fetchone()
+    finally:
+        conn.close()
+    return row[0]
+
+
+# Máximo de parámetros por sentencia (SQLITE_MAX_VARIABLE_NUMBER antiguo = 999)
+_SQL_CHUNK = 500
+
+
+def get_known_items(urls):
+    """Busca en una sola pasada qué URLs ya están en la DB.
+
+    Returns:
+        dict url -> {price, description, last_seen, detail_fetched_at}
+        solo para las URLs conocidas.
+    """
+    urls = list(dict.fromkeys(urls))
+    known = {}
+    if not urls:
+        return known
+    conn = get_connection()
+    try:
+        for start in range(0, len(urls), _SQL_CHUNK):
+            chunk = urls[start:start + _SQL_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(f"""
+                SELECT wallapop_url, price, description, last_seen, detail_fetched_at
+                FROM items WHERE wallapop_url IN ({placeholders})
+            """, chunk).fetchall()
+            for row in rows:
+                known[row['wallapop_url']] = dict(row)
+    finally:
+        conn.close()
+    return known
+
+
+def get_query_urls(query):
+    """Devuelve el set de URLs ya guardadas para una query (por cualquiera de sus búsquedas)."""
+    conn = get_connection()
+    try:
+        rows = conn.execute("""
+            SELECT i.wallapop_url FROM items i
+            JOIN item_queries iq ON iq.item_id = i.id
+            WHERE iq.query = ?
+        """, (query,)).fetchall()
+    finally:
+        conn.close()
+    return {row['wallapop_url'] for row in rows}
+
+
+def touch_items(urls, query=None):
+    """Actualiza last_seen de varias URLs en una sola transacción.
+
+    Con query, además las asocia a esa búsqueda (un item ya guardado por
+    otra búsqueda también es de esta) y deja de tenerlas aplazadas.
+    """
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return 0
+    conn = get_connection()
+    try:
+        now = datetime.now().isoformat()
+        conn.executemany(
+            "UPDATE items SET last_seen = ? WHERE wallapop_url = ?",
+            [(now, url) for url in urls]
+        )
+        if query:
+            conn.executemany("""
+                INSERT INTO item_queries (item_id, query, first_seen, last_seen)
+                SELECT id, ?, ?, ? FROM items WHERE wallapop_url = ?
+                ON CONFLICT(item_id, query) DO UPDATE SET last_seen = excluded.last_seen
+            """, [(query, now, now, url) for url in urls])
+            conn.executemany(
+                "DELETE FROM deferred_items WHERE query = ? AND wallapop_url = ?",
+                [(query, url) for url in urls]
+            )
+        conn.commit()
+    finally:
+        conn.close()
+    logging.info(f"[DB] last_seen actualizado para {len(urls)} items sin cambios")
+    return len(urls)
+
+
 def get_items(query=None, sort="recent", max_price=None, limit=50, offset=0):
     """Consulta items con filtros.
 
@@ -206,17 +555,23 @@ def get_opportunities(query=None, min_discount=0, limit=50, offset=0):
     """
     conn = get_connection()
 
+    # Un item listado por varias búsquedas cuenta en la media de cada una
+    # (y puede salir una vez por búsqueda, con su query en "query")
     sql = """
-        SELECT i.*, q.avg_price, q.item_count,
+        SELECT i.id, i.wallapop_url, i.title, i.price, i.description, i.location,
+               iq.query, i.first_seen, i.last_seen, i.price_history, i.detail_fetched_at,
+               q.avg_price, q.item_count,
                ROUND((1 - i.price / q.avg_price) * 100, 1) AS discount_pct
         FROM items i
+        JOIN item_queries iq ON iq.item_id = i.id
         JOIN (
-            SELECT query, AVG(price) AS avg_price, COUNT(*) AS item_count
-            FROM items
-            WHERE price IS NOT NULL AND price > 0
-            GROUP BY query
+            SELECT l.query, AVG(p.price) AS avg_price, COUNT(*) AS item_count
+            FROM item_queries l
+            JOIN items p ON p.id = l.item_id
+            WHERE p.price IS NOT NULL AND p.price > 0
+            GROUP BY l.query
             HAVING COUNT(*) >= 3
-        ) q ON i.query = q.query
+        ) q ON iq.query = q.query
         WHERE i.price IS NOT NULL
           AND i.price > 0
           AND i.price < q.avg_price
@@ -225,7 +580,7 @@ def get_opportunities(query=None, min_discount=0, limit=50, offset=0):
     params = [min_discount]
 
     if query:
-        sql += " AND i.query = ?"
+        sql += " AND iq.query = ?"
         params.append(query)
 
     count_sql = f"SELECT COUNT(*) FROM ({sql})"
@@ -245,13 +600,13 @@ def get_stats():
     conn = get_connection()
     stats = {}
     stats['total_items'] = conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
-    stats['unique_queries'] = conn.execute("SELECT COUNT(DISTINCT query) FROM items").fetchone()[0]
+    stats['unique_queries'] = conn.execute("SELECT COUNT(DISTINCT query) FROM item_queries").fetchone()[0]
 
     last = conn.execute("SELECT MAX(last_seen) FROM items").fetchone()[0]
     stats['last_update'] = last
 
     queries = conn.execute(
-        "SELECT query, COUNT(*) as count FROM items GROUP BY query ORDER BY count DESC"
+        "SELECT query, COUNT(*) as count FROM item_queries GROUP BY query ORDER BY count DESC"
     ).fetchall()
     stats['queries'] = [{"query": r['query'], "count": r['count']} for r in queries]
 
@@ -1,8 +1,19 @@
 import undetected_chromedriver as uc
 import os
 import re
+import time
 import shutil
+import logging
+import threading
 import subprocess
+from contextlib import contextmanager
+
+from src.config import Config
+from src.processes import tracker, quit_driver
+from src.resource_blocking import set_resource_blocking
+from src.profiles import acquire_profile, attach_profile
+
+logger = logging.getLogger(__name__)
 
 
 def _detect_chrome_version():
@@ -18,11 +29,45 @@ def _detect_chrome_version():
     return None
 
 
-def init_driver(headless=False, pos="max"):
+def init_driver(headless=False, pos="max", block_profile=None, page_load_strategy=None,
+                persistent_profile=None):
     """
     Inicializa el driver de Chrome indetectable.
+
+    block_profile: perfil de bloqueo de recursos a aplicar desde el inicio
+    (ver src.resource_blocking.BLOCK_PROFILES); None no bloquea nada.
+    page_load_strategy: "normal", "eager" o "none" (None = Config).
+    persistent_profile: usar un user-data-dir persistente de src.profiles
+    (cookies y caché entre ejecuciones); None = Config.PERSISTENT_PROFILE.
     """
+    if page_load_strategy is None:
+        page_load_strategy = Config.PAGE_LOAD_STRATEGY
+    if persistent_profile is None:
+        persistent_profile = Config.PERSISTENT_PROFILE
+
+    lease = acquire_profile() if persistent_profile else None
+    try:
+        driver = _start_chrome(headless, page_load_strategy, lease.path if lease else None)
+    except Exception:
+        if lease:
+            lease.release()
+        raise
+    if lease:
+        attach_profile(driver, lease)
+    return _finish_driver(driver, headless, pos, block_profile)
+
+
+def _enable_performance_log(options):
+    """Activa el log de rendimiento (solo eventos de red) para src.search_api."""
+    if Config.SEARCH_API_CAPTURE:
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
+
+
+def _start_chrome(headless, page_load_strategy, user_data_dir):
+    """Arranca Chrome (reintentando tras limpiar la caché de undetected_chromedriver)."""
     options = uc.ChromeOptions()
+    options.page_load_strategy = page_load_strategy
     options.add_argument("--password-store=basic")
     options.add_experimental_option(
         "prefs",
@@ -31,6 +76,7 @@ def init_driver(headless=False, pos="max"):
             "profile.password_manager_enabled": False
         },
     )
+    _enable_performance_log(options)
 
     if headless:
         options.add_argument("--no-sandbox")
@@ -48,7 +94,8 @@ def init_driver(headless=False, pos="max"):
             headless=headless,
             log_level=3,
             version_main=_detect_chrome_version(),
-            use_subprocess=True
+            use_subprocess=True,
+            user_data_dir=user_data_dir
         )
     except Exception as e:
         print(f"Error inicializando driver: {e}. Intentando limpiar caché...")
@@ -58,15 +105,22 @@ def init_driver(headless=False, pos="max"):
 
         # Reintentar con nuevas opciones
         options = uc.ChromeOptions()
+        options.page_load_strategy = page_load_strategy
         options.add_argument("--password-store=basic")
+        _enable_performance_log(options)
         driver = uc.Chrome(
             options=options,
             headless=headless,
             log_level=3,
             version_main=_detect_chrome_version(),
-            use_subprocess=True
+            use_subprocess=True,
+            user_data_dir=user_data_dir
         )
-    
+    return driver
+
+
+def _finish_driver(driver, headless, pos, block_profile):
+    """Ajusta la ventana, aplica el bloqueo de recursos y registra el driver."""
     if not headless:
         driver.maximize_window()
         if pos != "max":
@@ -78,5 +132,228 @@ def init_driver(headless=False, pos="max"):
                     driver.set_window_rect(x=ancho//2, y=0, width=ancho//2, height=alto)
             except Exception:
                 pass # Ignorar errores de redimensionado si fallan
-                
+
+    if block_profile:
+        set_resource_blocking(driver, block_profile)
+
+    # Seguir su árbol de procesos para poder limpiarlo sin tocar otros Chromes
+    tracker.register(driver)
     return driver
+
+
+class DriverPool:
+    """Pool de drivers de Chrome calientes, reutilizables entre ejecuciones.
+
+    Mantiene hasta `size` instancias vivas. Cada instancia se calienta al
+    crearse (p.ej. cargar la home y aceptar cookies) y se presta con
+    acquire()/release(). Al devolverla se comprueba que sigue respondiendo
+    y se recicla si ha superado max_age segundos o max_uses préstamos.
+
+    Args:
+        size: Número máximo de drivers vivos a la vez.
+        headless: Modo headless para los drivers creados por defecto.
+        warmup: Callable(driver) -> bool que prepara un driver nuevo.
+            Si devuelve True, el driver queda marcado como caliente.
+        max_age: Segundos de vida máximos de un driver.
+        max_uses: Préstamos máximos antes de reciclar un driver.
+        factory: Callable() -> driver (por defecto init_driver).
+    """
+
+    def __init__(self, size=2, headless=True, warmup=None, max_age=3600, max_uses=50, factory=None):
+        self.size = size
+        self.headless = headless
+        self.warmup = warmup
+        self.max_age = max_age
+        self.max_uses = max_uses
+        self._factory = factory or (lambda: init_driver(headless=self.headless, pos="izquierda"))
+        self._cond = threading.Condition()
+        self._idle = []    # Drivers libres (LIFO: el más reciente está más caliente)
+        self._meta = {}    # id(driver) -> {'created', 'uses', 'warm'}
+        self._total = 0    # Drivers vivos + en creación
+        self._closed = False
+
+    # ── Préstamo ────────────────────────────────────────────
+
+    def acquire(self, timeout=None):
+        """Presta un driver caliente, creando uno si hay hueco.
+
+        Bloquea hasta que haya uno libre si el pool está lleno.
+
+        Raises:
+            TimeoutError: si no queda ninguno libre en `timeout` segundos.
+            RuntimeError: si el pool está cerrado.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            stale = None
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("El pool de drivers está cerrado")
+                if self._idle:
+                    driver = self._idle.pop()
+                    if not self._expired(driver):
+                        self._meta[id(driver)]['uses'] += 1
+                        return driver
+                    stale = driver
+                    self._forget(driver)
+                elif self._total < self.size:
+                    self._total += 1
+                else:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("No hay drivers libres en el pool")
+                    self._cond.wait(remaining)
+                    continue
+
+            if stale is not None:
+                self._quit(stale)
+                continue
+
+            driver = self._create_reserved()
+            with self._cond:
+                self._meta[id(driver)]['uses'] += 1
+            return driver
+
+    def release(self, driver, discard=False):
+        """Devuelve un driver al pool.
+
+        Si discard es True, no responde o ha caducado, se cierra y se
+        repone otro en background para mantener el pool caliente.
+        """
+        if driver is None:
+            return
+        healthy = not discard and _driver_responds(driver)
+        with self._cond:
+            if id(driver) not in self._meta:
+                healthy = False
+            elif healthy and not self._closed and not self._expired(driver):
+                self._idle.append(driver)
+                self._cond.notify()
+                return
+            else:
+                self._forget(driver)
+        self._quit(driver)
+        if not self._closed:
+            self.prewarm()
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """Context manager: presta un driver y lo devuelve al salir."""
+        driver = self.acquire(timeout)
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def is_warm(self, driver):
+        """True si el driver pasó el calentamiento (cookies aceptadas)."""
+        with self._cond:
+            meta = self._meta.get(id(driver))
+            return bool(meta and meta['warm'])
+
+    # ── Calentamiento ───────────────────────────────────────
+
+    def prewarm(self):
+        """Rellena el pool hasta `size` drivers libres en un thread aparte."""
+        threading.Thread(target=self._fill, daemon=True, name="driver-pool-fill").start()
+
+    def _fill(self):
+        while True:
+            with self._cond:
+                if self._closed or self._total >= self.size:
+                    return
+                self._total += 1
+            try:
+                driver = self._create_reserved()
+            except Exception as e:
+                logger.error("No se pudo precalentar un driver: %s", e)
+                return
+            with self._cond:
+                self._idle.append(driver)
+                self._cond.notify()
+
+    def _create_reserved(self):
+        """Crea y calienta un driver para un hueco ya reservado en _total."""
+        try:
+            driver = self._factory()
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+        warm = False
+        if self.warmup:
+            try:
+                warm = bool(self.warmup(driver))
+            except Exception as e:
+                logger.warning("Fallo calentando driver: %s", e)
+        with self._cond:
+            self._meta[id(driver)] = {'created': time.monotonic(), 'uses': 0, 'warm': warm}
+        logger.info("Driver creado para el pool (caliente=%s)", warm)
+        return driver
+
+    # ── Reciclado ───────────────────────────────────────────
+
+    def _expired(self, driver):
+        meta = self._meta[id(driver)]
+        too_old = self.max_age and time.monotonic() - meta['created'] >= self.max_age
+        too_used = self.max_uses and meta['uses'] >= self.max_uses
+        return bool(too_old or too_used)
+
+    def _forget(self, driver):
+        """Saca un driver de la contabilidad del pool (con el lock tomado)."""
+        if self._meta.pop(id(driver), None) is not None:
+            self._total -= 1
+            self._cond.notify()
+
+    def _quit(self, driver):
+        quit_driver(driver)
+
+    def stats(self):
+        with self._cond:
+            return {'size': self.size, 'alive': self._total, 'idle': len(self._idle)}
+
+    def close(self):
+        """Cierra los drivers libres; los prestados se cierran al devolverse."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            for driver in idle:
+                self._forget(driver)
+        for driver in idle:
+            self._quit(driver)
+
+
+def _driver_responds(driver):
+    try:
+        driver.execute_script("return 1")
+        return True
+    except Exception:
+        return False
+
+
+def warm_up_driver(driver):
+    """Deja un driver en la home con las cookies aceptadas."""
+    from src.pages import HomePage
+
+    driver.get(Config.BASE_URL)
+    return HomePage(driver, Config.TIMEOUT_DEFAULT).accept_cookies()
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_shared_pool():
+    """Devuelve el DriverPool compartido por scheduler y API (creado bajo demanda)."""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = DriverPool(
+                size=Config.DRIVER_POOL_SIZE,
+                headless=True,
+                warmup=warm_up_driver,
+                max_age=Config.DRIVER_MAX_AGE,
+                max_uses=Config.DRIVER_MAX_USES,
+            )
+        return _shared_pool
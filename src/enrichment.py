@@ -0,0 +1,188 @@
+"""
+Etapa concurrente de enriquecimiento de detalles.
+
+Reparte las descargas HTTP de detalle en un pool de threads, respetando
+un límite global de peticiones simultáneas por host compartido por todos
+los scrapers del proceso. El ritmo lo marca src.rate_limiter.
+
+Los items no se descargan en orden de página sino por prioridad
+(enrichment_priority): primero los nuevos, luego las bajadas de precio y
+luego los de detalle más antiguo; dentro de cada grupo, antes los que
+están por debajo del precio medio de la búsqueda.
+"""
+
+import heapq
+import logging
+import itertools
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+from src.config import Config
+from src.database import parse_price, MISSING_DESCRIPTIONS
+
+logger = logging.getLogger(__name__)
+
+
+# ── Prioridad ───────────────────────────────────────────────
+
+PRIORITY_NEW = 0          # URL nunca guardada
+PRIORITY_PRICE_DROP = 1   # El card trae un precio menor que el guardado
+PRIORITY_REFRESH = 2      # Resto: detalle ausente, antiguo o precio al alza
+
+
+def enrichment_priority(item, row=None, avg_price=None):
+    """Clave de orden del detalle de un item (menor = antes).
+
+    Args:
+        item: Item del listado.
+        row: Fila guardada del item (ver get_known_items), None si es nuevo.
+        avg_price: Precio medio de la búsqueda; los items por debajo van
+            antes dentro de su grupo.
+
+    Returns:
+        Tupla (grupo, 0 si está por debajo de la media, fecha del último detalle).
+    """
+    price = parse_price(item.get('price'))
+    below_avg = 0 if price is not None and avg_price and price < avg_price else 1
+    if row is None:
+        return (PRIORITY_NEW, below_avg, '')
+    if price is not None and row.get('price') is not None and price < row['price']:
+        return (PRIORITY_PRICE_DROP, below_avg, '')
+    fetched = '' if row.get('description') in MISSING_DESCRIPTIONS else (row.get('detail_fetched_at') or '')
+    return (PRIORITY_REFRESH, below_avg, fetched)
+
+
+DEFAULT_PRIORITY = (PRIORITY_NEW, 1, '')
+
+
+class HostLimiter:
+    """Limita las peticiones simultáneas por host.
+
+    El ritmo (peticiones/s) no se controla aquí sino en el RateLimiter
+    compartido, del que tira el propio fetch.
+
+    Args:
+        max_per_host: Peticiones simultáneas máximas a un mismo host.
+    """
+
+    def __init__(self, max_per_host=4):
+        self.max_per_host = max_per_host
+        self._lock = threading.Lock()
+        self._semaphores: dict[str, threading.BoundedSemaphore] = {}
+
+    def _semaphore(self, host):
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._semaphores[host]
+
+    @contextmanager
+    def slot(self, url):
+        """Context manager que ocupa un hueco del host de la URL."""
+        with self._semaphore(urlparse(url).netloc):
+            yield
+
+
+_shared_limiter = None
+_shared_limiter_lock = threading.Lock()
+
+
+def get_host_limiter():
+    """Devuelve el HostLimiter compartido por todo el proceso."""
+    global _shared_limiter
+    with _shared_limiter_lock:
+        if _shared_limiter is None:
+            _shared_limiter = HostLimiter(max_per_host=Config.MAX_REQUESTS_PER_HOST)
+        return _shared_limiter
+
+
+class ConcurrentEnricher:
+    """Ejecuta un fetch de detalle sobre muchos items en paralelo.
+
+    Cada thread libre toma el item pendiente de mayor prioridad en ese
+    momento, no el primero que se encoló: lo que llega después durante el
+    scroll puede adelantar a lo ya encolado.
+
+    Args:
+        fetch: Callable item -> dict enriquecido o None si falla.
+        workers: Número de threads del pool.
+        limiter: HostLimiter a respetar (por defecto el compartido).
+    """
+
+    def __init__(self, fetch, workers=4, limiter=None):
+        self.fetch = fetch
+        self.workers = max(1, workers)
+        self.limiter = limiter or get_host_limiter()
+        self._pool = None
+        self._futures = set()
+        self._queue = []    # Heap de (prioridad, orden, clave, item) pendientes
+        self._queue_lock = threading.Lock()
+        self._order = itertools.count()
+
+    def _run_next(self):
+        # Cada tarea del pool descarga el mejor pendiente al arrancar
+        with self._queue_lock:
+            _, _, key, item = heapq.heappop(self._queue)
+        return key, self._fetch_one(item)
+
+    def _fetch_one(self, item):
+        try:
+            with self.limiter.slot(item['url']):
+                return self.fetch(item)
+        except Exception as e:
+            logger.warning("Error enriqueciendo %s: %s", item.get('url', '?'), e)
+            return None
+
+    def submit(self, key, item, priority=DEFAULT_PRIORITY):
+        """Encola un item para descargarlo en segundo plano (no bloquea).
+
+        Args:
+            priority: Clave de orden (ver enrichment_priority); menor = antes.
+        """
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="enrich")
+        with self._queue_lock:
+            heapq.heappush(self._queue, (priority, next(self._order), key, item))
+        self._futures.add(self._pool.submit(self._run_next))
+
+    def as_completed(self):
+        """Genera (clave, resultado) de lo encolado a medida que termina.
+
+        El resultado es None cuando el fetch falla, para que el llamador
+        aplique su fallback. El orden es el de finalización, no el de envío.
+        """
+        # Las futures siguen en self._futures hasta devolverse, para que close() las cancele
+        futures = set(self._futures)
+        try:
+            for future in as_completed(futures):
+                self._futures.discard(future)
+                yield future.result()
+        finally:
+            # Si el consumidor abandona, no lanzar lo que falta
+            for future in futures:
+                future.cancel()
+
+    def close(self):
+        """Cancela lo pendiente y libera los threads.
+
+        Solo espera a las descargas ya en curso, no a las encoladas.
+        """
+        for future in self._futures:
+            future.cancel()
+        self._futures = set()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        with self._queue_lock:
+            self._queue.clear()
+
+    def enrich(self, items):
+        """Genera tuplas (índice, resultado) a medida que terminan (ver as_completed)."""
+        try:
+            for i, item in enumerate(items):
+                self.submit(i, item)
+            yield from self.as_completed()
+        finally:
+            self.close()
@@ -0,0 +1,183 @@
+"""
+Fetcher HTTP para páginas de detalle de Wallapop.
+
+Las páginas de detalle devuelven título, precio y ubicación en el HTML
+servido (sin JS), y un resumen de la descripción en og:description.
+Este módulo las descarga con requests sobre un pool de conexiones
+keep-alive, reutilizando cookies y User-Agent de la sesión de Chrome,
+y deja a ItemDetailPage (Selenium) solo como fallback.
+"""
+
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.pages.item_detail_page import ItemDetailPage, parse_detail_html
+from src.parsing import resolve_backend
+from src.rate_limiter import get_rate_limiter
+from src.structured_data import FIELDS, SOURCE_META
+
+logger = logging.getLogger(__name__)
+
+# Respuestas que indican que nos están frenando o bloqueando
+BLOCK_STATUSES = (403, 429)
+
+# Marcas de páginas de captcha/challenge de los antibots habituales (en minúsculas)
+CHALLENGE_MARKERS = (
+    "captcha-delivery.com",         # DataDome
+    "px-captcha",                   # PerimeterX
+    "/cdn-cgi/challenge-platform",  # Cloudflare
+    "g-recaptcha",
+    "hcaptcha.com",
+)
+
+
+def is_challenge_page(html):
+    """True si el HTML es una página de captcha/challenge de un antibot."""
+    html = html.lower()
+    return any(marker in html for marker in CHALLENGE_MARKERS)
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "es-ES,es;q=0.9",
+}
+
+
+def browser_session(driver, headers=None, cookies=None):
+    """Headers (User-Agent) y cookies del navegador vivo para una sesión requests.
+
+    Returns:
+        (headers, cookies): copias de los dados, completadas con los del navegador.
+    """
+    headers = dict(headers or {})
+    cookies = dict(cookies or {})
+    try:
+        user_agent = driver.execute_script("return navigator.userAgent")
+        if isinstance(user_agent, str) and user_agent:
+            headers["User-Agent"] = user_agent
+    except Exception as e:
+        logger.warning("No se pudo leer el User-Agent del navegador: %s", e)
+    try:
+        for cookie in driver.get_cookies() or []:
+            cookies[cookie["name"]] = cookie["value"]
+    except Exception as e:
+        logger.warning("No se pudieron copiar las cookies del navegador: %s", e)
+    return headers, cookies
+
+
+class HttpDetailFetcher:
+    """Enriquece items descargando su página de detalle por HTTP plano.
+
+    Args:
+        timeout: Timeout (s) de cada request.
+        pool_size: Conexiones keep-alive a mantener por host.
+        headers: Headers extra (se mezclan con DEFAULT_HEADERS).
+        cookies: Dict nombre -> valor a enviar en cada request.
+        require_full_description: Si es True, un detalle sin la descripción
+            completa en el HTML se considera fallo (para que el llamador
+            haga fallback a Selenium) en vez de usar og:description.
+        rate_limiter: RateLimiter del que tirar (por defecto el compartido).
+        adapter: Transport adapter de requests a montar en lugar del pool
+            HTTP (p.ej. src.replay.ReplayAdapter para medir sin red).
+        parse_pool: ParsePool (src.parse_pool) en el que parsear cada
+            detalle; None = en el thread que lo descarga.
+    """
+
+    def __init__(self, timeout=10, pool_size=10, headers=None, cookies=None,
+                 require_full_description=False, rate_limiter=None, adapter=None,
+                 parse_pool=None):
+        self.timeout = timeout
+        self.require_full_description = require_full_description
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.session = requests.Session()
+        if adapter is None:
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(DEFAULT_HEADERS)
+        if headers:
+            self.session.headers.update(headers)
+        for name, value in (cookies or {}).items():
+            self.session.cookies.set(name, value)
+        # Reutilizamos los patrones y extractores del Page Object de detalle
+        self._parser = ItemDetailPage(driver=None)
+        self.parse_pool = parse_pool
+
+    @classmethod
+    def from_driver(cls, driver, **kwargs):
+        """Crea un fetcher con las cookies y el User-Agent del navegador vivo."""
+        headers, cookies = browser_session(driver, kwargs.pop("headers", None), kwargs.pop("cookies", None))
+        return cls(headers=headers, cookies=cookies, **kwargs)
+
+    def fetch_html(self, url):
+        """Descarga el HTML de una URL. Lanza excepción si el status no es 200.
+
+        Espera turno en el rate limiter y le notifica errores de red,
+        bloqueos (403/429) y errores de servidor.
+        """
+        self.rate_limiter.acquire(url)
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+        except requests.RequestException:
+            self.rate_limiter.report_failure(url)
+            raise
+        if response.status_code in BLOCK_STATUSES or response.status_code >= 500:
+            self.rate_limiter.report_failure(url, blocked=response.status_code in BLOCK_STATUSES)
+        response.raise_for_status()
+        # Sin charset en Content-Type requests asume ISO-8859-1; Wallapop sirve UTF-8
+        if 'charset' not in response.headers.get('Content-Type', '').lower():
+            response.encoding = 'utf-8'
+        return response.text
+
+    def enrich_item(self, item):
+        """Completa el item vía HTTP.
+
+        Returns:
+            El dict del item completado, o None si el camino HTTP falla
+            (error de red, status != 200, página sin título o sin
+            descripción completa cuando se exige). En ese caso el item
+            original no se modifica.
+        """
+        try:
+            html = self.fetch_html(item['url'])
+        except Exception as e:
+            logger.info("HTTP falló para %s: %s", item['url'], e)
+            return None
+
+        parser = self._parser
+        if self.parse_pool is not None:
+            values, sources = self.parse_pool.run(parse_detail_html, html, FIELDS, resolve_backend())
+        else:
+            values, sources = parse_detail_html(html)
+
+        # Sin título en ninguna fuente no es una página de detalle. Solo un
+        # captcha es bloqueo; un item retirado o un cambio de maquetación
+        # no debe vaciar el bucket compartido con los demás scrapes
+        if 'title' not in values:
+            blocked = is_challenge_page(html)
+            logger.info("HTTP sin título para %s (%s), se requiere fallback",
+                        item['url'], "captcha" if blocked else "no es un detalle")
+            self.rate_limiter.report_failure(item['url'], blocked=blocked)
+            return None
+        self.rate_limiter.report_success(item['url'])
+
+        # og:description es solo un resumen
+        if self.require_full_description and sources.get('description') in (None, SOURCE_META):
+            return None
+
+        enriched = dict(item)
+        for name in parser.missing_fields(enriched):
+            enriched[name] = values.get(name, "No disponible")
+        enriched['description'] = values.get('description', "No disponible")
+
+        logger.info(f"[HTTP] {enriched['title'][:30]}... | {enriched['price']}")
+        logger.debug("Fuentes de %s: %s", item['url'], sources)
+        return enriched
+
+    def close(self):
+        self.session.close()
@@ -1,8 +1,10 @@
 import logging
-from bs4 import BeautifulSoup
+
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from src.config import Config
+from src.parsing import parse_html, select_first_by_class
 from src.utils import extract_text_safe
 
 
@@ -10,7 +12,30 @@ class BasePage:
     """Clase base para todos los Page Objects.
 
     Encapsula las operaciones comunes: esperas explícitas,
-    búsqueda por patrón de clase CSS, y parseo con BeautifulSoup.
+    búsqueda por patrón de clase CSS, y parseo del HTML.
+    """
+
+    # Readiness: con page_load_strategy eager/none driver.get() vuelve antes
+    # de que la página termine de cargar, así que cada página define qué
+    # nodos indican que sus datos ya están en el DOM.
+    READY_LOCATORS = ()      # Deben estar todos presentes
+    OPTIONAL_LOCATORS = ()   # Se esperan solo mientras el documento siga cargando
+
+    # Captura acotada: en vez de todo el page_source, get_soup() trae solo
+    # el outerHTML de los nodos que tienen los datos de la página.
+    ROOT_CONTAINER = None    # Selector CSS de los contenedores (None = documento completo)
+    EXTRA_CAPTURE = None     # Selector CSS de nodos sueltos a incluir (p.ej. meta/JSON-LD del head)
+    PARSE_ONLY = None        # SoupStrainer opcional para el backend html.parser
+
+    _JS_SCOPED_HTML = """
+        var roots = document.querySelectorAll(arguments[0]);
+        if (!roots.length) return null;
+        var parts = [];
+        if (arguments[1]) {
+            document.querySelectorAll(arguments[1]).forEach(function (el) { parts.push(el.outerHTML); });
+        }
+        roots.forEach(function (el) { parts.push(el.outerHTML); });
+        return '<html><body>' + parts.join('') + '</body></html>';
     """
 
     def __init__(self, driver, timeout=15):
@@ -38,11 +63,73 @@ class BasePage:
             EC.presence_of_all_elements_located(locator)
         )
 
-    # ── BeautifulSoup ───────────────────────────────────────
+    def is_ready(self, driver):
+        """Predicado de readiness para WebDriverWait.
+
+        Listo cuando están todos los READY_LOCATORS y, o bien también los
+        OPTIONAL_LOCATORS, o bien el documento ya terminó de cargar (no
+        van a aparecer).
+        """
+        if not all(driver.find_elements(*loc) for loc in self.READY_LOCATORS):
+            return False
+        if all(driver.find_elements(*loc) for loc in self.OPTIONAL_LOCATORS):
+            return True
+        return driver.execute_script("return document.readyState") == "complete"
+
+    def navigate(self, url):
+        """Navega a url y devuelve la URL que deja atrás (ver wait_until_ready)."""
+        previous = previous_url(self.driver.current_url, url)
+        self.driver.get(url)
+        return previous
+
+    def wait_until_ready(self, previous_url=None):
+        """Espera a que la página esté lista para extraer datos.
+
+        Args:
+            previous_url: URL de la pestaña antes de navegar. Si se indica,
+                exige además que la pestaña ya no esté en ella, para no
+                leer la página anterior mientras la nueva aún no ha llegado.
+                No se compara con la URL pedida porque el sitio puede
+                redirigirla o normalizarla (slug cambiado, parámetros...).
+        """
+        def ready(driver):
+            if previous_url is not None and driver.current_url == previous_url:
+                return False
+            return self.is_ready(driver)
+
+        return WebDriverWait(self.driver, self.timeout).until(ready)
+
+    # ── Parseo ──────────────────────────────────────────────
 
     def get_soup(self):
-        """Parsea el page_source actual con BeautifulSoup."""
-        return BeautifulSoup(self.driver.page_source, 'html.parser')
+        """Parsea la página actual (backend de Config.HTML_PARSER, ver src.parsing)."""
+        return parse_html(self.get_html(), parse_only=self.PARSE_ONLY)
+
+    def get_html(self):
+        """HTML de la página actual, sin parsear.
+
+        Si la página declara ROOT_CONTAINER, solo se transfiere el HTML de
+        esos nodos (más EXTRA_CAPTURE). Si no están en el DOM se usa el
+        page_source completo.
+        """
+        html = self.get_scoped_html() if Config.SCOPED_CAPTURE else None
+        if html is None:
+            html = self.driver.page_source
+        return html
+
+    def get_scoped_html(self):
+        """HTML de ROOT_CONTAINER y EXTRA_CAPTURE, o None si no aplica."""
+        if not self.ROOT_CONTAINER:
+            return None
+        try:
+            html = self.driver.execute_script(self._JS_SCOPED_HTML, self.ROOT_CONTAINER, self.EXTRA_CAPTURE)
+        except Exception as e:
+            self.logger.debug(f"Captura acotada falló, se usa page_source: {e}")
+            return None
+        if not isinstance(html, str):
+            return None
+        self.logger.debug(f"Captura acotada: {len(html):,} caracteres")
+        return html
 
     # ── Búsqueda por patrón de clase ────────────────────────
 
@@ -50,23 +137,24 @@ class BasePage:
         """Busca un elemento cuyas clases contengan el patrón.
 
         Args:
-            parent: Elemento BS4 donde buscar.
+            parent: Nodo (BS4 o lxml) donde buscar.
             pattern: String o lista de strings. Si es lista,
                      prueba cada patrón en orden y retorna el primero que encuentre.
-        """
-        if isinstance(pattern, list):
-            for p in pattern:
-                found = self.find_by_class_pattern(parent, p)
-                if found:
-                    return found
-            return None
 
-        return parent.find(
-            lambda tag: tag.name and 'class' in tag.attrs
-            and any(pattern in c for c in tag['class'])
-        )
+        Las búsquedas están precompiladas (XPath en lxml), no una lambda por llamada.
+        """
+        return select_first_by_class(parent, pattern)
 
     def extract_from_pattern(self, parent, pattern, default="No disponible"):
         """Busca por patrón de clase y extrae el texto."""
         elem = self.find_by_class_pattern(parent, pattern)
         return extract_text_safe(elem, default)
+
+
+def previous_url(current, target):
+    """URL a dejar atrás al navegar de current a target.
+
+    None si ya se estaba en target: recargar la misma URL no se distingue
+    por la URL y la readiness depende solo de los localizadores.
+    """
+    return None if current == target else current
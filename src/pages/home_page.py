@@ -13,6 +13,11 @@ class HomePage(BasePage):
     # ── Selectores propios de esta página ───────────────────
     SEARCH_BOX = (By.ID, "searchbox-form-input")
 
+    # Cookies con las que consentmanager guarda el consentimiento
+    # (__cmpconsentx<id>, __cmpcccx<id>...). Con un perfil persistente
+    # sobreviven entre ejecuciones y el banner ya no aparece.
+    CONSENT_COOKIE_PREFIXES = ("__cmpconsent", "__cmpccc")
+
     # El banner de cookies de consentmanager.net se renderiza dentro
     # del Shadow DOM de #cmpwrapper, por lo que no es accesible con
     # selectores CSS normales de Selenium. Se usa JavaScript para
@@ -26,8 +31,22 @@ class HomePage(BasePage):
         return true;
     """
 
+    def has_stored_consent(self):
+        """True si el navegador ya tiene guardado el consentimiento de cookies."""
+        try:
+            cookies = self.driver.get_cookies() or []
+        except Exception:
+            return False
+        return any(c.get('name', '').startswith(self.CONSENT_COOKIE_PREFIXES) for c in cookies)
+
     def accept_cookies(self):
-        """Acepta el banner de cookies si aparece (Shadow DOM)."""
+        """Acepta el banner de cookies si aparece (Shadow DOM).
+
+        Si el perfil ya tiene el consentimiento guardado no espera al banner.
+        """
+        if self.has_stored_consent():
+            self.logger.info("[OK] Consentimiento de cookies ya guardado")
+            return True
         self.logger.info("Aceptando cookies...")
         try:
             # Esperar a que el wrapper exista en el DOM
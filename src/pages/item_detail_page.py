@@ -1,8 +1,38 @@
+from collections import deque
+
 from selenium.webdriver.common.by import By
 
-from src.pages.base_page import BasePage
+from src.pages.base_page import BasePage, previous_url
+from src.parsing import parse_html, find_first, select_first_by_class
+from src.structured_data import extract_structured, FIELDS, SOURCE_META
 from src.utils import extract_text_safe
 
+SOURCE_HTML = "html"
+PENDING_VALUES = ["No disponible", "pending"]
+
+_parser = None   # ItemDetailPage sin driver para parse_detail_html (uno por proceso)
+
+
+def parse_detail_html(html, fields=FIELDS, backend=None):
+    """Extrae los campos de un detalle a partir de su HTML.
+
+    Función pura (HTML en string, dicts de vuelta) para poder ejecutarse
+    en otro proceso (ver src.parse_pool) sin driver ni estado compartido.
+
+    Args:
+        html: HTML de la página (completo o captura acotada).
+        fields: Campos a extraer (ver ItemDetailPage.extract_fields).
+        backend: Backend de src.parsing; el proceso padre lo resuelve y
+            lo pasa para que los workers no dependan de su Config.
+
+    Returns:
+        (valores, fuentes) como ItemDetailPage.extract_fields.
+    """
+    global _parser
+    if _parser is None:
+        _parser = ItemDetailPage(driver=None)
+    return _parser.extract_fields(parse_html(html, backend), list(fields))
+
 
 class ItemDetailPage(BasePage):
     """Page Object para la página de detalle de un producto.
@@ -17,9 +47,23 @@ class ItemDetailPage(BasePage):
     DESCRIPTION_PATTERN = ["description", "item-detail-description"]
     LOCATION_PATTERN = ["item-detail-location", "location"]
 
+    # Captura acotada: contenido principal más los datos estructurados del head
+    ROOT_CONTAINER = "main"
+    EXTRA_CAPTURE = (
+        'script[type="application/ld+json"], script#__NEXT_DATA__, script[type="application/json"], '
+        'meta[property^="og:"], meta[property^="product:"], meta[name^="og:"]'
+    )
+
     # Espera a que cargue el detalle (cualquier h1 en la página)
     PAGE_LOADED_INDICATOR = (By.TAG_NAME, "h1")
 
+    # Readiness: el h1 basta; precio y descripción se esperan mientras cargue
+    READY_LOCATORS = (PAGE_LOADED_INDICATOR,)
+    OPTIONAL_LOCATORS = (
+        (By.CSS_SELECTOR, "[class*='price']"),
+        (By.CSS_SELECTOR, "[class*='description']"),
+    )
+
     def enrich_item(self, item):
         """Navega al detalle del item y completa los datos faltantes.
 
@@ -30,43 +74,181 @@ class ItemDetailPage(BasePage):
             El mismo dict con los campos completados.
         """
         try:
-            self.driver.get(item['url'])
-            self.wait_for_element(self.PAGE_LOADED_INDICATOR)
+            previous = self.navigate(item['url'])
+            self.wait_until_ready(previous)
+            return self._parse_current(item)
 
-            soup = self.get_soup()
+        except Exception as e:
+            self.logger.error(f"Error en detalle {item['url']}: {e}", exc_info=True)
+            return item
 
-            if item['title'] in ["No disponible", "pending"]:
-                item['title'] = self._extract_title(soup)
+    def enrich_loaded_item(self, item, previous_url=None):
+        """Completa el item desde la pestaña actual, cuya navegación ya se lanzó.
 
-            if item['price'] in ["No disponible", "pending"]:
-                item['price'] = self.extract_from_pattern(soup, self.PRICE_PATTERN)
+        Espera a que la pestaña haya dejado previous_url (el detalle
+        anterior que seguía cargado) y a que esté lista (ver wait_until_ready).
+        """
+        try:
+            self.wait_until_ready(previous_url)
+            return self._parse_current(item)
 
-            if item['location'] in ["No disponible", "pending"]:
-                item['location'] = self.extract_from_pattern(soup, self.LOCATION_PATTERN)
+        except Exception as e:
+            self.logger.error(f"Error en detalle {item['url']}: {e}", exc_info=True)
+            return item
 
-            item['description'] = self._extract_description(soup)
+    def load_html(self, item):
+        """Navega al detalle del item y devuelve su HTML sin parsear.
 
-            self.logger.info(f"[Scraped] {item['title'][:30]}... | {item['price']}")
-            return item
+        Para parsear fuera del thread del driver (ver fill_item); None si
+        la navegación o la espera fallan.
+        """
+        try:
+            previous = self.navigate(item['url'])
+            self.wait_until_ready(previous)
+            return self.get_html()
 
         except Exception as e:
             self.logger.error(f"Error en detalle {item['url']}: {e}", exc_info=True)
-            return item
+            return None
+
+    def fields_to_parse(self, item):
+        """Campos que hay que extraer del detalle: los pendientes y la descripción."""
+        return self.missing_fields(item) + ['description']
+
+    def fill_item(self, item, values, sources=None):
+        """Completa el item con los valores extraídos de su detalle."""
+        for name in self.missing_fields(item):
+            item[name] = values.get(name, "No disponible")
+        item['description'] = values.get('description', "No disponible")
+
+        self.logger.info(f"[Scraped] {item['title'][:30]}... | {item['price']}")
+        self.logger.debug(f"Fuentes: {sources}")
+        return item
+
+    def _parse_current(self, item):
+        values, sources = self.extract_fields(self.get_soup(), self.fields_to_parse(item))
+        return self.fill_item(item, values, sources)
+
+    def missing_fields(self, item):
+        """Campos de título, precio y ubicación que siguen pendientes."""
+        return [name for name in ('title', 'price', 'location') if item[name] in PENDING_VALUES]
+
+    def extract_fields(self, soup, fields):
+        """Extrae los campos pedidos, primero de los datos estructurados.
+
+        Orden por campo: JSON-LD / estado de la app, luego las heurísticas
+        de clases CSS (solo para lo que falte) y por último los meta og:*
+        (og:description es solo un resumen).
+
+        Returns:
+            (valores, fuentes): dicts campo -> valor y campo -> fuente
+            ('json-ld', 'app-state', 'html' u 'og'). Los campos no
+            encontrados no aparecen.
+        """
+        structured = extract_structured(soup)
+        heuristics = {
+            'title': lambda: self._extract_title(soup),
+            'price': lambda: self.extract_from_pattern(soup, self.PRICE_PATTERN),
+            'location': lambda: self.extract_from_pattern(soup, self.LOCATION_PATTERN),
+            'description': lambda: self._extract_description(soup),
+        }
+        values, sources = {}, {}
+        for name in fields:
+            value, source = structured.get(name, (None, None))
+            if source == SOURCE_META or value is None:
+                html_value = heuristics[name]()
+                if html_value != "No disponible":
+                    value, source = html_value, SOURCE_HTML
+            if value is not None:
+                values[name], sources[name] = value, source
+        return values, sources
 
     def _extract_title(self, soup):
         """Extrae el título con fallback a <h1> directo."""
         elem = self.find_by_class_pattern(soup, self.TITLE_PATTERN)
-        if not elem:
-            elem = soup.find('h1')
+        if elem is None:
+            elem = find_first(soup, 'h1')
         return extract_text_safe(elem)
 
     def _extract_description(self, soup):
         """Extrae la descripción con fallback genérico."""
         elem = self.find_by_class_pattern(soup, self.DESCRIPTION_PATTERN)
-        if not elem:
-            elem = soup.find(
-                lambda t: t.name in ['div', 'section']
-                and 'class' in t.attrs
-                and 'description' in str(t['class']).lower()
-            )
+        if elem is None:
+            # div/section con "description" en la clase, sin distinguir mayúsculas
+            elem = select_first_by_class(soup, "description", tags=("div", "section"), ignore_case=True)
         return extract_text_safe(elem)
+
+
+class TabPipeline:
+    """Carga detalles en K pestañas del mismo Chrome de forma solapada.
+
+    submit() lanza la navegación de un item en una pestaña libre sin
+    esperar a que cargue; harvest() espera a la pestaña más antigua, la
+    parsea y la deja libre. Así la latencia de red de unos items se
+    solapa con el parseo de otros.
+
+    Args:
+        page: ItemDetailPage usado para esperar y parsear cada pestaña.
+        tabs: Número de pestañas (K).
+    """
+
+    def __init__(self, page, tabs=3):
+        self.page = page
+        self.driver = page.driver
+        self.tabs = tabs
+        self._main = None
+        self._free = []
+        self._loading = deque()  # (handle, key, item, URL anterior) en orden de envío
+
+    def _open_tabs(self):
+        self._main = self.driver.current_window_handle
+        handles = [self._main]
+        for _ in range(self.tabs - 1):
+            self.driver.switch_to.new_window('tab')
+            handles.append(self.driver.current_window_handle)
+        self._free = handles
+
+    @property
+    def full(self):
+        """True si todas las pestañas tienen una navegación en curso."""
+        return self._main is not None and not self._free
+
+    def submit(self, key, item):
+        """Lanza la navegación del item en una pestaña libre (no bloquea)."""
+        if self._main is None:
+            self._open_tabs()
+        handle = self._free.pop()
+        self.driver.switch_to.window(handle)
+        previous = previous_url(self.driver.current_url, item['url'])
+        self.driver.execute_script("window.location.href = arguments[0];", item['url'])
+        self._loading.append((handle, key, item, previous))
+
+    def harvest(self):
+        """Espera a la pestaña más antigua y devuelve (key, item enriquecido)."""
+        handle, key, item, previous = self._loading.popleft()
+        self.driver.switch_to.window(handle)
+        enriched = self.page.enrich_loaded_item(item, previous)
+        self._free.append(handle)
+        return key, enriched
+
+    def abandon(self):
+        """Vacía la cola sin parsear y devuelve los (key, item) pendientes."""
+        pending = [(key, item) for _, key, item, _ in self._loading]
+        self._loading.clear()
+        return pending
+
+    def close(self):
+        """Cierra las pestañas extra y vuelve a la principal."""
+        if self._main is None:
+            return
+        try:
+            for handle in self.driver.window_handles:
+                if handle != self._main:
+                    self.driver.switch_to.window(handle)
+                    self.driver.close()
+            self.driver.switch_to.window(self._main)
+        except Exception as e:
+            self.page.logger.warning(f"Error cerrando pestañas: {e}")
+        self._main = None
+        self._free = []
+        self._loading.clear()
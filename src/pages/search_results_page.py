@@ -1,9 +1,15 @@
 import re
 import time
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
 
+from bs4 import SoupStrainer
 from selenium.webdriver.common.by import By
 
+from src.config import Config
 from src.pages.base_page import BasePage
+from src.parsing import find_all, node_attr
+from src.search_api import SearchApiCapture
+from src.search_filters import search_params
 from src.utils import extract_text_safe
 
 
@@ -15,62 +21,304 @@ class SearchResultsPage(BasePage):
     datos básicos de cada card de producto.
     """
 
-    BASE_URL = "https://www.wallapop.com"
-
     # ── Selectores propios de esta página ───────────────────
     ITEM_CARD = (By.CSS_SELECTOR, "a[href*='/item/']")
     CARD_HREF_RE = re.compile(r'/item/')
+    READY_LOCATORS = (ITEM_CARD,)
+
+    # Captura acotada: solo los cards (tras un scroll largo el DOM pesa varios MB)
+    ROOT_CONTAINER = ITEM_CARD[1]
+    PARSE_ONLY = SoupStrainer('a', href=CARD_HREF_RE)
 
     # Patrones de clase para campos dentro del card
     CARD_TITLE_PATTERN = "ItemCard__title"
     CARD_PRICE_PATTERN = "ItemCard__price"
     CARD_LOCATION_PATTERN = ["location", "distance"]
 
-    # Configuración de scroll
-    SCROLL_PAUSE = 5        # Segundos de espera tras cada scroll
-    MAX_SCROLL_RETRIES = 3  # Scrolls consecutivos sin nuevos items antes de parar
+    # Configuración de scroll adaptativo
+    SCROLL_POLL = 0.25          # Segundos entre sondeos del nº de cards
+    SCROLL_IDLE_TIMEOUT = 1.0   # Espera inicial a que aparezcan cards tras un scroll
+    SCROLL_IDLE_MAX = 8.0       # Tope de la espera (se duplica en cada scroll sin novedades)
+    MAX_SCROLL_RETRIES = 3      # Scrolls consecutivos sin nuevos items antes de parar
+
+    # Captura de las respuestas de la API de búsqueda (ver capture_search_api)
+    api_capture = None
+
+    _JS_COUNT_CARDS = "return document.querySelectorAll(arguments[0]).length;"
+    _JS_SCROLL_BOTTOM = "window.scrollTo(0, document.body.scrollHeight);"
+    # Devuelve {href, title, price, location} de cada card desde arguments[1].
+    # arguments[2] trae, por campo, los patrones de clase a probar en orden.
+    _JS_READ_CARDS = """
+        var patterns = arguments[2];
+        function pick(card, list) {
+            for (var i = 0; i < list.length; i++) {
+                var el = card.querySelector('[class*="' + list[i] + '"]');
+                if (el) {
+                    var text = el.textContent.replace(/\\s+/g, ' ').trim();
+                    if (text) return text;
+                }
+            }
+            return null;
+        }
+        return Array.from(document.querySelectorAll(arguments[0]))
+            .slice(arguments[1])
+            .map(function (a) {
+                return {
+                    href: a.getAttribute('href'),
+                    title: pick(a, patterns.title),
+                    price: pick(a, patterns.price),
+                    location: pick(a, patterns.location)
+                };
+            });
+    """
+    _JS_CARD_HREFS = """
+        return Array.from(document.querySelectorAll(arguments[0]))
+            .slice(arguments[1])
+            .map(function (a) { return a.getAttribute('href'); });
+    """
+
+    @staticmethod
+    def site_url():
+        """Config.BASE_URL sin la barra final, para anteponerlo a rutas."""
+        return Config.BASE_URL.rstrip('/')
+
+    def _absolute_url(self, href):
+        if href.startswith('/'):
+            return f"{self.site_url()}{href}"
+        return href
+
+    @classmethod
+    def build_url(cls, query, filters=None):
+        """URL de resultados de una query con los filtros aplicados en el servidor."""
+        return f"{cls.site_url()}{Config.SEARCH_PATH}?{urlencode(search_params(query, filters))}"
+
+    def capture_search_api(self):
+        """Empieza a leer los items de la API de búsqueda (src.search_api).
+
+        Llamar antes de navegar a los resultados. Sin log de rendimiento
+        en el driver no hace nada y el listado se lee del DOM.
+
+        Returns:
+            True si la captura quedó activa.
+        """
+        self.api_capture = SearchApiCapture.start(self.driver)
+        return self.api_capture is not None
+
+    def open(self, query, filters=None):
+        """Navega directamente a los resultados, sin pasar por la home."""
+        url = self.build_url(query, filters)
+        self.logger.info(f"Abriendo resultados: {url}")
+        self.wait_until_ready(self.navigate(url))
+
+    def apply_params(self, params):
+        """Recarga la búsqueda actual con estos parámetros de URL.
+
+        Returns:
+            False si la URL ya los tenía (no recarga), True si recargó.
+        """
+        parts = urlparse(self.driver.current_url)
+        current = dict(parse_qsl(parts.query))
+        params = {k: str(v) for k, v in params.items()}
+        if all(current.get(k) == v for k, v in params.items()):
+            return False
+        current.update(params)
+        url = urlunparse(parts._replace(query=urlencode(current)))
+        if self.api_capture is not None:
+            # Las respuestas de la búsqueda sin estos parámetros ya no valen
+            self.api_capture.reset()
+        # Con carga eager/none la pestaña puede seguir en la búsqueda anterior
+        self.wait_until_ready(self.navigate(url))
+        return True
+
+    def apply_filters(self, query, filters):
+        """Aplica filtros a la búsqueda ya abierta (flujo por la home)."""
+        params = search_params(query, filters)
+        params.pop('keywords')
+        if params:
+            self.logger.info("Aplicando filtros de búsqueda...")
+            self.apply_params(params)
+
+    def sort_by_newest(self):
+        """Recarga la búsqueda actual ordenada por más recientes primero."""
+        if self.apply_params({'order_by': 'newest'}):
+            self.logger.info("Resultados ordenados por más recientes.")
 
-    def _scroll_to_load_all(self, max_items=None):
-        """Hace scroll hasta el final de la página para cargar todos los resultados.
+    def _card_urls(self, start):
+        """URLs absolutas de los cards desde la posición `start` del DOM."""
+        hrefs = self.driver.execute_script(self._JS_CARD_HREFS, self.ITEM_CARD[1], start) or []
+        return [self._absolute_url(h) for h in hrefs if h]
+
+    def _count_cards(self):
+        """Cuenta los cards en el DOM sin traer los elementos por WebDriver."""
+        return int(self.driver.execute_script(self._JS_COUNT_CARDS, self.ITEM_CARD[1]) or 0)
+
+    def _wait_for_more_cards(self, prev_count, timeout):
+        """Sondea el nº de cards hasta que supere prev_count o venza el timeout."""
+        deadline = time.monotonic() + timeout
+        while True:
+            count = self._count_cards()
+            if count > prev_count or time.monotonic() >= deadline:
+                return count
+            time.sleep(self.SCROLL_POLL)
+
+    def _scroll_batches(self, read_batch, max_items=None, known_urls=None, stop_after_known=None,
+                        drain=None):
+        """Hace scroll por los resultados y genera los cards nuevos de cada paso.
 
         Wallapop usa scroll infinito: al llegar al fondo se cargan más items.
-        Dejamos de hacer scroll cuando no aparecen items nuevos tras varios intentos,
-        o cuando alcanzamos max_items.
+        Tras cada scroll se sondea el nº de cards y se sigue en cuanto crece,
+        así que la espera la marca la respuesta real del sitio. Si no crece,
+        la espera se duplica (SCROLL_IDLE_TIMEOUT → SCROLL_IDLE_MAX) y se para
+        tras MAX_SCROLL_RETRIES scrolls sin novedades o al alcanzar max_items.
+
+        Con known_urls y stop_after_known (resultados por más recientes),
+        se para también al ver stop_after_known cards seguidos ya conocidos:
+        a partir de ahí todo lo que queda por cargar es más antiguo.
+
+        Args:
+            read_batch: Callable(start) -> lista de dicts (con 'url') de los
+                cards desde la posición start, o None si no hace falta leerlos.
+            drain: Callable() -> items nuevos de la API de búsqueda, o None.
+                Se llama en cada paso de scroll; si trae items, los cards
+                cargados hasta ese momento se dan por leídos y el DOM solo
+                se lee en los pasos en que la API no trae nada.
+
+        Deja en self.scroll_stats el nº de cards, los nuevos y los segundos
+        de cada scroll.
         """
-        prev_count = 0
-        retries = 0
+        self.scroll_stats = []
+        count = self._count_cards()
+        idle = 0
+        checked = 0      # Cards del DOM ya leídos (offset para read_batch)
+        api_items = 0    # Items recibidos de la API (no son posiciones del DOM)
+        known_run = 0
 
         while True:
-            # Contar items actuales
-            cards = self.driver.find_elements(*self.ITEM_CARD)
-            current_count = len(cards)
+            self.logger.info(f"Scroll: {count} items cargados...")
+
+            batch = drain() if drain is not None else None
+            if batch:
+                api_items += len(batch)
+                checked = max(checked, count)
+                self.logger.info(f"Listado: {len(batch)} items de la API de búsqueda ({api_items} en total)")
+            elif count > checked:
+                batch = read_batch(checked)
+                checked = count if batch is None else checked + len(batch)
+            else:
+                batch = None
+
+            if batch:
+                yield batch
 
-            self.logger.info(f"Scroll: {current_count} items cargados...")
+                # Si los últimos cards cargados ya los conocemos, parar
+                if known_urls and stop_after_known:
+                    for card in batch:
+                        known_run = known_run + 1 if card['url'] in known_urls else 0
+                    if known_run >= stop_after_known:
+                        self.logger.info(f"{known_run} items conocidos seguidos. Fin de items nuevos.")
+                        return
 
             # Si ya tenemos suficientes items, parar
-            if max_items and current_count >= max_items:
+            if max_items and count >= max_items:
                 self.logger.info(f"Alcanzado máximo de {max_items} items.")
-                break
+                return
+
+            timeout = min(self.SCROLL_IDLE_TIMEOUT * (2 ** idle), self.SCROLL_IDLE_MAX)
+            started = time.monotonic()
+            self.driver.execute_script(self._JS_SCROLL_BOTTOM)
+            new_count = self._wait_for_more_cards(count, timeout)
+            elapsed = time.monotonic() - started
+            self.scroll_stats.append({
+                'cards': new_count,
+                'new': new_count - count,
+                'seconds': round(elapsed, 2),
+            })
+            self.logger.info(f"Scroll: +{new_count - count} items en {elapsed:.2f}s")
 
             # Si cargaron nuevos items, resetear retries
-            if current_count > prev_count:
-                retries = 0
-                prev_count = current_count
+            if new_count > count:
+                idle = 0
+                count = new_count
             else:
-                retries += 1
-                if retries >= self.MAX_SCROLL_RETRIES:
+                idle += 1
+                if idle >= self.MAX_SCROLL_RETRIES:
                     self.logger.info("No se encontraron más items tras varios scrolls. Fin de resultados.")
+                    return
+
+    def _scroll_to_load_all(self, max_items=None, known_urls=None, stop_after_known=None):
+        """Hace scroll hasta cargar todos los resultados (ver _scroll_batches)."""
+        if known_urls and stop_after_known:
+            def read_batch(start):
+                return [{'url': url} for url in self._card_urls(start)]
+        else:
+            def read_batch(start):
+                return None
+        for _ in self._scroll_batches(read_batch, max_items, known_urls, stop_after_known):
+            pass
+
+    def _read_cards(self, start):
+        """Lee en una sola llamada los datos de los cards desde `start`."""
+        cards = self.driver.execute_script(
+            self._JS_READ_CARDS, self.ITEM_CARD[1], start, {
+                'title': [self.CARD_TITLE_PATTERN],
+                'price': [self.CARD_PRICE_PATTERN],
+                'location': list(self.CARD_LOCATION_PATTERN),
+            }
+        ) or []
+        items = []
+        for card in cards:
+            items.append({
+                'url': self._absolute_url(card.get('href') or ''),
+                'title': card.get('title') or "No disponible",
+                'price': card.get('price') or "No disponible",
+                'location': card.get('location') or "pending",
+                'description': 'pending',
+            })
+        return items
+
+    def iter_item_batches(self, max_items=None, known_urls=None, stop_after_known=None):
+        """Genera los items por lotes a medida que el scroll los va cargando.
+
+        Cada lote son solo los cards nuevos de ese paso de scroll, leídos
+        con un snippet JS (sin page_source ni BeautifulSoup), así que quien
+        consume puede empezar a enriquecer los primeros mientras sigue el
+        scroll. Mismos argumentos y formato de item que extract_items.
+
+        Con capture_search_api() activo, los lotes salen de las respuestas
+        JSON de la API (precio numérico, imágenes, fechas...) y solo se
+        leen los cards del DOM cuando no se ha capturado ninguna nueva.
+        """
+        self.logger.info("Extrayendo listado incremental...")
+        self.wait_for_all_elements(self.ITEM_CARD)
+        seen = set()
+        drain = self.api_capture.drain if self.api_capture is not None else None
+        for cards in self._scroll_batches(self._read_cards, max_items, known_urls, stop_after_known, drain):
+            batch = []
+            for item in cards:
+                if max_items and len(seen) >= max_items:
                     break
+                if not item['url'] or item['url'] in seen:
+                    continue
+                seen.add(item['url'])
+                batch.append(item)
+            if batch:
+                yield batch
+            if max_items and len(seen) >= max_items:
+                return
 
-            # Scroll al fondo de la página
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(self.SCROLL_PAUSE)
+    def iter_items(self, max_items=None, known_urls=None, stop_after_known=None):
+        """Como iter_item_batches, pero item a item."""
+        for batch in self.iter_item_batches(max_items, known_urls, stop_after_known):
+            yield from batch
 
-    def extract_items(self, max_items=None):
+    def extract_items(self, max_items=None, known_urls=None, stop_after_known=None):
         """Extrae la lista de items de los resultados, haciendo scroll para cargar todos.
 
         Args:
             max_items: Número máximo de items a extraer (None para todos).
+            known_urls: Set de URLs ya guardadas para esta búsqueda.
+            stop_after_known: Deja de hacer scroll tras esta racha de items
+                conocidos seguidos (requiere orden por más recientes).
 
         Returns:
             Lista de dicts con keys: url, title, price, location, description.
@@ -82,10 +330,10 @@ class SearchResultsPage(BasePage):
         self.wait_for_all_elements(self.ITEM_CARD)
 
         # Scroll para cargar más resultados
-        self._scroll_to_load_all(max_items)
+        self._scroll_to_load_all(max_items, known_urls, stop_after_known)
 
         soup = self.get_soup()
-        cards = soup.find_all('a', href=self.CARD_HREF_RE)
+        cards = find_all(soup, 'a', href=self.CARD_HREF_RE)
         self.logger.info(f"Encontrados {len(cards)} items en total.")
 
         for idx, card in enumerate(cards, 1):
@@ -93,12 +341,11 @@ class SearchResultsPage(BasePage):
                 break
 
             try:
-                url = card.get('href')
+                url = node_attr(card, 'href')
                 if not url:
                     continue
 
-                if url.startswith('/'):
-                    url = f"{self.BASE_URL}{url}"
+                url = self._absolute_url(url)
 
                 items_data.append({
                     'url': url,
@@ -0,0 +1,108 @@
+"""
+Parseo de HTML fuera del proceso principal.
+
+Parsear un detalle (árbol HTML + extractores) es CPU puro en Python: en
+el thread que maneja Chrome retrasa la siguiente navegación, y en
+main_server.py compite por el GIL con la API de FastAPI. ParsePool
+manda las funciones de parseo puras (HTML en string, dicts de vuelta,
+p.ej. src.pages.item_detail_page.parse_detail_html) a un
+ProcessPoolExecutor, así que el thread del driver solo navega y captura
+el HTML, y la API sigue respondiendo durante los scrapes grandes.
+
+Los workers se arrancan con "spawn" (no heredan los threads, locks ni
+Chromes del proceso padre) y solo al primer uso. Con
+Config.PARSE_PROCESSES = 0, o si el pool se rompe, se parsea en el
+mismo thread como antes.
+"""
+
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class ParsePool:
+    """Ejecuta funciones de parseo en un pool de procesos.
+
+    Args:
+        processes: Procesos del pool (0 = en el thread del llamador).
+    """
+
+    def __init__(self, processes=2):
+        self.processes = max(0, processes)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def offloads(self):
+        """True si el parseo sale del proceso (hay workers y el pool no se ha roto)."""
+        return self.processes > 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _fall_back_inline(self, error):
+        logger.warning("Pool de parseo roto, se parsea en el proceso principal: %s", error)
+        self.processes = 0
+        self.close()
+
+    def submit(self, fn, *args):
+        """Lanza fn(*args) en un worker y devuelve su Future (no bloquea).
+
+        fn debe ser una función de módulo (se serializa por nombre). Sin
+        workers se ejecuta aquí mismo y el Future vuelve ya resuelto.
+        """
+        if self.offloads:
+            try:
+                return self._get_executor().submit(fn, *args)
+            except (BrokenProcessPool, RuntimeError, OSError) as e:
+                self._fall_back_inline(e)
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def run(self, fn, *args):
+        """Ejecuta fn(*args) en un worker y espera el resultado.
+
+        El thread que espera suelta el GIL mientras tanto. Si el pool se
+        rompe a mitad, se repite en el proceso principal.
+        """
+        try:
+            return self.submit(fn, *args).result()
+        except BrokenProcessPool as e:
+            self._fall_back_inline(e)
+            return fn(*args)
+
+    def close(self):
+        """Para los workers (el pool se vuelve a crear si se usa de nuevo)."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_parse_pool():
+    """Devuelve el ParsePool compartido por todos los scrapers del proceso."""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = ParsePool(processes=Config.PARSE_PROCESSES)
+        return _shared_pool
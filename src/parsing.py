@@ -0,0 +1,213 @@
+"""
+Backends de parseo HTML y búsquedas precompiladas.
+
+Las páginas pueden parsearse con dos backends (Config.HTML_PARSER):
+
+  - "lxml": árbol nativo de lxml.html (C). Parsea un orden de magnitud
+    más rápido que BeautifulSoup y las búsquedas son XPath compiladas.
+  - "html.parser": BeautifulSoup con el parser de Python puro. Siempre
+    disponible; es el fallback si lxml no está instalado.
+
+"auto" usa lxml si está instalado. Los Page Objects y extractores no
+tocan el árbol directamente sino a través de las funciones de este
+módulo (find_first, find_all, select_first_by_class, node_text...), que
+aceptan nodos de cualquiera de los dos backends.
+"""
+
+import logging
+from functools import lru_cache
+
+from bs4 import BeautifulSoup, Tag
+
+from src.config import Config
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # pragma: no cover - lxml es opcional
+    lxml = None
+    etree = None
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("lxml", "html.parser")
+
+
+def available_backends():
+    """Backends instalados, en orden de preferencia."""
+    return BACKENDS if lxml is not None else ("html.parser",)
+
+
+def resolve_backend(backend=None):
+    """Traduce None/"auto" al mejor backend instalado; avisa si el pedido no está."""
+    backend = backend or Config.HTML_PARSER
+    available = available_backends()
+    if backend == "auto":
+        return available[0]
+    if backend not in available:
+        logger.warning("Parser '%s' no disponible, se usa html.parser", backend)
+        return "html.parser"
+    return backend
+
+
+def parse_html(html, backend=None, parse_only=None):
+    """Parsea HTML con el backend configurado y devuelve la raíz del árbol.
+
+    Args:
+        parse_only: SoupStrainer opcional (solo backend html.parser).
+    """
+    if resolve_backend(backend) == "lxml":
+        if not html or not html.strip():
+            html = "<html></html>"
+        try:
+            return lxml.html.document_fromstring(html)
+        except ValueError:
+            # Strings con declaración de encoding: lxml los exige en bytes
+            return lxml.html.document_fromstring(html.encode("utf-8"))
+    return BeautifulSoup(html, "html.parser", parse_only=parse_only)
+
+
+def _is_lxml(node):
+    return etree is not None and isinstance(node, etree._Element)
+
+
+# ── Búsquedas por tag y atributos ───────────────────────────
+
+@lru_cache(maxsize=None)
+def _xpath_tag(tag, exact_attrs, present_attrs, first):
+    """XPath compilada: descendientes `tag` con atributos exactos/presentes."""
+    predicates = "".join(f"[@{name}=$v{i}]" for i, name in enumerate(exact_attrs))
+    predicates += "".join(f"[@{name}]" for name in present_attrs)
+    return etree.XPath(f"descendant::{tag or '*'}{predicates}{'[1]' if first else ''}")
+
+
+def _lxml_find(node, tag, attrs, first):
+    exact = {k: v for k, v in attrs.items() if isinstance(v, str)}
+    patterns = {k: v for k, v in attrs.items() if not isinstance(v, str)}
+    xpath = _xpath_tag(tag, tuple(exact), tuple(patterns), first and not patterns)
+    found = xpath(node, **{f"v{i}": v for i, v in enumerate(exact.values())})
+    if patterns:
+        found = [el for el in found if all(p.search(el.get(k)) for k, p in patterns.items())]
+    return found
+
+
+def find_first(node, tag=None, **attrs):
+    """Primer descendiente con ese tag y atributos (valores exactos), o None."""
+    if _is_lxml(node):
+        found = _lxml_find(node, tag, attrs, first=True)
+        return found[0] if found else None
+    return node.find(tag, attrs=attrs)
+
+
+def find_all(node, tag=None, **attrs):
+    """Descendientes con ese tag y atributos (valor exacto o regex compilada)."""
+    if _is_lxml(node):
+        return _lxml_find(node, tag, attrs, first=False)
+    return node.find_all(tag, attrs=attrs)
+
+
+# ── Búsqueda por substring de clase ─────────────────────────
+
+@lru_cache(maxsize=None)
+def _class_xpath(tags, ignore_case):
+    """XPath compilada una vez por combinación; el patrón va como variable."""
+    step = "*"
+    if tags:
+        step += "[" + " or ".join(f"self::{t}" for t in tags) + "]"
+    attr = "translate(@class, $upper, $lower)" if ignore_case else "@class"
+    return etree.XPath(f"descendant::{step}[contains({attr}, $pattern)][1]")
+
+
+_UPPER = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+@lru_cache(maxsize=None)
+def _class_matcher(pattern, tags, ignore_case):
+    """Predicado precompilado para un patrón (backend BeautifulSoup)."""
+    needle = pattern.lower() if ignore_case else pattern
+
+    def matches(tag):
+        if tags and tag.name not in tags:
+            return False
+        classes = tag.attrs.get("class")
+        if not classes:
+            return False
+        if ignore_case:
+            return any(needle in c.lower() for c in classes)
+        return any(needle in c for c in classes)
+
+    return matches
+
+
+def _select_bs4(node, pattern, tags, ignore_case):
+    matches = _class_matcher(pattern, tags, ignore_case)
+    for tag in node.descendants:
+        if isinstance(tag, Tag) and matches(tag):
+            return tag
+    return None
+
+
+def _select_lxml(node, pattern, tags, ignore_case):
+    xpath = _class_xpath(tags, ignore_case)
+    if ignore_case:
+        found = xpath(node, pattern=pattern.lower(), upper=_UPPER, lower=_UPPER.lower())
+    else:
+        found = xpath(node, pattern=pattern)
+    return found[0] if found else None
+
+
+def select_first_by_class(node, patterns, tags=None, ignore_case=False):
+    """Primer elemento (en orden del documento) cuyas clases contengan el patrón.
+
+    Args:
+        patterns: String o lista de strings, probados en orden de prioridad.
+        tags: Tupla opcional de nombres de tag admitidos (hashable: se cachea).
+        ignore_case: Comparar sin distinguir mayúsculas.
+    """
+    if isinstance(patterns, str):
+        patterns = (patterns,)
+    select = _select_lxml if _is_lxml(node) else _select_bs4
+    for pattern in patterns:
+        found = select(node, pattern, tags, ignore_case)
+        if found is not None:
+            return found
+    return None
+
+
+# ── Contenido de nodos ──────────────────────────────────────
+
+# Como en BeautifulSoup, el texto de estos tags no cuenta como texto visible
+_NON_TEXT_TAGS = {"script", "style", "template", "rt", "rp"}
+
+
+def _lxml_strings(node, root=True):
+    # Los comentarios tienen tag no-string: solo cuenta su tail
+    if isinstance(node.tag, str) and node.tag not in _NON_TEXT_TAGS and node.text:
+        yield node.text
+    for child in node:
+        yield from _lxml_strings(child, root=False)
+    if not root and node.tail:
+        yield node.tail
+
+
+def node_text(node):
+    """Texto del nodo: fragmentos sin espacios sobrantes unidos por un espacio."""
+    if _is_lxml(node):
+        parts = (t.strip() for t in _lxml_strings(node))
+        return " ".join(p for p in parts if p)
+    return node.get_text(separator=" ", strip=True)
+
+
+def node_attr(node, name, default=None):
+    """Valor de un atributo (string) del nodo."""
+    value = node.get(name, default)
+    if isinstance(value, list):  # BeautifulSoup devuelve class como lista
+        value = " ".join(value)
+    return value
+
+
+def script_content(node):
+    """Contenido crudo de un <script> (JSON-LD, estado de la app...)."""
+    if _is_lxml(node):
+        return node.text or ""
+    return node.string or node.get_text() or ""
@@ -0,0 +1,277 @@
+"""
+Seguimiento del árbol de procesos de cada driver de Chrome.
+
+Cada driver registra sus PIDs raíz (chromedriver y navegador) y se
+guarda una instantánea de sus descendientes leída de /proc. Al cerrarlo
+se matan solo los procesos de ese árbol que sobrevivan a driver.quit(),
+en lugar de un `pkill -f chrome` que tumbaría los Chromes de otros
+scrapes en curso. Un reaper periódico limpia los árboles de drivers que
+desaparecieron sin cerrarse y, con el árbol ya muerto, libera su perfil
+persistente (src.profiles).
+
+Los procesos se identifican por (pid, starttime) para no matar un PID
+reciclado por el sistema. Sin /proc (Windows, macOS) todo es no-op.
+"""
+
+import os
+import time
+import signal
+import logging
+import threading
+import weakref
+
+from src.profiles import profile_lease, release_profile
+
+logger = logging.getLogger(__name__)
+
+PROC_DIR = "/proc"
+
+
+# ── Lectura de /proc ────────────────────────────────────────
+
+def _read_stat(pid):
+    """Devuelve (state, ppid, starttime) de un PID, o None si no existe."""
+    try:
+        with open(os.path.join(PROC_DIR, str(pid), "stat"), "r") as f:
+            data = f.read()
+    except (OSError, ValueError):
+        return None
+    # El nombre (campo 2) puede contener espacios y paréntesis
+    rest = data[data.rindex(")") + 2:].split()
+    return rest[0], int(rest[1]), int(rest[19])
+
+
+def list_processes():
+    """Devuelve {pid: (ppid, starttime)} de los procesos visibles."""
+    procs = {}
+    try:
+        entries = os.listdir(PROC_DIR)
+    except OSError:
+        return procs
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        stat = _read_stat(int(entry))
+        if stat:
+            procs[int(entry)] = (stat[1], stat[2])
+    return procs
+
+
+def process_tree(root_pids):
+    """Devuelve {pid: starttime} de las raíces vivas y todos sus descendientes."""
+    procs = list_processes()
+    children = {}
+    for pid, (ppid, _) in procs.items():
+        children.setdefault(ppid, []).append(pid)
+
+    tree = {}
+    pending = [pid for pid in root_pids if pid in procs]
+    while pending:
+        pid = pending.pop()
+        if pid in tree:
+            continue
+        tree[pid] = procs[pid][1]
+        pending.extend(children.get(pid, []))
+    return tree
+
+
+def is_alive(pid, starttime):
+    """True si el proceso sigue vivo y es el mismo (no un PID reciclado)."""
+    stat = _read_stat(pid)
+    return bool(stat and stat[2] == starttime and stat[0] not in ("Z", "X"))
+
+
+def kill_processes(procs, timeout=3.0):
+    """Termina los procesos dados (SIGTERM y, si no basta, SIGKILL).
+
+    Args:
+        procs: {pid: starttime}.
+
+    Returns:
+        Número de procesos que hubo que matar.
+    """
+    alive = {pid: st for pid, st in procs.items() if is_alive(pid, st)}
+    count = len(alive)
+    if not alive:
+        return 0
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        for pid in alive:
+            try:
+                os.kill(pid, sig)
+            except (ProcessLookupError, PermissionError):
+                pass
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            alive = {pid: st for pid, st in alive.items() if is_alive(pid, st)}
+            if not alive:
+                break
+            time.sleep(0.05)
+        if not alive:
+            break
+    return count
+
+
+def rss_bytes(procs):
+    """Suma el RSS (bytes) de los procesos dados leyendo /proc/<pid>/statm."""
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total = 0
+    for pid in procs:
+        try:
+            with open(os.path.join(PROC_DIR, str(pid), "statm"), "r") as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, ValueError, IndexError):
+            continue
+    return total
+
+
+# ── Tracker ─────────────────────────────────────────────────
+
+def _root_pids(driver):
+    """PIDs raíz de un driver: proceso de chromedriver y del navegador."""
+    pids = []
+    service = getattr(driver, "service", None)
+    process = getattr(service, "process", None)
+    pid = getattr(process, "pid", None)
+    if isinstance(pid, int):
+        pids.append(pid)
+    browser_pid = getattr(driver, "browser_pid", None)
+    if isinstance(browser_pid, int):
+        pids.append(browser_pid)
+    return pids
+
+
+class ProcessTracker:
+    """Registro de los árboles de procesos de los drivers vivos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # id(driver) -> {'ref', 'roots', 'procs', 'lease'}
+
+    def register(self, driver):
+        """Empieza a seguir el árbol de procesos de un driver."""
+        roots = _root_pids(driver)
+        try:
+            ref = weakref.ref(driver)
+        except TypeError:
+            ref = None
+        with self._lock:
+            self._entries[id(driver)] = {
+                'ref': ref, 'roots': roots, 'procs': process_tree(roots),
+                # Sin referencia fuerte al driver: el reaper libera el perfil si se pierde
+                'lease': profile_lease(driver),
+            }
+
+    def _refresh(self, entry):
+        """Añade a la instantánea los descendientes nuevos (pestañas, renderers...)."""
+        # Solo se parte de procesos que siguen siendo los mismos (PID no reciclado)
+        seeds = [pid for pid, st in entry['procs'].items() if is_alive(pid, st)]
+        entry['procs'].update(process_tree(seeds))
+
+    def pids(self, driver):
+        """Devuelve {pid: starttime} actual del árbol del driver."""
+        with self._lock:
+            entry = self._entries.get(id(driver))
+            if not entry:
+                return {}
+            self._refresh(entry)
+            return {pid: st for pid, st in entry['procs'].items() if is_alive(pid, st)}
+
+    def release(self, driver):
+        """Deja de seguir un driver y devuelve su árbol para matarlo."""
+        with self._lock:
+            entry = self._entries.pop(id(driver), None)
+            if not entry:
+                return {}
+            self._refresh(entry)
+            return entry['procs']
+
+    def tracked(self):
+        with self._lock:
+            return len(self._entries)
+
+    def reap(self):
+        """Mata los árboles huérfanos y devuelve cuántos procesos eliminó.
+
+        Es huérfano el árbol de un driver que fue recolectado sin quit()
+        o cuyo chromedriver/navegador raíz ha muerto dejando hijos vivos.
+        Su perfil persistente se libera después de matar el árbol.
+        """
+        orphaned = []
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                gone = entry['ref'] is not None and entry['ref']() is None
+                roots_dead = entry['roots'] and not any(
+                    is_alive(pid, entry['procs'][pid])
+                    for pid in entry['roots'] if pid in entry['procs']
+                )
+                if gone or roots_dead:
+                    orphaned.append((key, self._entries.pop(key)))
+                else:
+                    self._refresh(entry)
+        killed = 0
+        for key, entry in orphaned:
+            killed += kill_processes(entry['procs'])
+            if not entry['lease']:
+                continue
+            if any(is_alive(pid, st) for pid, st in entry['procs'].items()):
+                # Sigue vivo algo del árbol: se reintenta en la próxima pasada
+                with self._lock:
+                    self._entries.setdefault(key, entry)
+            else:
+                entry['lease'].release()
+        if killed:
+            logger.warning("Reaper: eliminados %d procesos de Chrome huérfanos", killed)
+        return killed
+
+
+tracker = ProcessTracker()
+
+
+def driver_rss_mb(driver):
+    """RSS total (MB) del árbol de procesos del driver, o None si no se sigue.
+
+    Es una suma de RSS por proceso: la memoria compartida entre procesos
+    de Chrome cuenta varias veces, así que es una cota superior.
+    """
+    procs = tracker.pids(driver)
+    if not procs:
+        return None
+    return round(rss_bytes(procs) / (1024 * 1024), 1)
+
+
+def quit_driver(driver):
+    """Cierra un driver y mata solo los procesos de su árbol que sobrevivan."""
+    procs = tracker.release(driver)
+    try:
+        driver.quit()
+    except Exception:
+        pass
+    leftovers = kill_processes(procs)
+    if leftovers:
+        logger.info("Eliminados %d procesos residuales del driver", leftovers)
+    # Con el árbol ya muerto, el perfil persistente puede usarlo otro driver
+    release_profile(driver)
+
+
+_reaper_thread = None
+_reaper_lock = threading.Lock()
+
+
+def start_reaper(interval=60):
+    """Lanza (una sola vez) un thread daemon que ejecuta tracker.reap() periódicamente."""
+    global _reaper_thread
+    with _reaper_lock:
+        if _reaper_thread and _reaper_thread.is_alive():
+            return _reaper_thread
+
+        def _loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    tracker.reap()
+                except Exception as e:
+                    logger.error("Error en el reaper de procesos: %s", e)
+
+        _reaper_thread = threading.Thread(target=_loop, daemon=True, name="chrome-reaper")
+        _reaper_thread.start()
+        return _reaper_thread
@@ -0,0 +1,148 @@
+"""
+Perfiles de Chrome persistentes y reutilizables entre ejecuciones.
+
+Con un user-data-dir fijo sobreviven entre ejecuciones las cookies de
+consentimiento (el banner de consentmanager no vuelve a salir) y la
+caché HTTP de los estáticos de Wallapop, así que cada Chrome arranca
+caliente aunque el proceso sea nuevo.
+
+Hay Config.PROFILE_SLOTS directorios (slot-0, slot-1...) bajo
+Config.PROFILE_DIR. Cada driver toma el primer slot libre con un lock
+de fichero (flock), que se libera cuando su árbol de procesos está
+muerto (src.processes: quit_driver, o el reaper si el driver se perdió)
+o si el proceso muere, así que dos Chromes nunca comparten perfil, ni dentro del mismo
+proceso ni entre procesos (scheduler, CLI...). Si todos los slots están
+ocupados, el driver arranca con un perfil temporal como antes.
+"""
+
+import os
+import glob
+import logging
+import threading
+
+from src.config import Config
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+# Ficheros que Chrome deja en el perfil para impedir otra instancia; si el
+# Chrome anterior murió sin cerrarse se quedan y bloquearían el arranque
+_CHROME_SINGLETON_FILES = ("Singleton*", "lockfile")
+
+
+def _try_lock(fd):
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:  # pragma: no cover
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+class ProfileLease:
+    """Un slot de perfil tomado en exclusiva; release() lo deja libre."""
+
+    def __init__(self, slot, path, lock_path, fd):
+        self.slot = slot
+        self.path = path
+        self.lock_path = lock_path
+        self._fd = fd
+
+    def release(self):
+        if self._fd is None:
+            return
+        # Cerrar el descriptor suelta el flock
+        os.close(self._fd)
+        self._fd = None
+        _release_in_process(self.lock_path)
+        logger.info("Perfil %s liberado", self.path)
+
+    @property
+    def released(self):
+        return self._fd is None
+
+
+# flock es por descriptor: dentro del mismo proceso dos open() del mismo
+# fichero podrían tomar el lock a la vez, así que además se lleva la
+# cuenta de los slots ocupados en este proceso
+_in_process = set()
+_in_process_lock = threading.Lock()
+
+
+def _release_in_process(lock_path):
+    with _in_process_lock:
+        _in_process.discard(lock_path)
+
+
+def _clear_stale_singletons(path):
+    for pattern in _CHROME_SINGLETON_FILES:
+        for stale in glob.glob(os.path.join(path, pattern)):
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+
+def acquire_profile(base_dir=None, slots=None):
+    """Toma el primer slot de perfil libre.
+
+    Args:
+        base_dir: Directorio de los perfiles (por defecto Config.PROFILE_DIR).
+        slots: Número de slots (por defecto Config.PROFILE_SLOTS).
+
+    Returns:
+        ProfileLease, o None si todos los slots están ocupados.
+    """
+    base_dir = os.path.abspath(base_dir or Config.PROFILE_DIR)
+    slots = Config.PROFILE_SLOTS if slots is None else slots
+    os.makedirs(base_dir, exist_ok=True)
+
+    for slot in range(slots):
+        lock_path = os.path.join(base_dir, f"slot-{slot}.lock")
+        with _in_process_lock:
+            if lock_path in _in_process:
+                continue
+            _in_process.add(lock_path)
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        if not _try_lock(fd):
+            os.close(fd)
+            _release_in_process(lock_path)
+            continue
+        path = os.path.join(base_dir, f"slot-{slot}")
+        os.makedirs(path, exist_ok=True)
+        # Con el lock tomado ningún Chrome vivo usa este perfil
+        _clear_stale_singletons(path)
+        logger.info("Usando perfil persistente %s", path)
+        return ProfileLease(slot, path, lock_path, fd)
+
+    logger.warning("Los %d perfiles persistentes están en uso, se usa uno temporal", slots)
+    return None
+
+
+def attach_profile(driver, lease):
+    """Asocia un perfil al driver para liberarlo al cerrarlo (ver release_profile).
+
+    No se libera al recolectar el driver: su Chrome puede seguir vivo
+    usando el perfil hasta que el reaper mate el árbol.
+    """
+    driver._profile_lease = lease
+
+
+def profile_lease(driver):
+    """Devuelve el ProfileLease asociado al driver, o None."""
+    lease = getattr(driver, "_profile_lease", None)
+    return lease if isinstance(lease, ProfileLease) else None
+
+
+def release_profile(driver):
+    """Libera el perfil del driver, si tiene uno."""
+    lease = profile_lease(driver)
+    if lease:
+        lease.release()
@@ -0,0 +1,168 @@
+"""
+Rate limiter compartido por todo el proceso.
+
+Un token bucket por host del que tiran todos los scrapers (navegaciones
+Selenium), los workers de enriquecimiento y el fetcher HTTP. Así el
+ritmo total contra Wallapop está acotado aunque haya varios scrapes en
+paralelo, y un scrape solo no espera más de lo necesario.
+
+El ritmo se adapta (AIMD): ante errores o señales de bloqueo (captcha,
+403/429) se reduce multiplicativamente; tras una racha de éxitos vuelve
+a subir poco a poco hasta el ritmo configurado.
+"""
+
+import time
+import random
+import threading
+from urllib.parse import urlparse
+
+from src.config import Config
+
+
+class _Bucket:
+    """Estado del token bucket de un host."""
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.tokens = float(burst)
+        self.updated = now
+        self.successes = 0
+        self.waiting = 0
+        self.requests = 0
+        self.total_wait = 0.0
+        self.last_wait = 0.0
+        self.backoffs = 0
+
+
+class RateLimiter:
+    """Token bucket por host con jitter y ritmo adaptativo.
+
+    Args:
+        rate: Peticiones por segundo por host (ritmo máximo al que se vuelve).
+        burst: Peticiones que pueden salir seguidas sin esperar.
+        min_rate: Suelo del ritmo tras backoffs.
+        jitter: Fracción del intervalo (1/rate) que se añade al azar a cada espera.
+        backoff: Factor por el que se multiplica el ritmo ante un fallo.
+        recover_after: Éxitos seguidos necesarios para subir el ritmo.
+        recover_step: Factor de subida del ritmo tras recover_after éxitos.
+    """
+
+    def __init__(self, rate=1.0, burst=2, min_rate=0.1, jitter=0.5, backoff=0.5,
+                 recover_after=10, recover_step=1.25, clock=time.monotonic, sleep=time.sleep):
+        self.max_rate = rate
+        self.burst = burst
+        self.min_rate = min(min_rate, rate)
+        self.jitter = jitter
+        self.backoff = backoff
+        self.recover_after = recover_after
+        self.recover_step = recover_step
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._buckets: dict[str, _Bucket] = {}
+
+    @staticmethod
+    def _host(url):
+        return urlparse(url).netloc or url
+
+    def _bucket(self, host, now):
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = _Bucket(self.max_rate, self.burst, now)
+        return bucket
+
+    def _refill(self, bucket, now):
+        bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * bucket.rate)
+        bucket.updated = now
+
+    def acquire(self, url):
+        """Reserva un token del host de la URL, esperando si hace falta.
+
+        La reserva es inmediata (bajo lock) y la espera fuera del lock, así
+        que los llamadores concurrentes salen en orden y espaciados.
+
+        Returns:
+            Segundos esperados.
+        """
+        host = self._host(url)
+        with self._lock:
+            now = self._clock()
+            bucket = self._bucket(host, now)
+            self._refill(bucket, now)
+            bucket.tokens -= 1
+            wait = -bucket.tokens / bucket.rate if bucket.tokens < 0 else 0.0
+            if wait > 0:
+                wait += random.uniform(0, self.jitter / bucket.rate)
+            bucket.requests += 1
+            bucket.total_wait += wait
+            bucket.last_wait = wait
+            bucket.waiting += 1
+
+        try:
+            if wait > 0:
+                self._sleep(wait)
+        finally:
+            with self._lock:
+                bucket.waiting -= 1
+        return wait
+
+    def report_success(self, url):
+        """Anota un éxito; tras recover_after seguidos sube el ritmo."""
+        with self._lock:
+            bucket = self._bucket(self._host(url), self._clock())
+            bucket.successes += 1
+            if bucket.successes >= self.recover_after and bucket.rate < self.max_rate:
+                bucket.rate = min(self.max_rate, bucket.rate * self.recover_step)
+                bucket.successes = 0
+
+    def report_failure(self, url, blocked=False):
+        """Anota un error y reduce el ritmo del host.
+
+        Args:
+            blocked: Señal de bloqueo (captcha, 403/429). Además de bajar
+                el ritmo vacía el bucket para forzar una pausa.
+        """
+        with self._lock:
+            now = self._clock()
+            bucket = self._bucket(self._host(url), now)
+            self._refill(bucket, now)
+            bucket.rate = max(self.min_rate, bucket.rate * self.backoff)
+            bucket.successes = 0
+            bucket.backoffs += 1
+            if blocked:
+                bucket.tokens = min(bucket.tokens, 0.0) - self.burst
+
+    def metrics(self):
+        """Ritmo actual, tokens y esperas por host."""
+        with self._lock:
+            return {
+                host: {
+                    'rate': round(b.rate, 3),
+                    'max_rate': self.max_rate,
+                    'tokens': round(b.tokens, 2),
+                    'waiting': b.waiting,
+                    'requests': b.requests,
+                    'avg_wait': round(b.total_wait / b.requests, 3) if b.requests else 0.0,
+                    'last_wait': round(b.last_wait, 3),
+                    'backoffs': b.backoffs,
+                }
+                for host, b in self._buckets.items()
+            }
+
+
+_shared_limiter = None
+_shared_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Devuelve el RateLimiter compartido por todo el proceso."""
+    global _shared_limiter
+    with _shared_limiter_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter(
+                rate=Config.RATE_LIMIT_PER_HOST,
+                burst=Config.RATE_LIMIT_BURST,
+                min_rate=Config.RATE_LIMIT_MIN,
+                jitter=Config.RATE_LIMIT_JITTER,
+            )
+        return _shared_limiter
@@ -0,0 +1,486 @@
+"""
+Modo replay: scraping sin red sobre un corpus de HTML capturado.
+
+Sirve para medir cambios de rendimiento de forma reproducible:
+WallapopScraper.run se ejecuta de principio a fin contra páginas
+guardadas (capturar_html.py) con una latencia simulada fija, sin
+Chrome ni conexión.
+
+  - ReplayCorpus: las páginas capturadas (home, resultados, detalles).
+  - ReplayDriver: WebDriver falso que navega por el corpus. Emula los
+    snippets JS de los Page Objects (conteo y lectura de cards, scroll
+    infinito por páginas, captura acotada), las esperas por selector
+    CSS y varias pestañas con carga asíncrona.
+  - ReplayAdapter: transport adapter de requests para que el detalle
+    HTTP (HttpDetailFetcher) también se sirva del corpus.
+
+La latencia se modela como el tiempo hasta que la página está en el
+DOM: driver.get() la espera entera; una navegación lanzada por JS
+(pestañas) no bloquea y la página no aparece hasta que vence.
+"""
+
+import re
+import copy
+import glob
+import os
+import time
+import zlib
+import logging
+from urllib.parse import urlparse
+
+import lxml.html
+import requests
+from requests.adapters import BaseAdapter
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+
+from src.config import Config
+from src.pages import HomePage, SearchResultsPage
+from src.pages.base_page import BasePage
+from src.parsing import node_attr, node_text, select_first_by_class
+
+logger = logging.getLogger(__name__)
+
+KIND_HOME = "home"
+KIND_SEARCH = "search"
+KIND_DETAIL = "detail"
+
+_EMPTY_HTML = "<html><head></head><body></body></html>"
+_DEFAULT_HOME = (
+    '<html><head><title>Wallapop</title></head><body>'
+    '<div id="cmpwrapper"></div><input id="searchbox-form-input"></body></html>'
+)
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) ReplayDriver"
+
+
+# ── Selectores CSS ──────────────────────────────────────────
+
+_SIMPLE_SELECTOR = re.compile(r"^(?P<tag>[a-zA-Z][\w-]*|\*)?(?P<id>#[\w-]+)?(?P<attrs>(\[[^\]]+\])*)$")
+_ATTR_SELECTOR = re.compile(r"\[\s*([\w-]+)\s*(?:([*^$]?=)\s*(['\"])(.*?)\3)?\s*\]")
+
+
+def _literal(value):
+    return f'"{value}"' if '"' not in value else f"'{value}'"
+
+
+def css_to_xpath(selector):
+    """Traduce los selectores CSS simples que usan los Page Objects a XPath.
+
+    Admite tag, #id y [attr], [attr=v], [attr*=v], [attr^=v], [attr$=v]
+    combinados, y listas separadas por comas (sin combinadores).
+
+    Raises:
+        ValueError: si el selector usa algo no soportado.
+    """
+    parts = []
+    for simple in selector.split(","):
+        simple = simple.strip()
+        match = _SIMPLE_SELECTOR.match(simple)
+        if not simple or not match:
+            raise ValueError(f"Selector no soportado en replay: {selector!r}")
+        xpath = f"//{match.group('tag') or '*'}"
+        if match.group("id"):
+            xpath += f"[@id={_literal(match.group('id')[1:])}]"
+        for name, op, _, value in _ATTR_SELECTOR.findall(match.group("attrs")):
+            if not op:
+                xpath += f"[@{name}]"
+            elif op == "=":
+                xpath += f"[@{name}={_literal(value)}]"
+            elif op == "*=":
+                xpath += f"[contains(@{name}, {_literal(value)})]"
+            elif op == "^=":
+                xpath += f"[starts-with(@{name}, {_literal(value)})]"
+            else:
+                xpath += f"[substring(@{name}, string-length(@{name}) - {len(value) - 1}) = {_literal(value)}]"
+        parts.append(xpath)
+    return " | ".join(parts)
+
+
+def _locator_xpath(by, value):
+    if by == By.CSS_SELECTOR:
+        return css_to_xpath(value)
+    if by == By.TAG_NAME:
+        return f"//{value}"
+    if by == By.ID:
+        return f"//*[@id={_literal(value)}]"
+    if by == By.XPATH:
+        return value
+    raise ValueError(f"Localizador no soportado en replay: {by}")
+
+
+# ── Corpus ──────────────────────────────────────────────────
+
+def _read(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _slug(url):
+    return urlparse(url).path.rstrip("/").rsplit("/", 1)[-1]
+
+
+class ReplayCorpus:
+    """Páginas capturadas que sirve el replay.
+
+    Args:
+        search_html: HTML de resultados (se sirve para cualquier búsqueda).
+        details: Dict slug -> HTML de detalle. Un item sin página propia
+            recibe una de las capturadas, siempre la misma para su URL.
+        home_html: HTML de la home (opcional).
+    """
+
+    HOME_FILE = "01_inicio.html"
+    SEARCH_FILE = "02_busqueda.html"
+    DETAIL_FILES = ("03_detalle*.html", os.path.join("detalles", "*.html"))
+
+    def __init__(self, search_html, details, home_html=None):
+        if not details:
+            raise ValueError("El corpus necesita al menos una página de detalle")
+        self.home_html = home_html or _DEFAULT_HOME
+        self.search_html = search_html
+        self.details = dict(details)
+        self._detail_list = [self.details[k] for k in sorted(self.details)]
+        self._docs = {}
+
+    @classmethod
+    def from_dir(cls, path):
+        """Carga una carpeta de capturar_html.py (más detalles/<slug>.html si los hay)."""
+        details = {}
+        for pattern in cls.DETAIL_FILES:
+            for file in sorted(glob.glob(os.path.join(path, pattern))):
+                details[os.path.splitext(os.path.basename(file))[0]] = _read(file)
+        home = os.path.join(path, cls.HOME_FILE)
+        return cls(
+            search_html=_read(os.path.join(path, cls.SEARCH_FILE)),
+            details=details,
+            home_html=_read(home) if os.path.exists(home) else None,
+        )
+
+    @classmethod
+    def from_files(cls, search_file, detail_files, home_file=None):
+        details = {os.path.splitext(os.path.basename(f))[0]: _read(f) for f in detail_files}
+        return cls(_read(search_file), details, _read(home_file) if home_file else None)
+
+    def page(self, url):
+        """Devuelve (tipo, HTML) de la página que corresponde a la URL."""
+        path = urlparse(url).path
+        if path.startswith(Config.SEARCH_PATH):
+            return KIND_SEARCH, self.search_html
+        if "/item/" in path:
+            html = self.details.get(_slug(url))
+            if html is None:
+                html = self._detail_list[zlib.crc32(url.encode()) % len(self._detail_list)]
+            return KIND_DETAIL, html
+        return KIND_HOME, self.home_html
+
+    def document(self, url):
+        """Como page(), pero con el árbol lxml ya parseado (cacheado por HTML)."""
+        kind, html = self.page(url)
+        doc = self._docs.get(id(html))
+        if doc is None:
+            doc = self._docs[id(html)] = lxml.html.document_fromstring(html)
+        return kind, html, doc
+
+
+# ── Driver ──────────────────────────────────────────────────
+
+class ReplayElement:
+    """WebElement mínimo sobre un nodo lxml."""
+
+    def __init__(self, driver, node):
+        self._driver = driver
+        self._node = node
+        self._typed = ""
+
+    @property
+    def text(self):
+        return node_text(self._node)
+
+    @property
+    def tag_name(self):
+        return self._node.tag
+
+    def get_attribute(self, name):
+        return node_attr(self._node, name)
+
+    def is_displayed(self):
+        return True
+
+    def is_enabled(self):
+        return True
+
+    def click(self):
+        pass
+
+    def clear(self):
+        self._typed = ""
+
+    def send_keys(self, *values):
+        for value in values:
+            if value in (Keys.RETURN, Keys.ENTER):
+                # Enviar el buscador lleva a los resultados de lo escrito
+                self._driver.get(SearchResultsPage.build_url(self._typed))
+            else:
+                self._typed += value
+
+
+class _Tab:
+    def __init__(self, handle):
+        self.handle = handle
+        self.url = "about:blank"
+        self.kind = None
+        self.html = _EMPTY_HTML
+        self.doc = None
+        self.ready_at = 0.0
+        self.cards = []      # Cards del documento (solo resultados)
+        self.revealed = 0    # Cards ya "cargados" por el scroll infinito
+        self.reveal_at = None
+
+
+class _SwitchTo:
+    def __init__(self, driver):
+        self._driver = driver
+
+    def window(self, handle):
+        if handle not in self._driver._tabs:
+            raise WebDriverException(f"No existe la pestaña {handle}")
+        self._driver._current = handle
+
+    def new_window(self, type_hint=None):
+        self._driver._open_tab()
+
+
+class ReplayDriver:
+    """WebDriver falso que navega por un ReplayCorpus.
+
+    Args:
+        corpus: ReplayCorpus a servir.
+        latency: Segundos hasta que cada página está en el DOM.
+        scroll_latency: Segundos hasta que aparece la siguiente tanda de
+            cards tras un scroll (por defecto, latency).
+        page_size: Cards que carga cada tanda del scroll infinito.
+    """
+
+    def __init__(self, corpus, latency=0.0, scroll_latency=None, page_size=20,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.corpus = corpus
+        self.latency = latency
+        self.scroll_latency = latency if scroll_latency is None else scroll_latency
+        self.page_size = page_size
+        self._clock = clock
+        self._sleep = sleep
+        self._tabs = {}
+        self._next_handle = 0
+        self._current = self._open_tab()
+        self._quit = False
+        self.switch_to = _SwitchTo(self)
+        self.navigations = 0
+        scripts = {
+            "return 1": lambda tab, *a: 1,
+            "return document.readyState": lambda tab, *a: "complete" if self._loaded(tab) else "loading",
+            "return navigator.userAgent": lambda tab, *a: USER_AGENT,
+            "window.location.href = arguments[0];": self._js_navigate,
+            HomePage._JS_CLICK_ACCEPT_COOKIES: lambda tab, *a: True,
+            BasePage._JS_SCOPED_HTML: self._js_scoped_html,
+            SearchResultsPage._JS_COUNT_CARDS: lambda tab, selector: len(self._visible(tab, selector)),
+            SearchResultsPage._JS_SCROLL_BOTTOM: self._js_scroll,
+            SearchResultsPage._JS_CARD_HREFS: self._js_card_hrefs,
+            SearchResultsPage._JS_READ_CARDS: self._js_read_cards,
+        }
+        self._scripts = {script.strip(): handler for script, handler in scripts.items()}
+
+    # ── Pestañas ────────────────────────────────────────────
+
+    def _open_tab(self):
+        handle = f"replay-{self._next_handle}"
+        self._next_handle += 1
+        self._tabs[handle] = _Tab(handle)
+        self._current = handle
+        return handle
+
+    @property
+    def _tab(self):
+        if self._quit:
+            raise WebDriverException("El driver de replay está cerrado")
+        return self._tabs[self._current]
+
+    @property
+    def current_window_handle(self):
+        return self._tab.handle
+
+    @property
+    def window_handles(self):
+        return list(self._tabs)
+
+    def close(self):
+        del self._tabs[self._tab.handle]
+
+    def quit(self):
+        self._quit = True
+
+    # ── Navegación ──────────────────────────────────────────
+
+    def _navigate(self, tab, url):
+        tab.url = url
+        tab.kind, tab.html, tab.doc = self.corpus.document(url)
+        tab.ready_at = self._clock() + self.latency
+        tab.cards, tab.revealed, tab.reveal_at = [], 0, None
+        if tab.kind == KIND_SEARCH:
+            tab.cards = tab.doc.xpath(css_to_xpath(SearchResultsPage.ITEM_CARD[1]))
+            tab.revealed = min(self.page_size, len(tab.cards))
+        self.navigations += 1
+
+    def get(self, url):
+        tab = self._tab
+        self._navigate(tab, url)
+        if self.latency:
+            self._sleep(self.latency)
+
+    def _js_navigate(self, tab, url):
+        # Como en Chrome, la navegación por JS no espera a que cargue
+        self._navigate(tab, url)
+
+    @property
+    def current_url(self):
+        return self._tab.url
+
+    def _loaded(self, tab):
+        return tab.doc is not None and self._clock() >= tab.ready_at
+
+    # ── DOM ─────────────────────────────────────────────────
+
+    def _hidden_cards(self, tab):
+        """Cards del documento que el scroll todavía no ha cargado."""
+        if tab.reveal_at is not None and self._clock() >= tab.reveal_at:
+            tab.revealed = min(len(tab.cards), tab.revealed + self.page_size)
+            tab.reveal_at = None
+        return tab.cards[tab.revealed:]
+
+    def _visible(self, tab, selector_or_xpath, xpath=False):
+        if not self._loaded(tab):
+            return []
+        nodes = tab.doc.xpath(selector_or_xpath if xpath else css_to_xpath(selector_or_xpath))
+        hidden = self._hidden_cards(tab)
+        if not hidden:
+            return nodes
+        hidden = set(hidden)
+        return [n for n in nodes if n not in hidden and not any(a in hidden for a in n.iterancestors())]
+
+    def find_elements(self, by=By.ID, value=None):
+        tab = self._tab
+        nodes = self._visible(tab, _locator_xpath(by, value), xpath=True)
+        return [ReplayElement(self, n) for n in nodes]
+
+    def find_element(self, by=By.ID, value=None):
+        found = self.find_elements(by, value)
+        if not found:
+            raise NoSuchElementException(f"{by}={value}")
+        return found[0]
+
+    @property
+    def page_source(self):
+        tab = self._tab
+        if not self._loaded(tab):
+            return _EMPTY_HTML
+        hidden = self._hidden_cards(tab)
+        if not hidden:
+            return tab.html
+        doc = copy.deepcopy(tab.doc)
+        for card in doc.xpath(css_to_xpath(SearchResultsPage.ITEM_CARD[1]))[tab.revealed:]:
+            card.drop_tree()
+        return lxml.html.tostring(doc, encoding="unicode")
+
+    # ── Scripts ─────────────────────────────────────────────
+
+    def execute_script(self, script, *args):
+        tab = self._tab
+        handler = self._scripts.get(script.strip())
+        if handler is None:
+            logger.debug("Script no emulado en replay: %s", script.strip()[:60])
+            return None
+        return handler(tab, *args)
+
+    def _js_scroll(self, tab):
+        self._hidden_cards(tab)
+        if tab.reveal_at is None and tab.revealed < len(tab.cards):
+            tab.reveal_at = self._clock() + self.scroll_latency
+
+    def _js_card_hrefs(self, tab, selector, start):
+        return [node_attr(card, "href") for card in self._visible(tab, selector)[start:]]
+
+    def _js_read_cards(self, tab, selector, start, patterns):
+        def pick(card, names):
+            for name in names:
+                node = select_first_by_class(card, name)
+                text = node_text(node) if node is not None else ""
+                if text:
+                    return text
+            return None
+
+        return [{
+            "href": node_attr(card, "href"),
+            "title": pick(card, patterns["title"]),
+            "price": pick(card, patterns["price"]),
+            "location": pick(card, patterns["location"]),
+        } for card in self._visible(tab, selector)[start:]]
+
+    def _js_scoped_html(self, tab, root_selector, extra_selector=None):
+        roots = self._visible(tab, root_selector)
+        if not roots:
+            return None
+        nodes = (self._visible(tab, extra_selector) if extra_selector else []) + roots
+        parts = [lxml.html.tostring(n, encoding="unicode", with_tail=False) for n in nodes]
+        return "<html><body>" + "".join(parts) + "</body></html>"
+
+    # ── Resto de la API usada por el scraper ────────────────
+
+    def get_cookies(self):
+        # Consentimiento ya guardado: HomePage.accept_cookies no espera al banner
+        return [{"name": "__cmpconsentx-replay", "value": "1", "domain": ".wallapop.com"}]
+
+    def execute_cdp_cmd(self, cmd, params):
+        return {}
+
+    def get_window_size(self):
+        return {"width": 1920, "height": 1080}
+
+    def maximize_window(self):
+        pass
+
+    def set_window_rect(self, **kwargs):
+        pass
+
+
+# ── HTTP ────────────────────────────────────────────────────
+
+class ReplayAdapter(BaseAdapter):
+    """Transport adapter de requests que responde desde el corpus.
+
+    Montado en la sesión de HttpDetailFetcher (argumento adapter), el
+    detalle HTTP tampoco sale a la red.
+    """
+
+    def __init__(self, corpus, latency=0.0, sleep=time.sleep):
+        super().__init__()
+        self.corpus = corpus
+        self.latency = latency
+        self._sleep = sleep
+        self.requests = 0
+
+    def send(self, request, **kwargs):
+        if self.latency:
+            self._sleep(self.latency)
+        self.requests += 1
+        _, html = self.corpus.page(request.url)
+        response = requests.Response()
+        response.status_code = 200
+        response.url = request.url
+        response.request = request
+        response.headers["Content-Type"] = "text/html; charset=utf-8"
+        response._content = html.encode("utf-8")
+        response.encoding = "utf-8"
+        return response
+
+    def close(self):
+        pass
@@ -0,0 +1,105 @@
+"""
+Bloqueo de recursos innecesarios vía Chrome DevTools Protocol.
+
+Las páginas de búsqueda y detalle cargan imágenes, fuentes, vídeo y
+scripts de analítica/publicidad que el scraper nunca usa y que dominan
+el tiempo de `driver.get` y el ancho de banda. Con `Network.setBlockedURLs`
+Chrome los descarta antes de pedirlos.
+
+Cada tipo de página tiene su perfil (BLOCK_PROFILES): en la home no se
+bloquean scripts de terceros para no romper el banner de cookies
+(consentmanager.net), en resultados y detalle sí.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ── Patrones por categoría ──────────────────────────────────
+# Sintaxis de Network.setBlockedURLs: '*' es comodín (el final cubre la query)
+BLOCKED_RESOURCES = {
+    "images": ["*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.avif*", "*.svg*", "*.ico*"],
+    "media": ["*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*"],
+    "fonts": ["*.woff*", "*.ttf*", "*.otf*"],
+    "trackers": [
+        "*google-analytics.com*",
+        "*googletagmanager.com*",
+        "*doubleclick.net*",
+        "*googlesyndication.com*",
+        "*googleadservices.com*",
+        "*adservice.google.*",
+        "*amazon-adsystem.com*",
+        "*connect.facebook.net*",
+        "*criteo.*",
+        "*hotjar.com*",
+        "*scorecardresearch.com*",
+        "*taboola.com*",
+        "*branch.io*",
+        "*bat.bing.com*",
+    ],
+}
+
+# ── Perfiles por tipo de página ─────────────────────────────
+BLOCK_PROFILES = {
+    "home": ("images", "media", "fonts"),
+    "search": ("images", "media", "fonts", "trackers"),
+    "detail": ("images", "media", "fonts", "trackers"),
+}
+
+
+def blocked_patterns(profile):
+    """Devuelve la lista de patrones de un perfil (nombre o lista de categorías).
+
+    None o un perfil vacío no bloquean nada.
+    """
+    if not profile:
+        return []
+    categories = BLOCK_PROFILES[profile] if isinstance(profile, str) else profile
+    patterns = []
+    for category in categories:
+        patterns.extend(BLOCKED_RESOURCES[category])
+    return patterns
+
+
+def set_resource_blocking(driver, profile):
+    """Aplica un perfil de bloqueo al driver (None lo desactiva).
+
+    Returns:
+        True si se aplicó; False si el driver no soporta CDP o falla.
+    """
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked_patterns(profile)})
+        return True
+    except Exception as e:
+        logger.warning("No se pudo aplicar el bloqueo de recursos '%s': %s", profile, e)
+        return False
+
+
+# ── Medición ────────────────────────────────────────────────
+
+_JS_LOAD_METRICS = """
+    var nav = performance.getEntriesByType('navigation')[0];
+    var resources = performance.getEntriesByType('resource');
+    var bytes = nav ? (nav.transferSize || nav.encodedBodySize || 0) : 0;
+    resources.forEach(function (r) { bytes += r.transferSize || r.encodedBodySize || 0; });
+    return {
+        dom_ready_ms: nav ? nav.domContentLoadedEventEnd : null,
+        load_ms: nav ? nav.loadEventEnd : null,
+        requests: resources.length + 1,
+        bytes: bytes
+    };
+"""
+
+
+def page_load_metrics(driver):
+    """Tiempos y bytes de la última navegación según la Performance API.
+
+    Los bytes son aproximados: los recursos de otros orígenes sin
+    Timing-Allow-Origin cuentan como 0. Sirven para comparar perfiles.
+    """
+    try:
+        return driver.execute_script(_JS_LOAD_METRICS) or {}
+    except Exception as e:
+        logger.warning("No se pudieron leer las métricas de carga: %s", e)
+        return {}
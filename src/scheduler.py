@@ -3,6 +3,8 @@ Scheduler para ejecutar scrapes de Wallapop periódicamente.
 
 Lee las búsquedas configuradas en searches.json y ejecuta cada una
 según su intervalo definido, usando WallapopScraper en modo headless.
+Con Config.BATCH_RUNS, las que tocan a la vez se ejecutan como un lote
+(una sesión de navegador y cada URL enriquecida una sola vez).
 """
 
 import json
@@ -12,7 +14,10 @@ import threading
 from pathlib import Path
 from datetime import datetime, timedelta
 
+from src.config import Config
 from src.scraper import WallapopScraper
+from src.driver import get_shared_pool
+from src.search_filters import normalize_filters
 import src.events as ev
 
 logger = logging.getLogger(__name__)
@@ -26,7 +31,15 @@ def _load_searches(path=SEARCHES_FILE):
     try:
         with open(path, "r", encoding="utf-8") as f:
             data = json.load(f)
-        searches = data.get("searches", [])
+        searches = []
+        for search in data.get("searches", []):
+            try:
+                search["filters"] = normalize_filters(search.get("filters"))
+            except ValueError as e:
+                # Sin sus filtros la búsqueda traería resultados que no se quieren
+                logger.error("Búsqueda '%s' ignorada, filtros no válidos: %s", search.get("query"), e)
+                continue
+            searches.append(search)
         if not searches:
             logger.warning("No se encontraron búsquedas en %s", path)
         return searches
@@ -38,12 +51,14 @@ def _load_searches(path=SEARCHES_FILE):
         return []
 
 
-def _run_single_search(query, max_items=None):
+def _run_single_search(query, max_items=None, filters=None):
     """Ejecuta un scrape individual en modo headless."""
     ev.start_scrape(query)
     try:
-        scraper = WallapopScraper(headless=True, on_progress=ev.make_callback(query))
-        scraper.run(query, max_items=max_items)
+        scraper = WallapopScraper(
+            headless=True, on_progress=ev.make_callback(query), pool=get_shared_pool()
+        )
+        scraper.run(query, max_items=max_items, filters=filters)
     except Exception as e:
         logger.error("Error ejecutando scrape para '%s': %s", query, e)
         ev.finish_scrape(query, {'type': 'error', 'message': str(e)})
@@ -51,6 +66,31 @@ def _run_single_search(query, max_items=None):
         ev.finish_scrape(query)
 
 
+def _run_batch(searches):
+    """Ejecuta varias búsquedas como un lote (ver WallapopScraper.run_batch).
+
+    Los eventos de progreso del lote llegan al log de cada una de sus queries.
+    """
+    queries = [search["query"] for search in searches]
+    for query in queries:
+        ev.start_scrape(query)
+
+    def on_progress(event):
+        for query in queries:
+            ev.emit(query, event)
+
+    try:
+        scraper = WallapopScraper(headless=True, on_progress=on_progress, pool=get_shared_pool())
+        scraper.run_batch(searches)
+    except Exception as e:
+        logger.error("Error ejecutando el lote %s: %s", queries, e)
+        for query in queries:
+            ev.finish_scrape(query, {'type': 'error', 'message': str(e)})
+    finally:
+        for query in queries:
+            ev.finish_scrape(query)
+
+
 class Scheduler:
     """Gestiona la ejecución periódica de búsquedas en Wallapop."""
 
@@ -94,40 +134,61 @@ class Scheduler:
     def _process_searches(self):
         """Revisa y ejecuta las búsquedas que toca ejecutar."""
         now = datetime.now()
+        due = []
         for search in self._searches:
-            if self._stop_event.is_set():
-                break
-
             query = search["query"]
-            interval = search.get("interval_minutes", 60)
-
             # Programar primera ejecución si no existe
             if query not in self._next_run:
                 self._next_run[query] = now
-
             if now >= self._next_run[query]:
-                logger.info("Iniciando scrape: '%s'", query)
-                start = time.time()
-                try:
-                    _run_single_search(query)
-                    elapsed = time.time() - start
-                    logger.info(
-                        "Scrape completado: '%s' (%.1fs)", query, elapsed
-                    )
-                except Exception as e:
-                    logger.error(
-                        "Error inesperado en scrape '%s': %s", query, e
-                    )
-
-                # Programar siguiente ejecución independientemente del resultado
-                self._next_run[query] = datetime.now() + timedelta(
-                    minutes=interval
-                )
+                due.append(search)
+
+        if len(due) > 1 and Config.BATCH_RUNS:
+            if self._stop_event.is_set():
+                return
+            queries = [s["query"] for s in due]
+            logger.info("Iniciando lote de %d búsquedas: %s", len(due), queries)
+            start = time.time()
+            try:
+                _run_batch(due)
+                logger.info("Lote completado (%.1fs)", time.time() - start)
+            except Exception as e:
+                logger.error("Error inesperado en el lote %s: %s", queries, e)
+            for search in due:
+                self._schedule_next(search)
+            return
+
+        for search in due:
+            if self._stop_event.is_set():
+                break
+
+            query = search["query"]
+            logger.info("Iniciando scrape: '%s'", query)
+            start = time.time()
+            try:
+                _run_single_search(query, filters=search.get("filters"))
+                elapsed = time.time() - start
                 logger.info(
-                    "Próxima ejecución de '%s': %s",
-                    query,
-                    self._next_run[query].strftime("%H:%M:%S"),
+                    "Scrape completado: '%s' (%.1fs)", query, elapsed
                 )
+            except Exception as e:
+                logger.error(
+                    "Error inesperado en scrape '%s': %s", query, e
+                )
+
+            # Programar siguiente ejecución independientemente del resultado
+            self._schedule_next(search)
+
+    def _schedule_next(self, search):
+        query = search["query"]
+        self._next_run[query] = datetime.now() + timedelta(
+            minutes=search.get("interval_minutes", 60)
+        )
+        logger.info(
+            "Próxima ejecución de '%s': %s",
+            query,
+            self._next_run[query].strftime("%H:%M:%S"),
+        )
 
     def run(self):
         """Bucle principal del scheduler. Corre indefinidamente hasta que se llame stop()."""
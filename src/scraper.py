@@ -1,23 +1,55 @@
 import time
+import heapq
 import logging
-import random
+from datetime import datetime, timedelta
 
 from src.config import Config
 from src.driver import init_driver
+from src.processes import quit_driver, driver_rss_mb
+from src.resource_blocking import set_resource_blocking
 from src.utils import setup_logging, save_to_csv
-from src.database import save_items_to_db
+from src.database import (
+    init_db, get_known_items, get_query_urls, touch_items, parse_price, MISSING_DESCRIPTIONS,
+    ItemWriter, save_checkpoint, get_checkpoint, clear_checkpoint,
+    defer_items, get_deferred, get_query_avg_price,
+)
+from src.http_fetcher import HttpDetailFetcher
+from src.enrichment import ConcurrentEnricher, enrichment_priority, DEFAULT_PRIORITY
+from src.rate_limiter import get_rate_limiter
+from src.search_api import discard_performance_log
+from src.search_client import SearchApiClient
 from src.pages import HomePage, SearchResultsPage, ItemDetailPage
+from src.pages.item_detail_page import TabPipeline, parse_detail_html
+from src.parse_pool import get_parse_pool
+from src.parsing import resolve_backend
 
 
 class WallapopScraper:
-    BATCH_SIZE = 25  # Reiniciar driver cada N items para evitar memory leaks
-
-    def __init__(self, headless=False, on_progress=None):
+    def __init__(self, headless=False, on_progress=None, http_details=None, pool=None,
+                 detail_tabs=None, incremental=None, rate_limiter=None, http_adapter=None,
+                 search_client=None, parse_pool=None):
         self.driver = None
+        self.pool = pool  # DriverPool opcional: presta Chromes calientes en vez de crearlos
         self.config = Config
         self.timestamp = None
         self.headless = headless
         self._on_progress = on_progress
+        # Detalle vía HTTP con fallback a Selenium (None = usar Config)
+        self.http_details = Config.HTTP_DETAILS if http_details is None else http_details
+        # Pestañas para solapar navegaciones de detalle con Selenium (1 = sin pipeline)
+        self.detail_tabs = Config.DETAIL_TABS if detail_tabs is None else detail_tabs
+        # Saltar detalles de items conocidos y sin cambios
+        self.incremental = Config.INCREMENTAL if incremental is None else incremental
+        # Ritmo de navegaciones compartido con el resto de scrapes y el HTTP
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        # Transport adapter de requests para el detalle HTTP (None = red real)
+        self.http_adapter = http_adapter
+        # Listado con Chrome ("browser") o paginando la API JSON ("api")
+        self.search_client = Config.SEARCH_CLIENT if search_client is None else search_client
+        # Procesos donde se parsean los detalles, fuera del thread del driver
+        self.parse_pool = parse_pool or get_parse_pool()
+        # Estado del driver actual para decidir cuándo reciclarlo
+        self._reset_driver_usage()
 
     def _emit(self, event):
         """Emite un evento de progreso al callback si está definido."""
@@ -30,22 +62,24 @@ class WallapopScraper:
     def initialize(self, query):
         """Configuración inicial: logging y driver."""
         self.timestamp = setup_logging(query, self.config.LOG_DIR)
+        self._reset_driver_usage()
+        if self.pool:
+            logging.info("Tomando driver del pool...")
+            self.driver = self.pool.acquire()
+            return
         logging.info("Inicializando driver...")
         self.driver = init_driver(headless=self.headless, pos="izquierda")
 
     def cleanup(self):
+        if self.pool:
+            # El pool comprueba su salud y decide si reutilizarlo o reciclarlo
+            self.pool.release(self.driver)
+            self.driver = None
+            return
         if self.driver:
-            try:
-                self.driver.quit()
-            except Exception:
-                pass
+            # Cierra el driver y mata solo los procesos residuales de su árbol
+            quit_driver(self.driver)
             self.driver = None
-        # Matar procesos Chrome/chromedriver residuales que no se cerraron
-        try:
-            import subprocess
-            subprocess.run(["pkill", "-f", "chrome"], capture_output=True)
-        except Exception:
-            pass
 
     def _is_driver_alive(self):
         """Verifica si el driver/Chrome sigue respondiendo."""
@@ -58,43 +92,356 @@ class WallapopScraper:
     def _restart_driver(self):
         """Reinicia el driver cuando Chrome se ha caído."""
         logging.warning("Driver no responde. Reiniciando Chrome...")
+        if self.pool:
+            self.pool.release(self.driver, discard=True)
+            self.driver = self.pool.acquire()
+            logging.info("Driver reemplazado desde el pool.")
+            return
         self.cleanup()
         time.sleep(2)
         self.driver = init_driver(headless=self.headless, pos="izquierda")
         logging.info("Driver reiniciado correctamente.")
 
-    def anti_detection_delay(self):
-        """Pausa aleatoria entre requests como medida anti-detección."""
-        delay = random.uniform(2.5, 5.0)
-        logging.info(f"Anti-detección: esperando {delay:.1f}s...")
-        time.sleep(delay)
+    def _reset_driver_usage(self):
+        """Resetea los contadores de uso del driver actual (nuevo o reciclado)."""
+        self._navigations = 0
+        self._driver_started = time.monotonic()
+        self._memory_mb = None
+        self._memory_sampled_at = None  # self._navigations de la última medida
+
+    def _sample_driver_memory(self):
+        """RSS (MB) del árbol de procesos de Chrome, o None si no se puede medir.
+
+        Medirlo recorre todo /proc, así que solo se mide cada
+        DRIVER_MEMORY_SAMPLE_EVERY navegaciones; entre medidas se devuelve
+        la última.
+        """
+        if (self._memory_sampled_at is None
+                or self._navigations - self._memory_sampled_at >= self.config.DRIVER_MEMORY_SAMPLE_EVERY):
+            self._memory_sampled_at = self._navigations
+            try:
+                self._memory_mb = driver_rss_mb(self.driver)
+            except Exception:
+                self._memory_mb = None
+        return self._memory_mb
+
+    def _recycle_reason(self, memory_mb):
+        """Devuelve el motivo para reciclar el driver, o None si está sano."""
+        if memory_mb is not None and memory_mb >= self.config.DRIVER_MAX_RSS_MB:
+            return f"memoria {memory_mb:.0f}MB >= {self.config.DRIVER_MAX_RSS_MB}MB"
+        if self._navigations >= self.config.DRIVER_MAX_NAVIGATIONS:
+            return f"{self._navigations} navegaciones"
+        age = time.monotonic() - self._driver_started
+        if age >= self.config.DRIVER_MAX_SESSION_AGE:
+            return f"edad {age:.0f}s"
+        return None
+
+    def _recycle_driver(self):
+        """Reinicia el driver y resetea sus contadores de uso."""
+        self._restart_driver()
+        self._reset_driver_usage()
+
+    def _block_resources(self, page_type):
+        """Aplica el perfil de bloqueo de recursos del tipo de página, si está activo."""
+        if self.config.BLOCK_RESOURCES:
+            set_resource_blocking(self.driver, page_type)
+
+    def _make_http_fetcher(self):
+        """Crea el fetcher HTTP con la sesión del navegador, o None si está desactivado."""
+        if not self.http_details:
+            return None
+        try:
+            return HttpDetailFetcher.from_driver(
+                self.driver, timeout=self.config.HTTP_TIMEOUT, adapter=self.http_adapter,
+                parse_pool=self.parse_pool,
+            )
+        except Exception as e:
+            logging.warning(f"No se pudo crear el fetcher HTTP, se usará Selenium: {e}")
+            return None
+
+    def _iter_http_results(self, fetcher, items, priorities=None):
+        """Genera (índice, item enriquecido o None) desde el pool HTTP.
+
+        Sin fetcher, genera (i, None) por prioridad para que todo vaya por Selenium.
+        """
+        priorities = priorities or {}
+        if not fetcher:
+            for i in sorted(range(len(items)), key=lambda i: priorities.get(items[i]['url'], DEFAULT_PRIORITY)):
+                yield i, None
+            return
+        enricher = ConcurrentEnricher(fetcher.enrich_item, workers=self.config.DETAIL_WORKERS)
+        try:
+            for i, item in enumerate(items):
+                enricher.submit(i, item, priorities.get(item['url'], DEFAULT_PRIORITY))
+            yield from enricher.as_completed()
+        finally:
+            enricher.close()
+
+    def _known_urls_for_early_stop(self, query, filters=None):
+        """URLs ya guardadas para la query si el modo incremental con parada temprana está activo.
+
+        La parada temprana exige ordenar por más recientes: si la búsqueda
+        trae otro order_by se respeta el suyo y no hay parada temprana.
+        """
+        if not (self.incremental and self.config.EARLY_STOP_KNOWN):
+            return None
+        order_by = (filters or {}).get('order_by')
+        if order_by and order_by != 'newest':
+            logging.info(f"Búsqueda ordenada por '{order_by}': se mantiene el orden y sin parada temprana.")
+            return None
+        try:
+            init_db()
+            return get_query_urls(query)
+        except Exception as e:
+            logging.warning(f"No se pudieron cargar las URLs conocidas: {e}")
+            return None
+
+    def _resume_items(self, query):
+        """Items pendientes de una ejecución anterior interrumpida de la query."""
+        if not self.config.RESUME_RUNS:
+            return []
+        try:
+            init_db()
+            return get_checkpoint(query, max_age_hours=self.config.CHECKPOINT_MAX_AGE_HOURS)
+        except Exception as e:
+            logging.warning(f"No se pudo leer el checkpoint: {e}")
+            return []
+
+    def _split_known(self, items, priorities=None, avg_price=None):
+        """Separa los items que necesitan detalle de los conocidos sin cambios.
+
+        Necesitan detalle: URLs nuevas, con precio distinto al guardado, o
+        con descripción ausente o más antigua que DETAIL_MAX_AGE_DAYS.
+        Con priorities (dict), apunta en él url -> prioridad de detalle de
+        cada item a enriquecer (ver enrichment_priority).
+
+        Returns:
+            (items a enriquecer, URLs sin cambios)
+        """
+        known = get_known_items(item['url'] for item in items)
+        stale_before = (datetime.now() - timedelta(days=self.config.DETAIL_MAX_AGE_DAYS)).isoformat()
+        to_enrich, unchanged = [], []
+        for item in items:
+            row = known.get(item['url'])
+            if priorities is not None:
+                priorities[item['url']] = enrichment_priority(item, row, avg_price)
+            if row is None:
+                to_enrich.append(item)
+                continue
+            card_price = parse_price(item.get('price'))
+            price_changed = card_price is not None and card_price != row['price']
+            stale = (
+                row['description'] in MISSING_DESCRIPTIONS
+                or not row['detail_fetched_at']
+                or row['detail_fetched_at'] < stale_before
+            )
+            if price_changed or stale:
+                to_enrich.append(item)
+            else:
+                unchanged.append(item['url'])
+                if priorities is not None:
+                    priorities.pop(item['url'], None)
+        return to_enrich, unchanged
+
+    def _query_avg_price(self, query):
+        """Precio medio guardado de la query, para priorizar los más baratos."""
+        try:
+            return get_query_avg_price(query) if query else None
+        except Exception as e:
+            logging.warning(f"No se pudo calcular el precio medio de '{query}': {e}")
+            return None
+
+    def _with_deferred(self, batches, query):
+        """Lotes del listado seguidos de los items que aplazó la ejecución anterior.
 
-    def _enrich_items_with_recovery(self, items, timeout):
-        """Enriquece items con detalle, reiniciando el driver si se cae."""
+        Los aplazados que ya salieron en el listado no se repiten. Siguen
+        aplazados en la DB hasta que se guardan (ver get_deferred).
+        """
+        seen = set()
+        for batch in batches:
+            seen.update(item['url'] for item in batch)
+            yield batch
+        if not query:
+            return
+        try:
+            deferred = get_deferred(query, max_age_hours=self.config.CHECKPOINT_MAX_AGE_HOURS)
+        except Exception as e:
+            logging.warning(f"No se pudieron leer los aplazados de '{query}': {e}")
+            return
+        deferred = [item for item in deferred if item['url'] not in seen]
+        if deferred:
+            logging.info(f"Recuperando {len(deferred)} items aplazados de la ejecución anterior.")
+            yield deferred
+
+    def _budget(self):
+        """(deadline de time.monotonic o None, máximo de detalles o None) de una ejecución."""
+        seconds = self.config.RUN_TIME_BUDGET
+        return (time.monotonic() + seconds if seconds else None), self.config.RUN_ITEM_BUDGET
+
+    def _defer_leftovers(self, items, full_items, query=None, listed_by=None):
+        """Aplaza los items que se quedaron sin detalle por el presupuesto.
+
+        Se guardan bajo query, o con listed_by (url -> búsquedas) bajo cada
+        búsqueda que los listó, para que la siguiente ejecución los añada
+        a su listado.
+
+        Returns:
+            Número de items aplazados.
+        """
+        leftovers = [item for item, enriched in zip(items, full_items) if enriched is None]
+        if not leftovers:
+            return 0
+        by_query = {}
+        for item in leftovers:
+            for q in (listed_by.get(item['url'], []) if listed_by is not None else [query]):
+                by_query.setdefault(q, []).append(item)
+        try:
+            for q, q_items in by_query.items():
+                defer_items(q, q_items)
+        except Exception as e:
+            logging.warning(f"No se pudieron aplazar los items pendientes: {e}")
+        logging.info(f"{len(leftovers)} items aplazados a la siguiente ejecución.")
+        return len(leftovers)
+
+    def _collect_items(self, results, max_items, known_urls, enricher=None, checkpoint_query=None,
+                       query=None, priorities=None):
+        """Recorre los resultados lote a lote mientras se hace scroll.
+
+        Cada lote nuevo pasa por el filtro incremental y, si hay enricher,
+        sus items se encolan para el detalle HTTP sin esperar a que acabe
+        el scroll. Con checkpoint_query, los items a enriquecer se apuntan
+        como pendientes antes de encolarlos. Los items sin cambios se
+        asocian a query (o checkpoint_query) aunque los guardara otra búsqueda.
+
+        Tras el listado se añaden los items aplazados de la query. Con
+        priorities (dict url -> prioridad) el enricher los descarga por
+        prioridad en vez de en orden de página.
+
+        Returns:
+            (items a enriquecer, URLs sin cambios)
+        """
+        query = query or checkpoint_query
+        if self.incremental or query:
+            init_db()
+        if priorities is None:
+            priorities = {}
+        avg_price = self._query_avg_price(query) if self.incremental else None
+        items, unchanged = [], []
+        batches = results.iter_item_batches(
+            max_items=max_items,
+            known_urls=known_urls,
+            stop_after_known=self.config.EARLY_STOP_KNOWN,
+        )
+        for batch in self._with_deferred(batches, query):
+            if self.incremental:
+                batch, batch_unchanged = self._split_known(batch, priorities, avg_price)
+                touch_items(batch_unchanged, query=query)
+                unchanged.extend(batch_unchanged)
+            if checkpoint_query:
+                save_checkpoint(checkpoint_query, batch)
+            for item in batch:
+                if enricher:
+                    enricher.submit(len(items), item, priorities.get(item['url'], DEFAULT_PRIORITY))
+                items.append(item)
+        return items, unchanged
+
+    def _make_tab_pipeline(self, detail):
+        """Pipeline de K pestañas para los detalles por Selenium, o None si K = 1."""
+        if self.detail_tabs > 1:
+            return TabPipeline(detail, tabs=self.detail_tabs)
+        return None
+
+    def _enrich_items_with_recovery(self, items, timeout, http_results=None, writer=None,
+                                    priorities=None, deadline=None, max_details=None):
+        """Enriquece items con detalle, reiniciando el driver si se cae.
+
+        Si el detalle HTTP está activo, los items se descargan en paralelo
+        en un pool de threads y solo los que fallan se navegan con Selenium
+        en este thread, mientras el pool sigue trabajando. Con detail_tabs > 1
+        esas navegaciones se solapan en varias pestañas; ante cualquier error
+        del pipeline se sigue con una sola pestaña. Devuelve los items en el
+        orden original.
+
+        http_results permite pasar resultados HTTP ya en marcha (índice,
+        item o None), p. ej. encolados durante el scroll; su fetcher lo
+        cierra quien lo creó. Con writer (ItemWriter), cada item se guarda
+        en la DB en cuanto termina, sin esperar al resto.
+
+        Con un ParsePool con procesos y una sola pestaña, el driver solo
+        navega y captura el HTML: el parseo sigue en otro proceso mientras
+        arranca la siguiente navegación.
+
+        Los pendientes de Selenium se navegan por prioridad (priorities,
+        url -> clave de enrichment_priority). Al pasar deadline
+        (time.monotonic) o terminar max_details items no se lanzan más
+        detalles: esos items quedan a None en el resultado para que el
+        llamador los aplace.
+        """
+        priorities = priorities or {}
         detail = ItemDetailPage(self.driver, timeout)
-        full_items = []
+        pipeline = self._make_tab_pipeline(detail)
+        fetcher = None
+        if http_results is None:
+            fetcher = self._make_http_fetcher()
+            http_results = self._iter_http_results(fetcher, items, priorities)
+        full_items = [None] * len(items)
         consecutive_failures = 0
         max_consecutive_failures = 3
+        done = 0
+        todo = []        # Heap de (prioridad, índice) pendientes de navegar con Selenium
+        inflight = {}    # Índice -> item con navegación lanzada y sin terminar
+        parsing = {}     # Índice -> Future del parseo en el ParsePool
+        backend = resolve_backend()
 
-        for i, item in enumerate(items):
-            # Reiniciar driver cada BATCH_SIZE items para liberar memoria
-            if i > 0 and i % self.BATCH_SIZE == 0:
-                logging.info(f"Reiniciando driver (batch {i // self.BATCH_SIZE})...")
-                self._restart_driver()
-                detail = ItemDetailPage(self.driver, timeout)
+        def enqueue(i):
+            heapq.heappush(todo, (priorities.get(items[i]['url'], DEFAULT_PRIORITY), i))
 
-            # Verificar que el driver sigue vivo antes de navegar
-            if not self._is_driver_alive():
-                self._restart_driver()
-                detail = ItemDetailPage(self.driver, timeout)
-                consecutive_failures = 0
+        def exhausted():
+            """True si se acabó el presupuesto de la ejecución."""
+            if deadline is not None and time.monotonic() >= deadline:
+                return True
+            return bool(max_details) and done + len(parsing) >= max_details
+
+        def requeue_inflight():
+            for i in inflight:
+                enqueue(i)
+            inflight.clear()
+
+        def recycle():
+            nonlocal detail, pipeline
+            tabs = pipeline is not None
+            if tabs:
+                pipeline.abandon()
+            requeue_inflight()
+            self._recycle_driver()
+            self._block_resources('detail')
+            detail = ItemDetailPage(self.driver, timeout)
+            pipeline = self._make_tab_pipeline(detail) if tabs else None
+
+        def single_tab_fallback(error):
+            nonlocal pipeline
+            logging.warning(f"Pipeline de pestañas falló, se sigue con una sola: {error}")
+            try:
+                pipeline.close()
+            except Exception:
+                pass
+            pipeline = None
+            requeue_inflight()
 
-            enriched = detail.enrich_item(item)
-            full_items.append(enriched)
+        def finish(i, enriched, via_http=False):
+            nonlocal consecutive_failures, done
+            inflight.pop(i, None)
+            full_items[i] = enriched
+            if writer:
+                writer.add(enriched)
+            done += 1
+            # El detalle HTTP no toca el driver: se informa de la última medida
+            memory_mb = self._memory_mb if via_http else self._sample_driver_memory()
             self._emit({
                 'type': 'item_scraped',
-                'index': i + 1,
+                'index': done,
                 'total': len(items),
+                'memory_mb': memory_mb,
                 'item': {
                     'title': enriched.get('title', ''),
                     'price': str(enriched.get('price', '')),
@@ -102,24 +449,223 @@ class WallapopScraper:
                     'location': enriched.get('location', ''),
                 }
             })
+            if via_http:
+                return
+            if self.config.SEARCH_API_CAPTURE:
+                # Los detalles no se capturan: que el log de rendimiento no crezca
+                discard_performance_log(self.driver)
 
-            # Detectar si el enrich falló (el item vuelve sin cambios)
+            # Detectar si el enrich con Selenium falló (el item vuelve sin cambios)
             if enriched.get('description') in [None, 'No disponible', 'pending']:
                 consecutive_failures += 1
-                if consecutive_failures >= max_consecutive_failures:
-                    logging.warning(f"{consecutive_failures} fallos consecutivos. Reiniciando driver...")
-                    self._restart_driver()
-                    detail = ItemDetailPage(self.driver, timeout)
-                    consecutive_failures = 0
+                self.rate_limiter.report_failure(enriched['url'])
             else:
                 consecutive_failures = 0
+                self.rate_limiter.report_success(enriched['url'])
 
-            if i < len(items) - 1:
-                self.anti_detection_delay()
+            if consecutive_failures >= max_consecutive_failures:
+                logging.warning(f"{consecutive_failures} fallos consecutivos. Reiniciando driver...")
+                recycle()
+                consecutive_failures = 0
+            else:
+                # Reciclar por memoria/edad en vez de cada N items a ciegas
+                reason = self._recycle_reason(memory_mb)
+                if reason:
+                    logging.info(f"Reciclando driver ({reason})...")
+                    recycle()
+
+        def start(i):
+            nonlocal consecutive_failures
+            # Verificar que el driver sigue vivo antes de navegar
+            if not self._is_driver_alive():
+                recycle()
+                consecutive_failures = 0
+            inflight[i] = items[i]
+            self._navigations += 1
+            # Turno compartido con los demás scrapes y el fetcher HTTP
+            waited = self.rate_limiter.acquire(items[i]['url'])
+            if waited:
+                logging.info(f"Rate limiter: esperado {waited:.1f}s")
+            if pipeline is None and self.parse_pool.offloads:
+                parse_async(i)
+                return
+            if pipeline is None:
+                finish(i, detail.enrich_item(items[i]))
+                return
+            try:
+                pipeline.submit(i, items[i])
+            except Exception as e:
+                single_tab_fallback(e)
+
+        def parse_async(i):
+            html = detail.load_html(items[i])
+            # Con el HTML capturado el driver ya queda libre
+            inflight.pop(i, None)
+            if html is None:
+                finish(i, items[i])
+                return
+            parsing[i] = self.parse_pool.submit(
+                parse_detail_html, html, detail.fields_to_parse(items[i]), backend
+            )
+
+        def collect_parsed(wait=False):
+            """Termina los items ya parseados; con wait, espera a todos."""
+            for i in [i for i, future in parsing.items() if wait or future.done()]:
+                future = parsing.pop(i)
+                try:
+                    values, sources = future.result()
+                    enriched = detail.fill_item(items[i], values, sources)
+                except Exception as e:
+                    logging.error(f"Error parseando detalle {items[i]['url']}: {e}")
+                    enriched = items[i]
+                finish(i, enriched)
+
+        def harvest():
+            try:
+                key, enriched = pipeline.harvest()
+            except Exception as e:
+                single_tab_fallback(e)
+                return
+            finish(key, enriched)
+
+        def pump(drain=False):
+            """Avanza la cola Selenium; sin drain, no espera a pestañas con hueco libre."""
+            while True:
+                collect_parsed()
+                if todo and not exhausted() and (pipeline is None or not pipeline.full):
+                    start(heapq.heappop(todo)[1])
+                elif inflight and pipeline is not None and (drain or pipeline.full):
+                    harvest()
+                elif drain and parsing:
+                    collect_parsed(wait=True)
+                else:
+                    break
+
+        try:
+            for i, enriched in http_results:
+                if enriched is not None:
+                    finish(i, enriched, via_http=True)
+                else:
+                    enqueue(i)
+                    pump()
+                if exhausted():
+                    break
+            pump(drain=True)
+            if exhausted() and done < len(items):
+                logging.info(f"Presupuesto de la ejecución agotado: {done}/{len(items)} detalles hechos.")
+        finally:
+            for future in parsing.values():
+                future.cancel()
+            if fetcher:
+                # Generador propio (_iter_http_results): cerrarlo cancela lo que queda
+                http_results.close()
+            if pipeline is not None:
+                pipeline.close()
+            if fetcher:
+                fetcher.close()
 
         return full_items
 
-    def run(self, query, max_items=None):
+    def _open_home(self, home, needs_cookies):
+        """Carga la home y acepta las cookies si hace falta."""
+        self._block_resources('home')
+        self.rate_limiter.acquire(self.config.BASE_URL)
+        self.driver.get(self.config.BASE_URL)
+        if needs_cookies:
+            home.accept_cookies()
+
+    @staticmethod
+    def _search_filters(filters, known_urls):
+        """Filtros de la búsqueda; con URLs conocidas y sin orden propio, por más recientes."""
+        filters = dict(filters or {})
+        if known_urls:
+            # Con los más recientes primero, los conocidos marcan el final de lo nuevo.
+            # Un orden elegido en la búsqueda no se pisa (ver _known_urls_for_early_stop)
+            filters.setdefault('order_by', 'newest')
+        return filters
+
+    def _open_search_api(self, query, filters, known_urls, timeout):
+        """Abre la búsqueda con SearchApiClient, con la sesión del navegador.
+
+        Solo se navega a la home si el driver no viene caliente del pool
+        (cookies de consentimiento y de sesión); el listado va por HTTP.
+
+        Returns:
+            El cliente con la primera página descargada, o None si la API
+            falla (el llamador sigue con los resultados en el navegador).
+        """
+        if not (self.pool and self.pool.is_warm(self.driver)):
+            self._open_home(HomePage(self.driver, timeout), needs_cookies=True)
+        client = None
+        try:
+            client = SearchApiClient.from_driver(
+                self.driver,
+                timeout=self.config.HTTP_TIMEOUT,
+                rate_limiter=self.rate_limiter,
+                adapter=self.http_adapter,
+            )
+            client.open(query, self._search_filters(filters, known_urls))
+            return client
+        except Exception as e:
+            logging.warning(f"La búsqueda por API falló, se usa el navegador: {e}")
+            if client:
+                client.close()
+            return None
+
+    def _open_search(self, query, filters, known_urls, timeout):
+        """Abre la búsqueda con la estrategia configurada (API o navegador).
+
+        Returns:
+            (resultados, cliente): el objeto del que leer los lotes
+            (iter_item_batches) y el SearchApiClient a cerrar, o None si
+            se listó en el navegador.
+        """
+        if self.search_client == "api":
+            client = self._open_search_api(query, filters, known_urls, timeout)
+            if client is not None:
+                return client, client
+        return self._open_results(query, filters, known_urls, timeout), None
+
+    def _open_results(self, query, filters, known_urls, timeout):
+        """Deja el driver en los resultados de la búsqueda, ya filtrados.
+
+        Con DIRECT_SEARCH_URL se navega directamente a la URL de resultados
+        con los filtros como parámetros; si no, se pasa por la home y el
+        buscador y después se recarga con los filtros. Con SEARCH_API_CAPTURE
+        el listado se leerá de las respuestas de la API de búsqueda.
+        """
+        filters = self._search_filters(filters, known_urls)
+        home = HomePage(self.driver, timeout)
+        results = SearchResultsPage(self.driver, timeout)
+        # Un driver caliente del pool ya tiene las cookies aceptadas
+        needs_cookies = not (self.pool and self.pool.is_warm(self.driver))
+
+        if self.config.DIRECT_SEARCH_URL:
+            self._block_resources('search')
+            if self.config.SEARCH_API_CAPTURE:
+                results.capture_search_api()
+            self.rate_limiter.acquire(self.config.BASE_URL)
+            results.open(query, filters)
+            # El banner de consentimiento sale en cualquier página
+            if needs_cookies:
+                home.accept_cookies()
+            return results
+
+        self._open_home(home, needs_cookies)
+        self._block_resources('search')
+        if self.config.SEARCH_API_CAPTURE:
+            results.capture_search_api()
+        home.search(query)
+        results.apply_filters(query, filters)
+        return results
+
+    def run(self, query, max_items=None, filters=None):
+        """Scrapea una búsqueda y guarda sus items.
+
+        Args:
+            filters: Filtros de src.search_filters (precio, orden, distancia,
+                estado) que se aplican en Wallapop.
+        """
         try:
             self.initialize(query)
 
@@ -128,36 +674,95 @@ class WallapopScraper:
 
             logging.info("=" * 50)
             logging.info(f"SCRAPER WALLAPOP: {query}")
+            if filters:
+                logging.info(f"Filtros: {filters}")
             logging.info("=" * 50)
 
             self._emit({'type': 'start', 'query': query})
 
             timeout = self.config.TIMEOUT_DEFAULT
+            deadline, max_details = self._budget()
+            priorities = {}
 
-            # ── Home: cookies + búsqueda ────────────────────
-            home = HomePage(self.driver, timeout)
-            self.driver.get(self.config.BASE_URL)
-            home.accept_cookies()
-            home.search(query)
+            # ── Reanudar o abrir la búsqueda filtrada ───────
+            search_client = None
+            pending = self._resume_items(query)
+            if pending:
+                # Una ejecución anterior se cortó: solo quedan sus pendientes
+                logging.info(f"Reanudando ejecución anterior: {len(pending)} items pendientes.")
+                self._open_home(HomePage(self.driver, timeout),
+                                not (self.pool and self.pool.is_warm(self.driver)))
+            else:
+                known_urls = self._known_urls_for_early_stop(query, filters)
+                results, search_client = self._open_search(query, filters, known_urls, timeout)
 
             # ── Resultados: extraer cards ───────────────────
-            results = SearchResultsPage(self.driver, timeout)
-            items = results.extract_items(max_items=max_items)
+            # El detalle HTTP de cada lote arranca mientras sigue el scroll
+            fetcher = self._make_http_fetcher()
+            enricher = None
+            if fetcher:
+                enricher = ConcurrentEnricher(fetcher.enrich_item, workers=self.config.DETAIL_WORKERS)
+            # Cada item se guarda al terminar su detalle, en lotes pequeños
+            writer = ItemWriter(
+                query,
+                batch_size=self.config.DB_BATCH_SIZE,
+                max_delay=self.config.DB_FLUSH_SECONDS,
+                checkpoint=self.config.RESUME_RUNS,
+            )
+            http_results = None
+            try:
+                if pending:
+                    items, unchanged = pending, []
+                    if enricher:
+                        for i, item in enumerate(items):
+                            enricher.submit(i, item)
+                else:
+                    checkpoint_query = query if self.config.RESUME_RUNS else None
+                    items, unchanged = self._collect_items(
+                        results, max_items, known_urls, enricher, checkpoint_query,
+                        query=query, priorities=priorities,
+                    )
 
-            if not items:
-                logging.warning("No se encontraron items para la búsqueda.")
-                self._emit({'type': 'done', 'saved': 0})
-                return
+                if not items and not unchanged:
+                    logging.warning("No se encontraron items para la búsqueda.")
+                    self._emit({'type': 'done', 'saved': 0})
+                    return
 
-            logging.info(f"Procesando detalles para {len(items)} items...")
-            self._emit({'type': 'items_found', 'count': len(items)})
+                if self.incremental:
+                    logging.info(f"Incremental: {len(unchanged)} items sin cambios, {len(items)} a enriquecer.")
+                logging.info(f"Procesando detalles para {len(items)} items...")
+                self._emit({'type': 'items_found', 'count': len(items), 'unchanged': len(unchanged)})
 
-            # ── Detalle: enriquecer cada item con recuperación ─
-            full_items = self._enrich_items_with_recovery(items, timeout)
+                if not items:
+                    self._emit({'type': 'done', 'saved': 0})
+                    return
 
-            # ── Guardar en DB ─────────────────────────────────
-            save_items_to_db(full_items, query)
-            self._emit({'type': 'saved', 'count': len(full_items)})
+                # ── Detalle: enriquecer cada item con recuperación ─
+                self._block_resources('detail')
+                http_results = enricher.as_completed() if enricher else None
+                full_items = self._enrich_items_with_recovery(
+                    items, timeout, http_results, writer,
+                    priorities=priorities, deadline=deadline, max_details=max_details,
+                )
+                deferred = self._defer_leftovers(items, full_items, query=query)
+                full_items = [item for item in full_items if item is not None]
+            finally:
+                if search_client:
+                    search_client.close()
+                if http_results is not None:
+                    # Si el presupuesto cortó el detalle, cancelar las descargas que faltan
+                    http_results.close()
+                if enricher:
+                    enricher.close()
+                if fetcher:
+                    fetcher.close()
+                # Lo ya enriquecido llega a la DB aunque la ejecución se corte
+                writer.close()
+
+            # ── Ejecución completa: sin pendientes ──────────
+            if self.config.RESUME_RUNS:
+                clear_checkpoint(query)
+            self._emit({'type': 'saved', 'count': writer.saved})
 
             # ── Guardar CSV (backup) ──────────────────────────
             filename = f"wallapop_{query.replace(' ', '_')}_detalles_{self.timestamp}.csv"
@@ -165,10 +770,194 @@ class WallapopScraper:
                 logging.warning("No se pudo guardar el CSV de backup.")
 
             logging.info("Proceso finalizado con éxito.")
-            self._emit({'type': 'done', 'saved': len(full_items)})
+            event = {'type': 'done', 'saved': len(full_items)}
+            if deferred:
+                event['deferred'] = deferred
+            self._emit(event)
 
         except Exception as e:
             logging.error(f"Error fatal en run: {e}", exc_info=True)
             self._emit({'type': 'error', 'message': str(e)})
         finally:
             self.cleanup()
+
+    # ── Ejecución por lotes ─────────────────────────────────
+
+    def _collect_batch(self, searches, max_items, timeout, listed_by, priorities=None):
+        """Lista cada búsqueda del lote y une sus items por URL.
+
+        listed_by (url -> búsquedas que la listaron) se va rellenando;
+        un item que ya listó otra búsqueda del lote solo suma la query.
+        Una búsqueda que falla se salta y sigue el resto. Tras el listado
+        de cada búsqueda van sus items aplazados; con priorities (dict) se
+        apunta la prioridad de detalle de cada item a enriquecer.
+
+        Con RESUME_RUNS, una búsqueda con pendientes de una ejecución
+        cortada no se lista: entran solo sus pendientes. Los items a
+        enriquecer se apuntan en el checkpoint de cada búsqueda que los
+        lista, como en run().
+
+        Returns:
+            (items únicos a enriquecer, URLs sin cambios)
+        """
+        if self.incremental or self.config.RESUME_RUNS:
+            init_db()
+        items, unchanged = [], []
+        to_enrich = set()   # URLs que van al detalle (para el checkpoint de cada búsqueda)
+        for search in searches:
+            query = search['query']
+            search_client = None
+            avg_price = None
+            listed = repeated = 0
+
+            def add(batch, split=True):
+                nonlocal listed, repeated
+                new, checkpoint = [], []
+                for item in batch:
+                    queries = listed_by.setdefault(item['url'], [])
+                    if not queries:
+                        new.append(item)
+                    elif query not in queries:
+                        repeated += 1
+                        if item['url'] in to_enrich:
+                            checkpoint.append(item)
+                    if query not in queries:
+                        queries.append(query)
+                listed += len(batch)
+                if self.incremental and split:
+                    new, batch_unchanged = self._split_known(new, priorities, avg_price)
+                    unchanged.extend(batch_unchanged)
+                to_enrich.update(item['url'] for item in new)
+                if self.config.RESUME_RUNS:
+                    save_checkpoint(query, new + checkpoint)
+                items.extend(new)
+
+            pending = self._resume_items(query)
+            if pending:
+                logging.info(f"[{query}] Reanudando ejecución anterior: {len(pending)} items pendientes.")
+                add(pending, split=False)
+                logging.info(f"[{query}] {listed} pendientes, {repeated} ya vistos en otra búsqueda del lote.")
+                continue
+
+            known_urls = self._known_urls_for_early_stop(query, search.get('filters'))
+            if self.incremental:
+                avg_price = self._query_avg_price(query)
+            try:
+                results, search_client = self._open_search(query, search.get('filters'), known_urls, timeout)
+                batches = results.iter_item_batches(
+                    max_items=search.get('max_items') or max_items,
+                    known_urls=known_urls,
+                    stop_after_known=self.config.EARLY_STOP_KNOWN,
+                )
+                for batch in self._with_deferred(batches, query):
+                    add(batch)
+            except Exception as e:
+                logging.error(f"Error listando '{query}' en el lote, se sigue con el resto: {e}")
+            finally:
+                if search_client:
+                    search_client.close()
+            logging.info(f"[{query}] {listed} items listados, {repeated} ya vistos en otra búsqueda del lote.")
+        return items, unchanged
+
+    def _link_unchanged(self, unchanged, listed_by):
+        """Actualiza los items sin cambios y los asocia a cada búsqueda que los listó."""
+        by_query = {}
+        for url in unchanged:
+            for query in listed_by.get(url, []):
+                by_query.setdefault(query, []).append(url)
+        for query, urls in by_query.items():
+            touch_items(urls, query=query)
+
+    def run_batch(self, searches, max_items=None):
+        """Scrapea varias búsquedas en una sola sesión de navegador.
+
+        Lista las búsquedas una tras otra y une sus URLs: cada URL se
+        enriquece una sola vez aunque la listen varias búsquedas (p.ej.
+        "Korg Nano" y "Korg nanoKONTROL") y se guarda asociada a todas
+        ellas (tabla item_queries). El detalle empieza cuando están
+        listadas todas. Con RESUME_RUNS cada búsqueda lleva su checkpoint:
+        si el lote se corta, la siguiente ejecución (en lote o suelta)
+        retoma solo lo que quedó pendiente de cada una.
+
+        Args:
+            searches: Lista de dicts {query, filters, max_items} como los
+                de searches.json (filters y max_items opcionales).
+            max_items: Máximo por búsqueda para las que no traen el suyo.
+        """
+        queries = [search['query'] for search in searches]
+        label = " + ".join(queries)
+        try:
+            self.initialize(f"lote_{len(queries)}_busquedas")
+
+            if max_items is None:
+                max_items = getattr(self.config, 'MAX_ITEMS', None)
+
+            logging.info("=" * 50)
+            logging.info(f"SCRAPER WALLAPOP (lote): {label}")
+            logging.info("=" * 50)
+
+            self._emit({'type': 'start', 'query': label})
+
+            timeout = self.config.TIMEOUT_DEFAULT
+            deadline, max_details = self._budget()
+            listed_by = {}
+            priorities = {}
+            writer = ItemWriter(
+                queries[0],
+                batch_size=self.config.DB_BATCH_SIZE,
+                max_delay=self.config.DB_FLUSH_SECONDS,
+                checkpoint=self.config.RESUME_RUNS,
+                queries_by_url=listed_by,
+            )
+            try:
+                # ── Resultados de todas las búsquedas ───────
+                items, unchanged = self._collect_batch(searches, max_items, timeout, listed_by, priorities)
+                self._link_unchanged(unchanged, listed_by)
+
+                if not items and not unchanged:
+                    logging.warning("No se encontraron items para ninguna búsqueda del lote.")
+                    self._emit({'type': 'done', 'saved': 0})
+                    return
+
+                logging.info(
+                    f"Lote: {len(listed_by)} URLs únicas, {len(unchanged)} sin cambios, "
+                    f"{len(items)} a enriquecer."
+                )
+                self._emit({'type': 'items_found', 'count': len(items), 'unchanged': len(unchanged)})
+
+                if not items:
+                    self._emit({'type': 'done', 'saved': 0})
+                    return
+
+                # ── Detalle: una vez por URL ────────────────
+                self._block_resources('detail')
+                full_items = self._enrich_items_with_recovery(
+                    items, timeout, writer=writer,
+                    priorities=priorities, deadline=deadline, max_details=max_details,
+                )
+                deferred = self._defer_leftovers(items, full_items, listed_by=listed_by)
+                full_items = [item for item in full_items if item is not None]
+            finally:
+                writer.close()
+
+            # ── Lote completo: sin pendientes ───────────────
+            if self.config.RESUME_RUNS:
+                for query in queries:
+                    clear_checkpoint(query)
+            self._emit({'type': 'saved', 'count': writer.saved})
+
+            filename = f"wallapop_lote_detalles_{self.timestamp}.csv"
+            if not save_to_csv(full_items, filename, self.config.OUTPUT_DIR):
+                logging.warning("No se pudo guardar el CSV de backup.")
+
+            logging.info("Lote finalizado con éxito.")
+            event = {'type': 'done', 'saved': len(full_items)}
+            if deferred:
+                event['deferred'] = deferred
+            self._emit(event)
+
+        except Exception as e:
+            logging.error(f"Error fatal en run_batch: {e}", exc_info=True)
+            self._emit({'type': 'error', 'message': str(e)})
+        finally:
+            self.cleanup()
@@ -0,0 +1,241 @@
+"""
+Items del listado leídos de la API JSON de búsqueda de Wallapop.
+
+El grid de resultados lo rellena el front end con llamadas a la API de
+búsqueda (api.wallapop.com/api/v3/search...). Con el log de rendimiento
+de Chrome activo (Config.SEARCH_API_CAPTURE) se ven esas respuestas
+mientras se hace scroll y su cuerpo se pide por CDP
+(Network.getResponseBody), así que los items salen ya estructurados:
+id, título, precio numérico, ubicación, imágenes y fechas, sin
+heurísticas de clases CSS ni leer el DOM.
+
+Si no se captura nada (primera página renderizada en servidor, driver
+sin log de rendimiento...), SearchResultsPage lee los cards del DOM
+como siempre.
+"""
+
+import re
+import json
+import base64
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+ITEM_BASE_URL = "https://www.wallapop.com/item/"
+
+# Respuestas de búsqueda del front end (/api/v3/search, /api/v3/search/section,
+# /api/v3/general/search...)
+SEARCH_API_RE = re.compile(r"api\.wallapop\.com/api/v\d+/(?:general/)?search")
+
+# Claves bajo las que la API devuelve la lista de items según la versión
+_ITEM_LIST_KEYS = ("items", "search_objects")
+_MAX_DEPTH = 6
+
+# Prefiltro barato antes de parsear cada entrada del log (la mayoría son de otros eventos)
+_LOG_METHODS = ('"Network.responseReceived"', '"Network.loadingFinished"')
+
+
+# ── Respuesta JSON -> items ─────────────────────────────────
+
+def _timestamp(value):
+    """Fecha ISO de un timestamp de la API (milisegundos o segundos epoch)."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return value if isinstance(value, str) and value else None
+    if value > 1e11:
+        value /= 1000
+    try:
+        return datetime.fromtimestamp(value).isoformat(timespec="seconds")
+    except (OverflowError, OSError, ValueError):
+        return None
+
+
+def _price(obj):
+    """(importe, moneda) de un item: {'amount', 'currency'} o número suelto."""
+    price = obj.get("price")
+    currency = obj.get("currency")
+    if isinstance(price, dict):
+        currency = price.get("currency") or currency
+        price = price.get("amount")
+    if isinstance(price, bool) or not isinstance(price, (int, float)):
+        return None, currency
+    return float(price), currency
+
+
+def _location(obj):
+    location = obj.get("location")
+    if isinstance(location, dict):
+        location = location.get("city") or location.get("postal_code")
+    if isinstance(location, str) and location.strip():
+        return location.strip()
+    return None
+
+
+def _images(obj):
+    """URLs de las imágenes, la de mayor tamaño disponible de cada una."""
+    urls = []
+    for image in obj.get("images") or []:
+        if isinstance(image, str):
+            urls.append(image)
+            continue
+        if not isinstance(image, dict):
+            continue
+        sizes = image.get("urls") if isinstance(image.get("urls"), dict) else image
+        for size in ("big", "original", "medium", "small"):
+            if sizes.get(size):
+                urls.append(sizes[size])
+                break
+    return urls
+
+
+def item_from_api(obj):
+    """Item del listado a partir de un objeto de la API, o None si no tiene URL.
+
+    Mismas claves que los cards del DOM (url, title, price, location,
+    description) más item_id, currency, images, created_at y modified_at.
+    El precio es numérico.
+    """
+    slug = obj.get("web_slug") or obj.get("slug")
+    if slug:
+        url = ITEM_BASE_URL + slug
+    elif isinstance(obj.get("share_url"), str) and "/item/" in obj["share_url"]:
+        url = obj["share_url"]
+    else:
+        return None
+
+    amount, currency = _price(obj)
+    title = obj.get("title")
+    return {
+        'url': url,
+        'title': " ".join(title.split()) if isinstance(title, str) and title.strip() else "No disponible",
+        'price': amount if amount is not None else "No disponible",
+        'location': _location(obj) or "pending",
+        # La descripción completa la sigue dando el detalle
+        'description': 'pending',
+        'item_id': obj.get("id"),
+        'currency': currency or "EUR",
+        'images': _images(obj),
+        'created_at': _timestamp(obj.get("created_at") or obj.get("creation_date")),
+        'modified_at': _timestamp(obj.get("modified_at") or obj.get("modification_date")),
+    }
+
+
+def _find_item_list(obj, depth=0):
+    """Primera lista de items (dicts con título) dentro de la respuesta."""
+    if depth > _MAX_DEPTH or not isinstance(obj, dict):
+        return None
+    for key in _ITEM_LIST_KEYS:
+        value = obj.get(key)
+        if isinstance(value, list) and any(isinstance(v, dict) and "title" in v for v in value):
+            return value
+    for value in obj.values():
+        found = _find_item_list(value, depth + 1)
+        if found is not None:
+            return found
+    return None
+
+
+def parse_search_response(data):
+    """Items de una respuesta de la API de búsqueda (dict ya decodificado)."""
+    items = []
+    for obj in _find_item_list(data) or []:
+        if isinstance(obj, dict):
+            item = item_from_api(obj)
+            if item:
+                items.append(item)
+    return items
+
+
+# ── Captura desde el log de rendimiento ─────────────────────
+
+class SearchApiCapture:
+    """Recoge los items de las respuestas de búsqueda que va viendo Chrome.
+
+    Requiere un driver arrancado con el log de rendimiento activo
+    (goog:loggingPrefs, ver init_driver). Crear con start() antes de
+    navegar a los resultados y llamar a drain() tras cada scroll.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self._pending = {}   # requestId -> URL de respuestas de búsqueda aún sin terminar
+        self._seen = set()   # URLs de items ya devueltos
+        self.responses = 0
+        self.errors = 0
+
+    @classmethod
+    def start(cls, driver):
+        """Empieza a capturar, descartando lo que ya hubiera en el log.
+
+        Returns:
+            SearchApiCapture, o None si el driver no tiene log de rendimiento.
+        """
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.get_log("performance")
+        except Exception as e:
+            logger.info("Captura de la API de búsqueda no disponible: %s", e)
+            return None
+        return cls(driver)
+
+    def reset(self):
+        """Olvida las respuestas pendientes y el log acumulado (p.ej. antes de recargar)."""
+        discard_performance_log(self.driver)
+        self._pending.clear()
+
+    def drain(self):
+        """Items nuevos de las respuestas de búsqueda terminadas desde la última llamada."""
+        try:
+            entries = self.driver.get_log("performance")
+        except Exception as e:
+            logger.warning("No se pudo leer el log de rendimiento: %s", e)
+            return []
+
+        items = []
+        for entry in entries:
+            raw = entry.get("message", "")
+            if not any(method in raw for method in _LOG_METHODS):
+                continue
+            try:
+                message = json.loads(raw).get("message", {})
+            except ValueError:
+                continue
+            params = message.get("params", {})
+            request_id = params.get("requestId")
+            if message.get("method") == "Network.responseReceived":
+                response = params.get("response", {})
+                if response.get("status") == 200 and SEARCH_API_RE.search(response.get("url", "")):
+                    self._pending[request_id] = response["url"]
+            elif request_id in self._pending:
+                url = self._pending.pop(request_id)
+                items.extend(self._read_body(request_id, url))
+        return items
+
+    def _read_body(self, request_id, url):
+        try:
+            body = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+            text = body.get("body", "")
+            if body.get("base64Encoded"):
+                text = base64.b64decode(text).decode("utf-8")
+            data = json.loads(text)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("No se pudo leer la respuesta de %s: %s", url, e)
+            return []
+
+        self.responses += 1
+        items = []
+        for item in parse_search_response(data):
+            if item['url'] not in self._seen:
+                self._seen.add(item['url'])
+                items.append(item)
+        logger.debug("API de búsqueda: %d items nuevos de %s", len(items), url)
+        return items
+
+
+def discard_performance_log(driver):
+    """Vacía el log de rendimiento para que no crezca en páginas que no se capturan."""
+    try:
+        driver.get_log("performance")
+    except Exception:
+        pass
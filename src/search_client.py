@@ -0,0 +1,186 @@
+"""
+Cliente de búsqueda sin navegador.
+
+Pagina directamente el endpoint JSON de búsqueda de Wallapop
+(Config.SEARCH_API_URL) con requests sobre un pool de conexiones
+keep-alive, en vez de abrir los resultados en Chrome y hacer scroll.
+Las cookies y el User-Agent salen de una sesión de navegador ya abierta
+(from_driver), así que Chrome solo se usa para arrancarla y, si hace
+falta, para el detalle.
+
+Devuelve los mismos dicts de item que SearchResultsPage (url, title,
+price, location, description) con los campos extra de la API (ver
+src.search_api.item_from_api), y tiene la misma interfaz de listado
+(open + iter_item_batches), así que WallapopScraper lo usa como
+estrategia alternativa (Config.SEARCH_CLIENT = "api").
+"""
+
+import logging
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.config import Config
+from src.http_fetcher import DEFAULT_HEADERS, BLOCK_STATUSES, browser_session
+from src.rate_limiter import get_rate_limiter
+from src.search_api import parse_search_response
+from src.search_filters import search_params
+
+logger = logging.getLogger(__name__)
+
+API_HEADERS = {
+    "Accept": "application/json, text/plain, */*",
+    "X-DeviceOS": "0",
+}
+
+
+def api_headers(base_url=None):
+    """API_HEADERS con Origin y Referer del sitio de base_url (por defecto Config.BASE_URL).
+
+    Es el mismo origen que el de la sesión de navegador cuyas cookies se reutilizan.
+    """
+    parts = urlparse(base_url or Config.BASE_URL)
+    origin = f"{parts.scheme}://{parts.netloc}"
+    return {**API_HEADERS, "Origin": origin, "Referer": origin + "/"}
+
+
+class SearchApiClient:
+    """Lista los items de una búsqueda paginando la API JSON.
+
+    Args:
+        api_url: URL del endpoint (por defecto Config.SEARCH_API_URL).
+        timeout: Timeout (s) de cada request.
+        pool_size: Conexiones keep-alive a mantener por host.
+        headers: Headers extra (se mezclan con los de navegador y API).
+        cookies: Dict nombre -> valor a enviar en cada request.
+        max_pages: Páginas máximas por búsqueda (por defecto Config.SEARCH_API_MAX_PAGES).
+        rate_limiter: RateLimiter del que tirar (por defecto el compartido).
+        adapter: Transport adapter de requests a montar en lugar del pool HTTP.
+    """
+
+    def __init__(self, api_url=None, timeout=10, pool_size=4, headers=None, cookies=None,
+                 max_pages=None, rate_limiter=None, adapter=None):
+        self.api_url = api_url or Config.SEARCH_API_URL
+        self.timeout = timeout
+        self.max_pages = Config.SEARCH_API_MAX_PAGES if max_pages is None else max_pages
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.session = requests.Session()
+        if adapter is None:
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(DEFAULT_HEADERS)
+        self.session.headers.update(api_headers())
+        if headers:
+            self.session.headers.update(headers)
+        for name, value in (cookies or {}).items():
+            self.session.cookies.set(name, value)
+        self.pages = 0
+        self._first = None   # (items, next_page) de la primera página, ya descargada por open()
+
+    @classmethod
+    def from_driver(cls, driver, **kwargs):
+        """Crea un cliente con las cookies y el User-Agent del navegador vivo."""
+        headers, cookies = browser_session(driver, kwargs.pop("headers", None), kwargs.pop("cookies", None))
+        return cls(headers=headers, cookies=cookies, **kwargs)
+
+    def fetch_page(self, params):
+        """Descarga una página de resultados.
+
+        Returns:
+            (items, next_page): items de la página y token de la siguiente
+            (None si es la última).
+
+        Raises:
+            requests.RequestException: error de red o status distinto de 200.
+            ValueError: la respuesta no es JSON.
+        """
+        self.rate_limiter.acquire(self.api_url)
+        try:
+            response = self.session.get(self.api_url, params=params, timeout=self.timeout)
+        except requests.RequestException:
+            self.rate_limiter.report_failure(self.api_url)
+            raise
+        if response.status_code in BLOCK_STATUSES or response.status_code >= 500:
+            self.rate_limiter.report_failure(self.api_url, blocked=response.status_code in BLOCK_STATUSES)
+        response.raise_for_status()
+        data = response.json()
+        self.rate_limiter.report_success(self.api_url)
+        self.pages += 1
+
+        # v3 devuelve el token en meta.next_page; versiones anteriores en la cabecera X-NextPage
+        meta = data.get("meta") if isinstance(data, dict) else None
+        next_page = (meta or {}).get("next_page") or response.headers.get("X-NextPage")
+        return parse_search_response(data), next_page or None
+
+    def open(self, query, filters=None):
+        """Descarga la primera página de la búsqueda.
+
+        Lanza la excepción de fetch_page si falla, para que el llamador
+        pueda volver a la búsqueda con navegador.
+        """
+        params = search_params(query, filters)
+        params["source"] = "search_box"
+        logger.info(f"Búsqueda por API: {self.api_url} {params}")
+        self.pages = 0
+        self._first = self.fetch_page(params)
+
+    def iter_item_batches(self, max_items=None, known_urls=None, stop_after_known=None):
+        """Genera los items página a página, como SearchResultsPage.iter_item_batches.
+
+        Se para al llegar a max_items, tras stop_after_known items conocidos
+        seguidos (resultados por más recientes), al acabarse las páginas o
+        tras max_pages. Un error en una página intermedia corta el listado
+        con lo ya devuelto.
+        """
+        if self._first is None:
+            raise RuntimeError("Búsqueda no abierta: llamar antes a open()")
+        page, next_page = self._first
+        self._first = None
+        seen = set()
+        known_run = 0
+
+        while True:
+            batch = []
+            for item in page:
+                if max_items and len(seen) >= max_items:
+                    break
+                if item['url'] in seen:
+                    continue
+                seen.add(item['url'])
+                batch.append(item)
+                known_run = known_run + 1 if known_urls and item['url'] in known_urls else 0
+            logger.info(f"API: página {self.pages}, {len(batch)} items nuevos ({len(seen)} en total)")
+            if batch:
+                yield batch
+
+            if max_items and len(seen) >= max_items:
+                logger.info(f"Alcanzado máximo de {max_items} items.")
+                return
+            if known_urls and stop_after_known and known_run >= stop_after_known:
+                logger.info(f"{known_run} items conocidos seguidos. Fin de items nuevos.")
+                return
+            if not next_page:
+                logger.info("No hay más páginas. Fin de resultados.")
+                return
+            if self.max_pages and self.pages >= self.max_pages:
+                logger.info(f"Alcanzado máximo de {self.max_pages} páginas.")
+                return
+            try:
+                page, next_page = self.fetch_page({"next_page": next_page})
+            except Exception as e:
+                logger.warning(f"Error en la página {self.pages + 1} de la API, fin del listado: {e}")
+                return
+
+    def iter_items(self, max_items=None, known_urls=None, stop_after_known=None):
+        """Como iter_item_batches, pero item a item."""
+        for batch in self.iter_item_batches(max_items, known_urls, stop_after_known):
+            yield from batch
+
+    def extract_items(self, max_items=None, known_urls=None, stop_after_known=None):
+        """Lista completa de items de la búsqueda abierta (ver SearchResultsPage.extract_items)."""
+        return list(self.iter_items(max_items, known_urls, stop_after_known))
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,110 @@
+"""
+Filtros de búsqueda que se aplican en el propio Wallapop.
+
+Cada búsqueda de searches.json puede llevar un objeto "filters":
+
+    {
+      "query": "Behringer XR18",
+      "interval_minutes": 30,
+      "filters": {
+        "min_price": 100,
+        "max_price": 600,
+        "order_by": "newest",
+        "latitude": 40.4168, "longitude": -3.7038, "distance_km": 50,
+        "condition": ["new", "as_good_as_new", "good"]
+      }
+    }
+
+Se traducen a parámetros de la URL de resultados (search_params), así
+que es el servidor quien descarta los items fuera de rango: llegan menos
+cards y hay menos que hacer scroll y enriquecer.
+"""
+
+ORDER_BY = ("most_relevance", "newest", "price_low_to_high", "price_high_to_low", "closest")
+CONDITIONS = ("new", "as_good_as_new", "good", "fair", "has_given_it_all")
+
+FILTER_KEYS = ("min_price", "max_price", "order_by", "latitude", "longitude", "distance_km", "condition")
+
+
+def _number(filters, key, minimum=None, maximum=None):
+    value = filters.get(key)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"'{key}' debe ser numérico")
+    if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+        raise ValueError(f"'{key}' fuera de rango: {value}")
+    return value
+
+
+def normalize_filters(filters):
+    """Valida los filtros de una búsqueda y devuelve solo los informados.
+
+    Raises:
+        ValueError: con un mensaje legible si algún filtro no es válido.
+    """
+    if not filters:
+        return {}
+    if not isinstance(filters, dict):
+        raise ValueError("'filters' debe ser un objeto")
+    unknown = set(filters) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"Filtros desconocidos: {', '.join(sorted(unknown))}")
+
+    result = {}
+    for key in ("min_price", "max_price"):
+        value = _number(filters, key, minimum=0)
+        if value is not None:
+            result[key] = value
+    if "min_price" in result and "max_price" in result and result["min_price"] > result["max_price"]:
+        raise ValueError("'min_price' no puede ser mayor que 'max_price'")
+
+    order_by = filters.get("order_by")
+    if order_by is not None:
+        if order_by not in ORDER_BY:
+            raise ValueError(f"'order_by' debe ser uno de: {', '.join(ORDER_BY)}")
+        result["order_by"] = order_by
+
+    latitude = _number(filters, "latitude", -90, 90)
+    longitude = _number(filters, "longitude", -180, 180)
+    if (latitude is None) != (longitude is None):
+        raise ValueError("'latitude' y 'longitude' van juntas")
+    if latitude is not None:
+        result["latitude"] = latitude
+        result["longitude"] = longitude
+    distance = _number(filters, "distance_km", minimum=0)
+    if distance is not None:
+        if latitude is None:
+            raise ValueError("'distance_km' requiere 'latitude' y 'longitude'")
+        result["distance_km"] = distance
+
+    condition = filters.get("condition")
+    if condition:
+        condition = [condition] if isinstance(condition, str) else list(condition)
+        invalid = [c for c in condition if c not in CONDITIONS]
+        if invalid:
+            raise ValueError(f"'condition' no válida: {', '.join(map(str, invalid))}")
+        result["condition"] = condition
+
+    return result
+
+
+def search_params(query, filters=None):
+    """Parámetros de la URL de resultados para una query y sus filtros."""
+    filters = normalize_filters(filters)
+    params = {"keywords": query}
+    if "min_price" in filters:
+        params["min_sale_price"] = filters["min_price"]
+    if "max_price" in filters:
+        params["max_sale_price"] = filters["max_price"]
+    if "order_by" in filters:
+        params["order_by"] = filters["order_by"]
+    if "latitude" in filters:
+        params["latitude"] = filters["latitude"]
+        params["longitude"] = filters["longitude"]
+    if "distance_km" in filters:
+        # Wallapop espera la distancia en metros
+        params["distance"] = int(filters["distance_km"] * 1000)
+    if "condition" in filters:
+        params["condition"] = ",".join(filters["condition"])
+    return params
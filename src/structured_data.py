@@ -0,0 +1,229 @@
+"""
+Extracción de datos estructurados embebidos en las páginas de detalle.
+
+Antes de recorrer el DOM con heurísticas de clases CSS (que cambian con
+cada despliegue de Wallapop), se leen con búsquedas directas las fuentes
+que la propia página publica para buscadores y para hidratar la app:
+
+  1. JSON-LD (<script type="application/ld+json">) con Product/Offer.
+  2. Estado serializado de la app (<script id="__NEXT_DATA__"> u otros
+     <script type="application/json">).
+  3. Meta tags og:* / product:price:*.
+
+extract_structured() devuelve, por campo, el valor y la fuente de la que
+salió, para que el llamador complete solo lo que falte.
+"""
+
+import json
+
+from src.parsing import find_all, find_first, node_attr, script_content
+
+FIELDS = ("title", "price", "location", "description")
+
+SOURCE_JSON_LD = "json-ld"
+SOURCE_APP_STATE = "app-state"
+SOURCE_META = "og"
+
+_MAX_DEPTH = 12  # Profundidad máxima al buscar el item dentro del estado de la app
+
+
+# ── Utilidades ──────────────────────────────────────────────
+
+def format_price(amount, currency="EUR"):
+    """Formatea un importe como lo muestra la web ('1.200€', '12,50€')."""
+    try:
+        value = float(amount)
+    except (TypeError, ValueError):
+        return None
+    if value.is_integer():
+        text = f"{int(value):,}".replace(",", ".")
+    else:
+        text = f"{value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    if not currency or currency.upper() == "EUR":
+        return f"{text}€"
+    return f"{text} {currency}"
+
+
+def _text(value):
+    """Texto de un campo que puede venir como string o {'original': ...}."""
+    if isinstance(value, dict):
+        value = value.get("original") or value.get("text") or value.get("name")
+    if isinstance(value, str) and value.strip():
+        return " ".join(value.split())
+    return None
+
+
+def _load_json(script):
+    try:
+        return json.loads(script_content(script))
+    except (ValueError, TypeError):
+        return None
+
+
+def _find_key(obj, key, depth=0):
+    """Primer valor de `key` en una estructura JSON anidada."""
+    if depth > _MAX_DEPTH:
+        return None
+    if isinstance(obj, dict):
+        if obj.get(key) not in (None, ""):
+            return obj[key]
+        children = obj.values()
+    elif isinstance(obj, list):
+        children = obj
+    else:
+        return None
+    for child in children:
+        found = _find_key(child, key, depth + 1)
+        if found not in (None, ""):
+            return found
+    return None
+
+
+# ── JSON-LD ─────────────────────────────────────────────────
+
+def _json_ld_products(soup):
+    products = []
+    for script in find_all(soup, "script", type="application/ld+json"):
+        data = _load_json(script)
+        nodes = data if isinstance(data, list) else [data]
+        for node in nodes:
+            if isinstance(node, dict) and "@graph" in node:
+                nodes.extend(node["@graph"])
+                continue
+            types = node.get("@type") if isinstance(node, dict) else None
+            types = types if isinstance(types, list) else [types]
+            if "Product" in types:
+                products.append(node)
+    return products
+
+
+def _from_json_ld(product):
+    fields = {}
+    if _text(product.get("name")):
+        fields["title"] = _text(product["name"])
+    if _text(product.get("description")):
+        fields["description"] = _text(product["description"])
+
+    offers = product.get("offers")
+    offer = offers[0] if isinstance(offers, list) and offers else offers
+    if isinstance(offer, dict):
+        price = format_price(offer.get("price", offer.get("lowPrice")), offer.get("priceCurrency"))
+        if price:
+            fields["price"] = price
+
+    locality = _text(_find_key(product, "addressLocality"))
+    if locality:
+        fields["location"] = locality
+    return fields
+
+
+# ── Estado de la app ────────────────────────────────────────
+
+def _find_item_state(obj, keys, depth=0):
+    """Busca el dict del item: el primero que tenga todas las `keys`."""
+    if depth > _MAX_DEPTH:
+        return None
+    if isinstance(obj, dict):
+        if all(key in obj for key in keys):
+            return obj
+        children = obj.values()
+    elif isinstance(obj, list):
+        children = obj
+    else:
+        return None
+    for child in children:
+        found = _find_item_state(child, keys, depth + 1)
+        if found is not None:
+            return found
+    return None
+
+
+def _price_from_state(price):
+    if isinstance(price, dict):
+        price = price.get("cash", price)
+        return format_price(price.get("amount"), price.get("currency"))
+    return format_price(price)
+
+
+def _from_app_state(state):
+    fields = {}
+    for name in ("title", "description"):
+        value = _text(state.get(name))
+        if value:
+            fields[name] = value
+    price = _price_from_state(state.get("price"))
+    if price:
+        fields["price"] = price
+    location = state.get("location")
+    city = _text(location.get("city")) if isinstance(location, dict) else _text(location)
+    if city:
+        fields["location"] = city
+    return fields
+
+
+def _app_state_scripts(soup):
+    script = find_first(soup, "script", id="__NEXT_DATA__")
+    if script is not None:
+        return [script]
+    return find_all(soup, "script", type="application/json")
+
+
+# ── Meta tags ───────────────────────────────────────────────
+
+def _meta(soup, name):
+    tag = find_first(soup, "meta", property=name)
+    if tag is None:
+        tag = find_first(soup, "meta", name=name)
+    content = node_attr(tag, "content", "") if tag is not None else ""
+    return " ".join(content.split()) or None
+
+
+def _from_meta(soup):
+    fields = {}
+    title = _meta(soup, "og:title")
+    if title:
+        fields["title"] = title
+    description = _meta(soup, "og:description")
+    if description:
+        fields["description"] = description
+    amount = _meta(soup, "product:price:amount")
+    if amount:
+        price = format_price(amount, _meta(soup, "product:price:currency"))
+        if price:
+            fields["price"] = price
+    return fields
+
+
+# ── API ─────────────────────────────────────────────────────
+
+def extract_structured(soup):
+    """Extrae campos de los datos estructurados de la página.
+
+    Returns:
+        Dict campo -> (valor, fuente) con los campos encontrados; la
+        fuente es SOURCE_JSON_LD, SOURCE_APP_STATE o SOURCE_META. Un campo
+        se toma de la primera fuente que lo tenga, en ese orden.
+    """
+    found = {}
+
+    def merge(fields, source):
+        for name, value in fields.items():
+            found.setdefault(name, (value, source))
+
+    for product in _json_ld_products(soup):
+        merge(_from_json_ld(product), SOURCE_JSON_LD)
+
+    if len(found) < len(FIELDS):
+        for script in _app_state_scripts(soup):
+            data = _load_json(script)
+            # Título + precio identifica al item; título + descripción sola
+            # también la tienen los bloques de SEO, así que va después
+            state = _find_item_state(data, ("title", "price")) or _find_item_state(data, ("title", "description"))
+            if state:
+                merge(_from_app_state(state), SOURCE_APP_STATE)
+                break
+
+    if len(found) < len(FIELDS):
+        merge(_from_meta(soup), SOURCE_META)
+
+    return found
@@ -3,6 +3,8 @@ import csv
 import logging
 from datetime import datetime
 
+from src.parsing import node_text
+
 def setup_logging(query, log_dir="logs"):
     """Configura el sistema de logging"""
     os.makedirs(log_dir, exist_ok=True)
@@ -42,7 +44,8 @@ def save_to_csv(data, filename, output_dir="output"):
                     item[field] = "No disponible"
         
         with open(filepath, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            # Los items de la API traen más campos (imágenes, fechas...) que no van al CSV
+            writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
             writer.writeheader()
             writer.writerows(data)
         
@@ -53,8 +56,8 @@ def save_to_csv(data, filename, output_dir="output"):
         return False
 
 def extract_text_safe(element, default="No disponible"):
-    """Helper para extraer texto de BS4 elements"""
-    if element:
-        text = element.get_text(separator=' ', strip=True)
+    """Helper para extraer texto de elementos (BS4 o lxml)"""
+    if element is not None:
+        text = node_text(element)
         return text if text else default
     return default
@@ -1,7 +1,11 @@
 import json
 import sqlite3
+import threading
 import pytest
+from http.server import HTTPServer, SimpleHTTPRequestHandler, BaseHTTPRequestHandler
 from pathlib import Path
+from types import SimpleNamespace
+from urllib.parse import urlparse, parse_qs
 from unittest.mock import MagicMock
 
 FIXTURES_DIR = Path(__file__).parent / "fixtures"
@@ -46,6 +50,20 @@ def api_client(db_path, searches_file):
     return TestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def fast_rate_limiter(monkeypatch):
+    """Rate limiter compartido sin esperas reales para no ralentizar los tests."""
+    import src.rate_limiter as rl
+    monkeypatch.setattr(rl, "_shared_limiter", rl.RateLimiter(rate=10_000, burst=10_000))
+
+
+@pytest.fixture(autouse=True)
+def inline_parse_pool(monkeypatch):
+    """Parseo en el propio thread: los tests no arrancan procesos salvo que los pidan."""
+    import src.parse_pool as pp
+    monkeypatch.setattr(pp, "_shared_pool", pp.ParsePool(processes=0))
+
+
 @pytest.fixture(autouse=True)
 def reset_active_scrapes():
     """Limpia el estado de scrapes entre tests para evitar estado compartido."""
@@ -78,3 +96,78 @@ def search_results_html():
 @pytest.fixture
 def item_detail_html():
     return (FIXTURES_DIR / "item_detail.html").read_text(encoding="utf-8")
+
+
+@pytest.fixture
+def item_detail_jsonld_html():
+    return (FIXTURES_DIR / "item_detail_jsonld.html").read_text(encoding="utf-8")
+
+
+@pytest.fixture
+def item_detail_state_html():
+    return (FIXTURES_DIR / "item_detail_state.html").read_text(encoding="utf-8")
+
+
+# ── Stub HTTP server ─────────────────────────────────────────────────────────
+
+class _QuietFixtureHandler(SimpleHTTPRequestHandler):
+    """Sirve tests/fixtures/ sin escribir en stderr."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=str(FIXTURES_DIR), **kwargs)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def fixture_server():
+    """Servidor HTTP local que sirve los fixtures. Devuelve la URL base."""
+    server = HTTPServer(("127.0.0.1", 0), _QuietFixtureHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+class _SearchApiHandler(BaseHTTPRequestHandler):
+    """Sirve las respuestas grabadas de tests/fixtures/search_api/.
+
+    Sin next_page devuelve page_1.json y con next_page=X, page_X.json.
+    Cada request queda anotada en server.requests; server.status fuerza
+    un status de error.
+    """
+
+    def do_GET(self):
+        params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        self.server.requests.append({"path": urlparse(self.path).path, "params": params,
+                                     "headers": dict(self.headers)})
+        path = FIXTURES_DIR / "search_api" / f"page_{params.get('next_page', '1')}.json"
+        status = self.server.status or (200 if path.exists() else 404)
+        body = path.read_bytes() if status == 200 else b'{"error": "stub"}'
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def search_api_server():
+    """Stub local de la API de búsqueda. Devuelve url, requests y server (para .status)."""
+    server = HTTPServer(("127.0.0.1", 0), _SearchApiHandler)
+    server.requests = []
+    server.status = None
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield SimpleNamespace(
+        url=f"http://127.0.0.1:{server.server_address[1]}/api/v3/search",
+        requests=server.requests,
+        server=server,
+    )
+    server.shutdown()
+    server.server_close()
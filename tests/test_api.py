@@ -152,6 +152,21 @@ def test_add_search_falta_campo_query(api_client):
     assert resp.status_code == 422
 
 
+def test_add_search_guarda_filtros(api_client):
+    resp = api_client.post("/api/searches", json={
+        "query": "Korg", "interval_minutes": 30,
+        "filters": {"max_price": 100, "order_by": "newest"},
+    })
+    assert resp.status_code == 201
+    saved = api_client.get("/api/searches").json()[0]
+    assert saved["filters"] == {"max_price": 100, "order_by": "newest"}
+
+
+def test_add_search_filtros_invalidos_422(api_client):
+    resp = api_client.post("/api/searches", json={"query": "Korg", "filters": {"max_price": -5}})
+    assert resp.status_code == 422
+
+
 # ── DELETE /api/searches/{query} ─────────────────────────────────────────────
 
 def test_delete_search_existente(api_client):
@@ -193,6 +208,15 @@ def test_force_scrape_duplicado_409(api_client, mocker):
     assert resp.status_code == 409
 
 
+def test_force_scrape_usa_filtros_guardados(api_client, mocker):
+    scraper_cls = mocker.patch("src.api.WallapopScraper")
+    started = mocker.patch("src.api.threading.Thread")
+    api_client.post("/api/searches", json={"query": "Korg", "filters": {"max_price": 100}})
+    api_client.post("/api/scrape", json={"query": "korg"})
+    started.call_args.kwargs["target"]()
+    scraper_cls.return_value.run.assert_called_once_with("korg", max_items=None, filters={"max_price": 100})
+
+
 # ── GET /api/scrape/status ────────────────────────────────────────────────────
 
 def test_scrape_status_sin_activos(api_client):
@@ -261,3 +285,15 @@ def test_stats_con_datos(api_client, db_path):
     data = resp.json()
     assert data["total_items"] == 3
     assert data["unique_queries"] == 2
+
+
+# ── GET /api/metrics/rate-limit ───────────────────────────────────────────────
+
+def test_rate_limit_metrics(api_client):
+    from src.rate_limiter import get_rate_limiter
+    get_rate_limiter().acquire("https://www.wallapop.com/item/1")
+    resp = api_client.get("/api/metrics/rate-limit")
+    assert resp.status_code == 200
+    host = resp.json()["hosts"]["www.wallapop.com"]
+    assert host["requests"] == 1
+    assert "rate" in host and "avg_wait" in host
@@ -103,3 +103,99 @@ def test_extract_lista_de_patrones(mock_driver):
     soup = parse('<span class="location--xyz">Sevilla</span>')
     result = page.extract_from_pattern(soup, ["location", "distance"])
     assert result == "Sevilla"
+
+
+# ── readiness ────────────────────────────────────────────────────────────────
+
+from unittest.mock import MagicMock
+from selenium.webdriver.common.by import By
+from src.pages.base_page import previous_url
+from src.parsing import find_first, node_text
+
+
+class ReadyPage(BasePage):
+    READY_LOCATORS = ((By.TAG_NAME, "h1"),)
+    OPTIONAL_LOCATORS = ((By.CSS_SELECTOR, ".price"),)
+
+
+def make_ready_driver(present, ready_state="interactive", url="https://x.com/item/1"):
+    driver = MagicMock()
+    driver.current_url = url
+    driver.find_elements.side_effect = lambda by, value: [object()] if value in present else []
+    driver.execute_script.return_value = ready_state
+    return driver
+
+
+def test_no_listo_sin_localizadores_obligatorios():
+    driver = make_ready_driver(present={".price"}, ready_state="complete")
+    assert ReadyPage(driver).is_ready(driver) is False
+
+
+def test_listo_con_obligatorios_y_opcionales():
+    driver = make_ready_driver(present={"h1", ".price"})
+    assert ReadyPage(driver).is_ready(driver) is True
+
+
+def test_opcionales_se_esperan_solo_mientras_carga():
+    loading = make_ready_driver(present={"h1"}, ready_state="interactive")
+    assert ReadyPage(loading).is_ready(loading) is False
+    loaded = make_ready_driver(present={"h1"}, ready_state="complete")
+    assert ReadyPage(loaded).is_ready(loaded) is True
+
+
+def test_wait_until_ready_espera_a_dejar_la_url_anterior():
+    driver = make_ready_driver(present={"h1", ".price"}, url="https://x.com/item/anterior")
+    with pytest.raises(Exception):
+        ReadyPage(driver, timeout=0.1).wait_until_ready("https://x.com/item/anterior")
+    driver.current_url = "https://x.com/item/nuevo"
+    assert ReadyPage(driver, timeout=0.1).wait_until_ready("https://x.com/item/anterior")
+
+
+def test_navigate_acepta_redireccion_a_otra_url():
+    driver = make_ready_driver(present={"h1", ".price"}, url="https://x.com/item/anterior")
+    # El sitio redirige el slug viejo al canónico
+    driver.get.side_effect = lambda url: setattr(driver, "current_url", "https://x.com/item/slug-nuevo-1")
+    page = ReadyPage(driver, timeout=0.1)
+    previous = page.navigate("https://x.com/item/slug-viejo-1")
+    assert previous == "https://x.com/item/anterior"
+    assert page.wait_until_ready(previous)
+
+
+def test_previous_url_none_si_se_recarga_la_misma():
+    assert previous_url("https://x.com/item/1", "https://x.com/item/2") == "https://x.com/item/1"
+    assert previous_url("https://x.com/item/1", "https://x.com/item/1") is None
+
+
+# ── Captura acotada ──────────────────────────────────────────────────────────
+
+class ScopedPage(BasePage):
+    ROOT_CONTAINER = "main"
+    EXTRA_CAPTURE = "meta"
+
+
+def test_get_soup_usa_solo_el_contenedor(mock_driver):
+    mock_driver.page_source = "<html><body><h1>Página completa</h1></body></html>"
+    mock_driver.execute_script.return_value = "<html><body><main><h1>Contenedor</h1></main></body></html>"
+    soup = ScopedPage(mock_driver).get_soup()
+    assert node_text(find_first(soup, "h1")) == "Contenedor"
+    assert mock_driver.execute_script.call_args.args[1:] == ("main", "meta")
+
+
+def test_get_soup_sin_contenedor_usa_page_source(mock_driver):
+    mock_driver.page_source = "<html><body><h1>Página completa</h1></body></html>"
+    mock_driver.execute_script.return_value = None
+    soup = ScopedPage(mock_driver).get_soup()
+    assert node_text(find_first(soup, "h1")) == "Página completa"
+
+
+def test_get_soup_captura_acotada_desactivada(mock_driver, mocker):
+    mocker.patch("src.config.Config.SCOPED_CAPTURE", False)
+    mock_driver.page_source = "<h1>Completa</h1>"
+    ScopedPage(mock_driver).get_soup()
+    mock_driver.execute_script.assert_not_called()
+
+
+def test_get_soup_sin_root_container_no_ejecuta_js(mock_driver):
+    mock_driver.page_source = "<h1>Completa</h1>"
+    make_page(mock_driver).get_soup()
+    mock_driver.execute_script.assert_not_called()
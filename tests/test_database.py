@@ -1,6 +1,9 @@
 import json
 import pytest
 from src.database import (
+    defer_items,
+    get_deferred,
+    get_query_avg_price,
     parse_price,
     upsert_item,
     get_items,
@@ -8,6 +11,14 @@ from src.database import (
     get_opportunities,
     get_stats,
     save_items_to_db,
+    get_known_items,
+    get_query_urls,
+    touch_items,
+    get_connection,
+    ItemWriter,
+    save_checkpoint,
+    get_checkpoint,
+    clear_checkpoint,
 )
 
 
@@ -37,6 +48,11 @@ def test_parse_price_grande():
     assert parse_price("10.500,99€") == 10500.99
 
 
+def test_parse_price_numerico_tal_cual():
+    assert parse_price(1200) == 1200.0
+    assert parse_price(12.5) == 12.5
+
+
 def test_parse_price_cero():
     assert parse_price("0€") == 0.0
 
@@ -349,3 +365,234 @@ def test_save_items_to_db_guarda_todos(db_path):
 def test_save_items_to_db_lista_vacia(db_path):
     saved = save_items_to_db([], "macbook")
     assert saved == 0
+
+
+# ── get_known_items / touch_items ────────────────────────────────────────────
+
+def test_get_known_items_solo_devuelve_conocidas(db_path):
+    upsert_item(ITEM_BASE, "macbook")
+    known = get_known_items([ITEM_BASE["url"], "https://wallapop.com/item/nueva"])
+    assert list(known) == [ITEM_BASE["url"]]
+    assert known[ITEM_BASE["url"]]["price"] == 800.0
+    assert known[ITEM_BASE["url"]]["description"] == "Buen estado"
+
+
+def test_get_known_items_lista_vacia(db_path):
+    assert get_known_items([]) == {}
+
+
+def test_get_known_items_mas_urls_que_el_limite_de_parametros(db_path):
+    for i in range(3):
+        upsert_item({**ITEM_BASE, "url": f"https://wallapop.com/item/{i}"}, "macbook")
+    urls = [f"https://wallapop.com/item/{i}" for i in range(1200)]
+    assert len(get_known_items(urls)) == 3
+
+
+def test_touch_items_actualiza_last_seen(db_path):
+    upsert_item(ITEM_BASE, "macbook")
+    conn = get_connection()
+    conn.execute("UPDATE items SET last_seen = '2000-01-01T00:00:00'")
+    conn.commit()
+    conn.close()
+
+    assert touch_items([ITEM_BASE["url"]]) == 1
+    assert get_items()["items"][0]["last_seen"] > "2000-01-01T00:00:00"
+
+
+def test_detail_fetched_at_solo_con_descripcion_real(db_path):
+    upsert_item({**ITEM_BASE, "description": "pending"}, "macbook")
+    assert get_items()["items"][0]["detail_fetched_at"] is None
+
+    upsert_item(ITEM_BASE, "macbook")
+    fetched = get_items()["items"][0]["detail_fetched_at"]
+    assert fetched is not None
+
+    # Un upsert sin descripción no borra la fecha del último detalle
+    upsert_item({**ITEM_BASE, "description": "No disponible"}, "macbook")
+    assert get_items()["items"][0]["detail_fetched_at"] == fetched
+
+
+def test_get_query_urls_filtra_por_query(db_path):
+    upsert_item({**ITEM_BASE, "url": "https://wallapop.com/item/1"}, "macbook")
+    upsert_item({**ITEM_BASE, "url": "https://wallapop.com/item/2"}, "iphone")
+    assert get_query_urls("macbook") == {"https://wallapop.com/item/1"}
+
+
+# ── item_queries (item <-> búsquedas) ────────────────────────────────────────
+
+def test_item_en_dos_busquedas_queda_asociado_a_ambas(db_path):
+    upsert_item(ITEM_BASE, "korg nano")
+    upsert_item(ITEM_BASE, "korg nanokontrol")
+    assert get_query_urls("korg nano") == {ITEM_BASE["url"]}
+    assert get_query_urls("korg nanokontrol") == {ITEM_BASE["url"]}
+    # items.query se queda con la primera búsqueda que lo encontró
+    assert get_items()["items"][0]["query"] == "korg nano"
+
+
+def test_upsert_con_varias_busquedas(db_path):
+    upsert_item(ITEM_BASE, ["korg nano", "korg nanokontrol", "korg nano"])
+    stats = get_stats()
+    assert stats["total_items"] == 1
+    assert {q["query"]: q["count"] for q in stats["queries"]} == {"korg nano": 1, "korg nanokontrol": 1}
+
+
+def test_touch_items_con_query_asocia_la_busqueda(db_path):
+    upsert_item(ITEM_BASE, "korg nano")
+    touch_items([ITEM_BASE["url"]], query="korg nanokontrol")
+    touch_items([ITEM_BASE["url"]], query="korg nanokontrol")
+    assert get_query_urls("korg nanokontrol") == {ITEM_BASE["url"]}
+    assert get_stats()["unique_queries"] == 2
+
+
+def test_init_db_migra_items_de_una_db_anterior(db_path):
+    conn = get_connection()
+    conn.execute("DROP TABLE item_queries")
+    conn.execute("""
+        INSERT INTO items (wallapop_url, title, query, first_seen, last_seen)
+        VALUES ('https://wallapop.com/item/viejo', 'Viejo', 'macbook', '2024-01-01', '2024-01-02')
+    """)
+    conn.commit()
+    conn.close()
+
+    from src.database import init_db
+    init_db()
+    assert get_query_urls("macbook") == {"https://wallapop.com/item/viejo"}
+
+
+def test_opportunities_por_cada_busqueda_del_item(db_path):
+    for i, precio in enumerate([100, 120, 130, 140, 150]):
+        upsert_item({**ITEM_BASE, "url": f"https://wallapop.com/item/{i}", "price": f"{precio}€"},
+                    ["korg", "synth"])
+    result = get_opportunities(query="synth")
+    assert result["total"] == 2
+    assert {i["query"] for i in result["items"]} == {"synth"}
+
+
+# ── ItemWriter ───────────────────────────────────────────────────────────────
+
+def _items(n):
+    return [{**ITEM_BASE, "url": f"https://wallapop.com/item/{i}"} for i in range(n)]
+
+
+def test_writer_guarda_al_llenar_el_lote(db_path):
+    writer = ItemWriter("macbook", batch_size=2, max_delay=60)
+    items = _items(3)
+    writer.add(items[0])
+    assert get_items()["total"] == 0
+    writer.add(items[1])
+    assert get_items()["total"] == 2
+    writer.add(items[2])
+    writer.close()
+    assert get_items()["total"] == 3
+    assert writer.saved == 3
+
+
+def test_writer_guarda_items_antiguos_aunque_el_lote_no_este_lleno(db_path):
+    writer = ItemWriter("macbook", batch_size=100, max_delay=0)
+    writer.add(_items(1)[0])
+    assert get_items()["total"] == 1
+
+
+def test_writer_quita_los_guardados_del_checkpoint(db_path):
+    items = _items(3)
+    save_checkpoint("macbook", items)
+    writer = ItemWriter("macbook", batch_size=2, max_delay=60)
+    writer.add(items[0])
+    writer.add(items[1])
+    assert [i["url"] for i in get_checkpoint("macbook")] == [items[2]["url"]]
+
+
+def test_writer_asocia_cada_item_a_sus_busquedas(db_path):
+    items = _items(2)
+    save_checkpoint("synth", items[:1])
+    writer = ItemWriter("korg", batch_size=10, max_delay=60,
+                        queries_by_url={items[0]["url"]: ["korg", "synth"]})
+    for item in items:
+        writer.add(item)
+    writer.close()
+    assert writer.saved == 2
+    assert get_query_urls("korg") == {items[0]["url"], items[1]["url"]}
+    assert get_query_urls("synth") == {items[0]["url"]}
+    assert get_checkpoint("synth") == []
+
+
+def test_writer_item_erroneo_no_pierde_el_lote(db_path):
+    writer = ItemWriter("macbook", batch_size=2, max_delay=60)
+    writer.add({**ITEM_BASE, "url": "https://wallapop.com/item/ok"})
+    writer.add({"title": "sin url"})
+    assert writer.saved == 1
+    assert get_items()["total"] == 1
+
+
+# ── Checkpoints ──────────────────────────────────────────────────────────────
+
+def test_checkpoint_conserva_items_y_orden(db_path):
+    items = _items(3)
+    save_checkpoint("macbook", items)
+    assert get_checkpoint("macbook") == items
+    assert get_checkpoint("iphone") == []
+
+
+def test_checkpoint_no_duplica_urls(db_path):
+    items = _items(2)
+    save_checkpoint("macbook", items)
+    save_checkpoint("macbook", items)
+    assert len(get_checkpoint("macbook")) == 2
+
+
+def test_clear_checkpoint(db_path):
+    save_checkpoint("macbook", _items(2))
+    save_checkpoint("iphone", _items(1))
+    clear_checkpoint("macbook")
+    assert get_checkpoint("macbook") == []
+    assert len(get_checkpoint("iphone")) == 1
+
+
+def test_checkpoint_caducado_se_descarta(db_path):
+    save_checkpoint("macbook", _items(2))
+    conn = get_connection()
+    conn.execute("UPDATE scrape_checkpoints SET created_at = '2000-01-01T00:00:00'")
+    conn.commit()
+    conn.close()
+    assert get_checkpoint("macbook", max_age_hours=24) == []
+    assert get_checkpoint("macbook") == []
+
+
+# ── Aplazados ────────────────────────────────────────────────────────────────
+
+def test_aplazados_siguen_hasta_guardarse(db_path):
+    items = _items(3)
+    assert defer_items("macbook", items) == 3
+    assert get_deferred("iphone") == []
+    assert get_deferred("macbook") == items
+    # Leerlos no los borra: si la ejecución se corta siguen para la próxima
+    assert get_deferred("macbook") == items
+
+    writer = ItemWriter("macbook", batch_size=100, max_delay=60)
+    writer.add(items[0])
+    writer.close()
+    assert get_deferred("macbook") == items[1:]
+
+
+def test_aplazados_sin_cambios_dejan_de_estar_aplazados(db_path):
+    items = _items(2)
+    save_items_to_db(items, "macbook")
+    defer_items("macbook", items)
+    touch_items([items[0]["url"]], query="macbook")
+    assert get_deferred("macbook") == items[1:]
+
+
+def test_aplazados_caducados_se_descartan(db_path):
+    defer_items("macbook", _items(2))
+    conn = get_connection()
+    conn.execute("UPDATE deferred_items SET deferred_at = '2000-01-01T00:00:00'")
+    conn.commit()
+    conn.close()
+    assert get_deferred("macbook", max_age_hours=24) == []
+
+
+def test_precio_medio_de_la_busqueda(db_path):
+    save_items_to_db([{**item, "price": f"{100 * (n + 1)}€"} for n, item in enumerate(_items(2))], "macbook")
+    save_items_to_db([{"url": "https://wallapop.com/item/otro", "price": "1000€"}], "iphone")
+    assert get_query_avg_price("macbook") == 150.0
+    assert get_query_avg_price("nada") is None
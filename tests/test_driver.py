@@ -0,0 +1,192 @@
+import time
+import threading
+import pytest
+from unittest.mock import MagicMock
+from src.driver import DriverPool
+
+
+def _factory():
+    """Factory de drivers simulados que responden a execute_script."""
+    created = []
+
+    def make():
+        driver = MagicMock()
+        driver.execute_script.return_value = 1
+        created.append(driver)
+        return driver
+
+    return make, created
+
+
+def make_pool(**kwargs):
+    factory, created = _factory()
+    kwargs.setdefault("size", 2)
+    pool = DriverPool(factory=factory, **kwargs)
+    return pool, created
+
+
+def _wait_for(predicate, timeout=2):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+# ── acquire / release ────────────────────────────────────────────────────────
+
+def test_acquire_crea_driver_bajo_demanda():
+    pool, created = make_pool()
+    driver = pool.acquire()
+    assert driver is created[0]
+    assert pool.stats()["alive"] == 1
+
+
+def test_release_reutiliza_el_mismo_driver():
+    pool, created = make_pool()
+    driver = pool.acquire()
+    pool.release(driver)
+    assert pool.acquire() is driver
+    assert len(created) == 1
+
+
+def test_acquire_bloquea_con_pool_lleno_y_timeout():
+    pool, _ = make_pool(size=1)
+    pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.05)
+
+
+def test_acquire_espera_a_que_se_libere_uno():
+    pool, _ = make_pool(size=1)
+    driver = pool.acquire()
+    threading.Timer(0.05, pool.release, args=(driver,)).start()
+    assert pool.acquire(timeout=2) is driver
+
+
+def test_lease_devuelve_el_driver_al_salir():
+    pool, _ = make_pool()
+    with pool.lease() as driver:
+        assert pool.stats()["idle"] == 0
+    assert pool.stats()["idle"] == 1
+
+
+# ── Health-check y reciclado ─────────────────────────────────────────────────
+
+def test_release_descarta_driver_que_no_responde():
+    pool, created = make_pool(size=1)
+    driver = pool.acquire()
+    driver.execute_script.side_effect = Exception("Chrome caído")
+    pool.release(driver)
+    driver.quit.assert_called_once()
+    # Se repone otro en background
+    assert _wait_for(lambda: pool.stats()["idle"] == 1)
+    assert pool.acquire() is not driver
+
+
+def test_release_discard_cierra_el_driver():
+    pool, _ = make_pool()
+    driver = pool.acquire()
+    pool.release(driver, discard=True)
+    driver.quit.assert_called_once()
+
+
+def test_recicla_por_numero_de_usos():
+    pool, created = make_pool(size=1, max_uses=2)
+    first = pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first
+    pool.release(first)  # segundo uso: caduca
+    first.quit.assert_called_once()
+    assert _wait_for(lambda: len(created) == 2)
+
+
+def test_recicla_por_edad():
+    pool, created = make_pool(size=1, max_age=0.01)
+    first = pool.acquire()
+    time.sleep(0.02)
+    pool.release(first)
+    first.quit.assert_called_once()
+
+
+# ── Calentamiento ────────────────────────────────────────────────────────────
+
+def test_warmup_marca_driver_caliente():
+    pool, _ = make_pool(warmup=lambda d: True)
+    driver = pool.acquire()
+    assert pool.is_warm(driver) is True
+
+
+def test_warmup_fallido_no_impide_prestar():
+    def warmup(driver):
+        raise RuntimeError("sin red")
+
+    pool, _ = make_pool(warmup=warmup)
+    driver = pool.acquire()
+    assert pool.is_warm(driver) is False
+
+
+def test_prewarm_rellena_hasta_size():
+    pool, created = make_pool(size=3)
+    pool.prewarm()
+    assert _wait_for(lambda: pool.stats()["idle"] == 3)
+    assert len(created) == 3
+
+
+def test_close_cierra_libres_y_rechaza_acquire():
+    pool, _ = make_pool()
+    driver = pool.acquire()
+    pool.release(driver)
+    pool.close()
+    driver.quit.assert_called_once()
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+
+
+# ── init_driver: perfil persistente ──────────────────────────────────────────
+
+@pytest.fixture
+def fake_chrome(mocker, tmp_path):
+    mocker.patch("src.config.Config.PROFILE_DIR", str(tmp_path))
+    mocker.patch("src.driver._detect_chrome_version", return_value=None)
+    mocker.patch("src.driver.tracker")
+    return mocker.patch("src.driver.uc.Chrome")
+
+
+def test_init_driver_usa_perfil_persistente(fake_chrome, tmp_path):
+    from src.driver import init_driver
+    from src.profiles import release_profile
+
+    driver = init_driver(headless=True, persistent_profile=True)
+    assert fake_chrome.call_args.kwargs["user_data_dir"] == str(tmp_path / "slot-0")
+    release_profile(driver)
+
+
+def test_init_driver_sin_perfil_persistente(fake_chrome):
+    from src.driver import init_driver
+
+    init_driver(headless=True, persistent_profile=False)
+    assert fake_chrome.call_args.kwargs["user_data_dir"] is None
+
+
+def test_init_driver_libera_el_perfil_si_chrome_no_arranca(fake_chrome, tmp_path, mocker):
+    from src.driver import init_driver
+    from src.profiles import acquire_profile
+
+    mocker.patch("src.driver.shutil.rmtree")
+    fake_chrome.side_effect = RuntimeError("chrome no arranca")
+    with pytest.raises(RuntimeError):
+        init_driver(headless=True, persistent_profile=True)
+    lease = acquire_profile(slots=1)
+    assert lease is not None and lease.slot == 0
+    lease.release()
+
+
+def test_init_driver_activa_log_de_rendimiento(fake_chrome, mocker):
+    from src.driver import init_driver
+
+    mocker.patch("src.config.Config.SEARCH_API_CAPTURE", True)
+    init_driver(headless=True, persistent_profile=False)
+    options = fake_chrome.call_args.kwargs["options"]
+    assert options.to_capabilities()["goog:loggingPrefs"] == {"performance": "ALL"}
@@ -0,0 +1,133 @@
+import time
+import threading
+import pytest
+from src.enrichment import HostLimiter, ConcurrentEnricher, enrichment_priority
+
+
+def _items(n, host="wallapop.com"):
+    return [{"url": f"https://{host}/item/{i}"} for i in range(n)]
+
+
+# ── HostLimiter ──────────────────────────────────────────────────────────────
+
+def test_limiter_respeta_concurrencia_por_host():
+    limiter = HostLimiter(max_per_host=2)
+    lock = threading.Lock()
+    state = {"current": 0, "max": 0}
+
+    def fetch(item):
+        with lock:
+            state["current"] += 1
+            state["max"] = max(state["max"], state["current"])
+        time.sleep(0.02)
+        with lock:
+            state["current"] -= 1
+        return item
+
+    list(ConcurrentEnricher(fetch, workers=6, limiter=limiter).enrich(_items(12)))
+    assert state["max"] == 2
+
+
+def test_limiter_hosts_distintos_no_comparten_cupo():
+    limiter = HostLimiter(max_per_host=1)
+    sem_a = limiter._semaphore("a.com")
+    sem_b = limiter._semaphore("b.com")
+    assert sem_a is not sem_b
+
+
+# ── ConcurrentEnricher ───────────────────────────────────────────────────────
+
+def test_enricher_devuelve_todos_los_indices():
+    items = _items(10)
+    enricher = ConcurrentEnricher(lambda item: item, workers=3, limiter=HostLimiter())
+    results = dict(enricher.enrich(items))
+    assert sorted(results) == list(range(10))
+    assert results[7] is items[7]
+
+
+def test_enricher_excepcion_se_convierte_en_none():
+    def fetch(item):
+        raise RuntimeError("boom")
+
+    enricher = ConcurrentEnricher(fetch, workers=2, limiter=HostLimiter())
+    assert dict(enricher.enrich(_items(3))) == {0: None, 1: None, 2: None}
+
+
+def test_enricher_escala_con_workers():
+    def fetch(item):
+        time.sleep(0.05)
+        return item
+
+    limiter = HostLimiter(max_per_host=8)
+
+    start = time.monotonic()
+    list(ConcurrentEnricher(fetch, workers=1, limiter=limiter).enrich(_items(8)))
+    serial = time.monotonic() - start
+
+    start = time.monotonic()
+    list(ConcurrentEnricher(fetch, workers=4, limiter=limiter).enrich(_items(8)))
+    parallel = time.monotonic() - start
+
+    assert parallel < serial / 2
+
+
+def test_enricher_submit_arranca_antes_de_consumir():
+    started = threading.Event()
+
+    def fetch(item):
+        started.set()
+        return item
+
+    enricher = ConcurrentEnricher(fetch, workers=2, limiter=HostLimiter())
+    enricher.submit("k", _items(1)[0])
+    # La descarga empieza sin que nadie itere los resultados
+    assert started.wait(1)
+    assert dict(enricher.as_completed()) == {"k": _items(1)[0]}
+    enricher.close()
+
+
+# ── Prioridad ────────────────────────────────────────────────────────────────
+
+def test_prioridad_nuevos_antes_que_bajadas_y_refrescos():
+    item = {"url": "u", "price": "90€"}
+    nuevo = enrichment_priority(item)
+    bajada = enrichment_priority(item, {"price": 100.0, "description": "x", "detail_fetched_at": "2024"})
+    refresco = enrichment_priority(item, {"price": 90.0, "description": "x", "detail_fetched_at": "2024"})
+    assert nuevo < bajada < refresco
+
+
+def test_prioridad_bajo_la_media_va_antes_en_su_grupo():
+    barato = enrichment_priority({"url": "a", "price": "50€"}, avg_price=100.0)
+    caro = enrichment_priority({"url": "b", "price": "150€"}, avg_price=100.0)
+    assert barato < caro
+
+
+def test_prioridad_refresco_mas_antiguo_primero():
+    item = {"url": "u", "price": "90€"}
+    viejo = enrichment_priority(item, {"price": 90.0, "description": "x", "detail_fetched_at": "2024-01-01"})
+    reciente = enrichment_priority(item, {"price": 90.0, "description": "x", "detail_fetched_at": "2024-06-01"})
+    assert viejo < reciente
+
+
+def test_enricher_descarga_por_prioridad_no_por_orden_de_envio():
+    gate = threading.Event()
+    order = []
+
+    def fetch(item):
+        if item["url"] == "primero":
+            gate.wait(1)
+        order.append(item["url"])
+        return item
+
+    enricher = ConcurrentEnricher(fetch, workers=1, limiter=HostLimiter())
+    # El único thread queda ocupado con el primero mientras se encola el resto
+    enricher.submit(0, {"url": "primero"})
+    time.sleep(0.05)
+    enricher.submit(1, {"url": "refresco"}, (2, 1, "2024"))
+    enricher.submit(2, {"url": "nuevo"}, (0, 1, ""))
+    enricher.submit(3, {"url": "bajada"}, (1, 1, ""))
+    gate.set()
+    results = dict(enricher.as_completed())
+    enricher.close()
+    assert order == ["primero", "nuevo", "bajada", "refresco"]
+    assert results[2] == {"url": "nuevo"}
@@ -0,0 +1,31 @@
+from unittest.mock import MagicMock
+from src.pages.home_page import HomePage
+
+
+def make_page(mock_driver):
+    return HomePage(mock_driver, timeout=1)
+
+
+# ── accept_cookies ───────────────────────────────────────────────────────────
+
+def test_consentimiento_guardado_no_espera_al_banner(mock_driver, mocker):
+    mock_driver.get_cookies.return_value = [{"name": "__cmpconsentx12345", "value": "abc"}]
+    page = make_page(mock_driver)
+    wait = mocker.patch.object(page, "wait_for_element")
+    assert page.accept_cookies() is True
+    wait.assert_not_called()
+
+
+def test_sin_consentimiento_pulsa_el_banner(mock_driver, mocker):
+    mock_driver.get_cookies.return_value = [{"name": "_ga", "value": "x"}]
+    mock_driver.execute_script.return_value = True
+    page = make_page(mock_driver)
+    wait = mocker.patch.object(page, "wait_for_element")
+    assert page.accept_cookies() is True
+    wait.assert_called_once()
+
+
+def test_has_stored_consent_tolera_errores_del_driver():
+    driver = MagicMock()
+    driver.get_cookies.side_effect = Exception("sesión cerrada")
+    assert make_page(driver).has_stored_consent() is False
@@ -0,0 +1,120 @@
+import pytest
+from unittest.mock import MagicMock
+from src.http_fetcher import HttpDetailFetcher
+
+
+def _make_item(url, **kwargs):
+    base = {
+        "url": url,
+        "title": "pending",
+        "price": "pending",
+        "location": "pending",
+        "description": "pending",
+    }
+    base.update(kwargs)
+    return base
+
+
+# ── enrich_item contra el stub server ────────────────────────────────────────
+
+def test_enrich_descripcion_completa_desde_html(fixture_server):
+    fetcher = HttpDetailFetcher(timeout=2)
+    result = fetcher.enrich_item(_make_item(f"{fixture_server}/item_detail.html"))
+    assert result["title"] == "MacBook Pro M1 16GB 512GB Space Gray"
+    assert result["price"] == "800€"
+    assert result["location"] == "Madrid, España"
+    assert "perfecto estado" in result["description"]
+
+
+def test_enrich_usa_og_description_como_resumen(fixture_server):
+    fetcher = HttpDetailFetcher(timeout=2)
+    result = fetcher.enrich_item(_make_item(f"{fixture_server}/item_detail_og.html"))
+    assert result["title"] == "Korg nanoKONTROL2 negro"
+    assert result["price"] == "45€"
+    assert result["description"] == "Controlador MIDI USB en buen estado, poco uso."
+
+
+def test_enrich_exigiendo_descripcion_completa_devuelve_none(fixture_server):
+    fetcher = HttpDetailFetcher(timeout=2, require_full_description=True)
+    item = _make_item(f"{fixture_server}/item_detail_og.html")
+    assert fetcher.enrich_item(item) is None
+    assert item["description"] == "pending"
+
+
+def test_enrich_json_ld_cuenta_como_descripcion_completa(fixture_server):
+    fetcher = HttpDetailFetcher(timeout=2, require_full_description=True)
+    result = fetcher.enrich_item(_make_item(f"{fixture_server}/item_detail_jsonld.html"))
+    assert result["title"] == "Roland TR-8S caja de ritmos"
+    assert result["price"] == "1.200€"
+    assert result["location"] == "Barcelona"
+    assert result["description"].startswith("Caja de ritmos")
+
+
+def test_enrich_parsea_en_el_pool_de_procesos(fixture_server):
+    from src.parse_pool import ParsePool
+    pool = ParsePool(processes=1)
+    try:
+        fetcher = HttpDetailFetcher(timeout=2, parse_pool=pool)
+        result = fetcher.enrich_item(_make_item(f"{fixture_server}/item_detail.html"))
+    finally:
+        pool.close()
+    assert result["title"] == "MacBook Pro M1 16GB 512GB Space Gray"
+    assert "perfecto estado" in result["description"]
+
+
+def test_enrich_404_devuelve_none(fixture_server):
+    fetcher = HttpDetailFetcher(timeout=2)
+    assert fetcher.enrich_item(_make_item(f"{fixture_server}/no_existe.html")) is None
+
+
+def test_enrich_pagina_sin_titulo_devuelve_none():
+    # Un item retirado o un cambio de maquetación: no hay <h1> ni og:title
+    limiter = MagicMock()
+    fetcher = HttpDetailFetcher(timeout=2, rate_limiter=limiter)
+    fetcher.fetch_html = MagicMock(return_value="<html><body>Este artículo ya no está disponible</body></html>")
+    assert fetcher.enrich_item(_make_item("https://www.wallapop.com/item/x")) is None
+    # Fallo normal, no bloqueo: no vacía el bucket compartido
+    limiter.report_failure.assert_called_once_with("https://www.wallapop.com/item/x", blocked=False)
+
+
+def test_enrich_captcha_cuenta_como_bloqueo():
+    limiter = MagicMock()
+    fetcher = HttpDetailFetcher(timeout=2, rate_limiter=limiter)
+    fetcher.fetch_html = MagicMock(
+        return_value='<html><body><script src="https://geo.captcha-delivery.com/captcha/"></script></body></html>'
+    )
+    assert fetcher.enrich_item(_make_item("https://www.wallapop.com/item/x")) is None
+    limiter.report_failure.assert_called_once_with("https://www.wallapop.com/item/x", blocked=True)
+
+
+def test_enrich_preserva_campos_conocidos(fixture_server):
+    fetcher = HttpDetailFetcher(timeout=2)
+    item = _make_item(f"{fixture_server}/item_detail.html", title="Título conocido", price="750€")
+    result = fetcher.enrich_item(item)
+    assert result["title"] == "Título conocido"
+    assert result["price"] == "750€"
+
+
+def test_enrich_no_modifica_item_original(fixture_server):
+    fetcher = HttpDetailFetcher(timeout=2)
+    item = _make_item(f"{fixture_server}/item_detail.html")
+    fetcher.enrich_item(item)
+    assert item["description"] == "pending"
+
+
+# ── from_driver ──────────────────────────────────────────────────────────────
+
+def test_from_driver_copia_cookies_y_user_agent(mock_driver):
+    mock_driver.execute_script.return_value = "UA-de-prueba"
+    mock_driver.get_cookies.return_value = [{"name": "session", "value": "abc"}]
+    fetcher = HttpDetailFetcher.from_driver(mock_driver)
+    assert fetcher.session.headers["User-Agent"] == "UA-de-prueba"
+    assert fetcher.session.cookies.get("session") == "abc"
+
+
+def test_from_driver_tolera_driver_roto():
+    driver = MagicMock()
+    driver.execute_script.side_effect = Exception("muerto")
+    driver.get_cookies.side_effect = Exception("muerto")
+    fetcher = HttpDetailFetcher.from_driver(driver)
+    assert "Chrome" in fetcher.session.headers["User-Agent"]
@@ -2,12 +2,13 @@ import pytest
 from unittest.mock import MagicMock
 from bs4 import BeautifulSoup
 from src.pages.item_detail_page import ItemDetailPage
+from src.parsing import available_backends
 
 
 def make_page(mock_driver, html=""):
     mock_driver.page_source = html
     page = ItemDetailPage(mock_driver, timeout=1)
-    page.wait_for_element = MagicMock(return_value=MagicMock())
+    page.wait_until_ready = MagicMock(return_value=True)
     return page
 
 
@@ -122,3 +123,185 @@ def test_enrich_rellena_location_pending(mock_driver, item_detail_html):
     item = _make_item(location="pending")
     result = page.enrich_item(item)
     assert result["location"] == "Madrid, España"
+
+
+# ── TabPipeline ──────────────────────────────────────────────────────────────
+
+from src.pages.item_detail_page import TabPipeline
+
+
+class FakeTabDriver:
+    """Driver simulado con pestañas: cada pestaña 'carga' la URL asignada."""
+
+    def __init__(self, html, fail_new_window=False):
+        self.html = html
+        self.fail_new_window = fail_new_window
+        self.urls = {"main": "about:blank"}
+        self.current = "main"
+        self.log = []
+        self.switch_to = MagicMock()
+        self.switch_to.new_window.side_effect = self._new_window
+        self.switch_to.window.side_effect = self._switch
+
+    def _new_window(self, kind):
+        if self.fail_new_window:
+            raise Exception("no se pueden abrir pestañas")
+        handle = f"tab{len(self.urls)}"
+        self.urls[handle] = "about:blank"
+        self.current = handle
+
+    def _switch(self, handle):
+        self.current = handle
+
+    @property
+    def current_window_handle(self):
+        return self.current
+
+    @property
+    def window_handles(self):
+        return list(self.urls)
+
+    @property
+    def current_url(self):
+        return self.urls[self.current]
+
+    @property
+    def page_source(self):
+        self.log.append(("parse", self.current_url))
+        return self.html
+
+    def find_elements(self, by, value):
+        return [object()] if self.current_url.startswith("http") else []
+
+    def find_element(self, by, value):
+        return object()
+
+    def execute_script(self, script, *args):
+        if "location.href" in script:
+            self.urls[self.current] = args[0]
+            self.log.append(("nav", args[0]))
+        return 1
+
+    def get(self, url):
+        self.urls[self.current] = url
+        self.log.append(("nav", url))
+
+    def close(self):
+        del self.urls[self.current]
+
+
+def _url(i):
+    return f"https://www.wallapop.com/item/tab{i}"
+
+
+def test_pipeline_lanza_k_navegaciones_antes_de_parsear(item_detail_html):
+    driver = FakeTabDriver(item_detail_html)
+    pipeline = TabPipeline(ItemDetailPage(driver, timeout=1), tabs=3)
+    for i in range(3):
+        pipeline.submit(i, _make_item(url=_url(i)))
+    assert pipeline.full
+    assert [kind for kind, _ in driver.log] == ["nav", "nav", "nav"]
+
+    key, result = pipeline.harvest()
+    assert key == 0
+    assert "perfecto estado" in result["description"]
+    assert not pipeline.full
+
+
+def test_pipeline_harvest_en_orden_de_envio(item_detail_html):
+    driver = FakeTabDriver(item_detail_html)
+    pipeline = TabPipeline(ItemDetailPage(driver, timeout=1), tabs=2)
+    pipeline.submit("a", _make_item(url=_url(1)))
+    pipeline.submit("b", _make_item(url=_url(2)))
+    assert [pipeline.harvest()[0], pipeline.harvest()[0]] == ["a", "b"]
+    # Ya no queda nada cargando
+    assert pipeline.abandon() == []
+
+
+def test_enrich_item_acepta_url_redirigida(item_detail_html):
+    driver = FakeTabDriver(item_detail_html)
+    driver.urls["main"] = _url(0)
+    # El sitio redirige el slug viejo del item al canónico
+    driver.get = lambda url: driver.urls.update(main=url.replace("slug-viejo", "slug-nuevo"))
+    page = ItemDetailPage(driver, timeout=0.5)
+    result = page.enrich_item(_make_item(url="https://www.wallapop.com/item/slug-viejo-1"))
+    assert "perfecto estado" in result["description"]
+
+
+def test_pipeline_close_cierra_pestanas_extra(item_detail_html):
+    driver = FakeTabDriver(item_detail_html)
+    pipeline = TabPipeline(ItemDetailPage(driver, timeout=1), tabs=3)
+    pipeline.submit(0, _make_item(url=_url(0)))
+    pipeline.close()
+    assert driver.window_handles == ["main"]
+    assert driver.current == "main"
+
+
+def test_pipeline_abandon_devuelve_pendientes(item_detail_html):
+    driver = FakeTabDriver(item_detail_html)
+    pipeline = TabPipeline(ItemDetailPage(driver, timeout=1), tabs=2)
+    pipeline.submit(7, _make_item(url=_url(7)))
+    pending = pipeline.abandon()
+    assert [key for key, _ in pending] == [7]
+    assert pipeline.abandon() == []
+    assert not pipeline.full
+
+
+# ── extract_fields ───────────────────────────────────────────────────────────
+
+def test_extract_fields_prefiere_datos_estructurados(mock_driver, item_detail_jsonld_html):
+    page = make_page(mock_driver)
+    values, sources = page.extract_fields(parse(item_detail_jsonld_html), ["title", "price", "description"])
+    assert values["title"] == "Roland TR-8S caja de ritmos"
+    assert sources == {"title": "json-ld", "price": "json-ld", "description": "json-ld"}
+
+
+def test_extract_fields_heuristicas_solo_para_lo_que_falta(mock_driver, item_detail_html):
+    page = make_page(mock_driver)
+    values, sources = page.extract_fields(parse(item_detail_html), ["price", "description"])
+    assert values["price"] == "800€"
+    assert sources == {"price": "html", "description": "html"}
+
+
+def test_extract_fields_html_antes_que_og_description(mock_driver):
+    page = make_page(mock_driver)
+    html = ('<meta property="og:description" content="Resumen">'
+            '<div class="item-detail-description">Descripción completa</div>')
+    values, sources = page.extract_fields(parse(html), ["description"])
+    assert values["description"] == "Descripción completa"
+    assert sources["description"] == "html"
+
+
+def test_enrich_con_estado_de_la_app(mock_driver, item_detail_state_html):
+    page = make_page(mock_driver, item_detail_state_html)
+    result = page.enrich_item(_make_item())
+    assert result["price"] == "549,50€"
+    assert result["location"] == "Sevilla"
+    assert result["description"] == "Sampler con bolsa."
+
+
+# ── Parseo fuera del driver ──────────────────────────────────────────────────
+
+from src.pages.item_detail_page import parse_detail_html
+
+
+def test_parse_detail_html_igual_que_el_page_object(mock_driver, item_detail_jsonld_html):
+    page = make_page(mock_driver)
+    fields = ["title", "price", "location", "description"]
+    for backend in available_backends():
+        assert parse_detail_html(item_detail_jsonld_html, fields, backend) == \
+            page.extract_fields(parse(item_detail_jsonld_html), fields)
+
+
+def test_load_html_y_fill_item_como_enrich(mock_driver, item_detail_html):
+    page = make_page(mock_driver, item_detail_html)
+    item = _make_item()
+    html = page.load_html(item)
+    values, sources = parse_detail_html(html, page.fields_to_parse(item))
+    assert page.fill_item(item, values, sources) == page.enrich_item(_make_item())
+
+
+def test_load_html_devuelve_none_en_excepcion(mock_driver):
+    page = make_page(mock_driver)
+    page.driver.get.side_effect = Exception("driver muerto")
+    assert page.load_html(_make_item()) is None
@@ -0,0 +1,58 @@
+import os
+import multiprocessing
+import pytest
+from src.parse_pool import ParsePool, get_parse_pool
+from src.pages.item_detail_page import parse_detail_html
+
+
+def _dies_in_worker(value):
+    # Simula un worker que muere (segfault, OOM killer...); en el proceso principal funciona
+    if multiprocessing.parent_process() is not None:
+        os._exit(1)
+    return value
+
+
+def _fail(_):
+    raise ValueError("HTML roto")
+
+
+def test_sin_procesos_ejecuta_en_el_llamador():
+    pool = ParsePool(processes=0)
+    future = pool.submit(len, "abc")
+    assert future.done()
+    assert future.result() == 3
+    assert pool.run(len, "ab") == 2
+    assert not pool.offloads
+
+
+def test_sin_procesos_la_excepcion_queda_en_el_future():
+    future = ParsePool(processes=0).submit(_fail, "x")
+    with pytest.raises(ValueError):
+        future.result()
+
+
+def test_con_procesos_parsea_igual_que_en_el_proceso_principal(item_detail_jsonld_html):
+    pool = ParsePool(processes=1)
+    try:
+        assert pool.offloads
+        assert pool.run(parse_detail_html, item_detail_jsonld_html) == parse_detail_html(item_detail_jsonld_html)
+    finally:
+        pool.close()
+
+
+def test_pool_roto_vuelve_al_proceso_principal():
+    pool = ParsePool(processes=1)
+    try:
+        assert pool.run(_dies_in_worker, "ok") == "ok"
+        assert not pool.offloads
+        assert pool.submit(_dies_in_worker, "otra").result() == "otra"
+    finally:
+        pool.close()
+
+
+def test_pool_compartido_usa_la_config(monkeypatch):
+    import src.parse_pool as pp
+    monkeypatch.setattr(pp, "_shared_pool", None)
+    monkeypatch.setattr("src.config.Config.PARSE_PROCESSES", 3)
+    assert get_parse_pool() is get_parse_pool()
+    assert get_parse_pool().processes == 3
@@ -0,0 +1,80 @@
+import pytest
+from unittest.mock import MagicMock
+from src.parsing import (
+    parse_html, resolve_backend, available_backends, select_first_by_class,
+    find_first, node_text,
+)
+from src.pages.item_detail_page import ItemDetailPage
+from src.pages.search_results_page import SearchResultsPage
+
+BACKENDS = available_backends()
+
+
+# ── resolve_backend ──────────────────────────────────────────────────────────
+
+def test_auto_elige_el_primer_backend_disponible():
+    assert resolve_backend("auto") == BACKENDS[0]
+
+
+def test_backend_desconocido_cae_a_html_parser():
+    assert resolve_backend("selectolax") == "html.parser"
+
+
+# ── select_first_by_class ────────────────────────────────────────────────────
+
+def test_select_first_respeta_orden_de_patrones():
+    soup = parse_html('<span class="b-x">B</span><span class="a-x">A</span>', "html.parser")
+    assert select_first_by_class(soup, ["a-", "b-"]).text == "A"
+
+
+def test_select_first_substring_de_una_clase():
+    soup = parse_html('<div class="foo ItemCard__price--h4sh">9€</div>', "html.parser")
+    assert select_first_by_class(soup, "ItemCard__price").text == "9€"
+
+
+def test_select_first_sin_match_devuelve_none():
+    soup = parse_html('<div class="otra">x</div>', "html.parser")
+    assert select_first_by_class(soup, "price") is None
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_select_first_filtra_tags_sin_mayusculas(backend):
+    soup = parse_html('<span class="Description">no</span><section class="ItemDescription">sí</section>', backend)
+    found = select_first_by_class(soup, "description", tags=("div", "section"), ignore_case=True)
+    assert node_text(found) == "sí"
+
+
+# ── node_text ────────────────────────────────────────────────────────────────
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_node_text_ignora_comentarios_y_scripts(backend):
+    html = "<div id='d'> Hola <!-- nota --> <b>mundo</b><script>x=1</script> fin </div>"
+    assert node_text(find_first(parse_html(html, backend), "div", id="d")) == "Hola mundo fin"
+
+
+# ── Mismos valores con todos los backends ────────────────────────────────────
+
+DETAIL_FIXTURES = ["item_detail_html", "item_detail_jsonld_html", "item_detail_state_html"]
+
+
+@pytest.mark.parametrize("fixture", DETAIL_FIXTURES)
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_detalle_igual_en_todos_los_backends(request, fixture, backend):
+    html = request.getfixturevalue(fixture)
+    page = ItemDetailPage(MagicMock(), timeout=1)
+    fields = ["title", "price", "location", "description"]
+    expected = page.extract_fields(parse_html(html, "html.parser"), fields)
+    assert page.extract_fields(parse_html(html, backend), fields) == expected
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_listado_igual_en_todos_los_backends(mocker, mock_driver, search_results_html, backend):
+    mock_driver.page_source = search_results_html
+    page = SearchResultsPage(mock_driver, timeout=1)
+    page.wait_for_all_elements = MagicMock(return_value=[])
+    page._scroll_to_load_all = MagicMock()
+
+    mocker.patch("src.config.Config.HTML_PARSER", "html.parser")
+    expected = page.extract_items()
+    mocker.patch("src.config.Config.HTML_PARSER", backend)
+    assert page.extract_items() == expected
@@ -0,0 +1,164 @@
+import gc
+import os
+import subprocess
+import time
+import pytest
+from unittest.mock import MagicMock
+from src.processes import (
+    ProcessTracker,
+    process_tree,
+    is_alive,
+    kill_processes,
+    list_processes,
+    rss_bytes,
+)
+from src.profiles import acquire_profile, attach_profile
+
+pytestmark = pytest.mark.skipif(not os.path.isdir("/proc"), reason="Requiere /proc")
+
+
+def _spawn_tree():
+    """Lanza un proceso con un hijo (simula chromedriver -> chrome)."""
+    proc = subprocess.Popen(["sh", "-c", "sleep 30 & wait"])
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline and len(process_tree([proc.pid])) < 2:
+        time.sleep(0.02)
+    return proc
+
+
+class _FakeDriver:
+    """Driver mínimo con los atributos de PID de selenium/uc (admite weakref)."""
+
+    def __init__(self, pid):
+        self.service = MagicMock()
+        self.service.process.pid = pid
+        self.browser_pid = None
+
+
+def _fake_driver(proc):
+    return _FakeDriver(proc.pid)
+
+
+@pytest.fixture
+def spawned():
+    procs = []
+
+    def spawn():
+        proc = _spawn_tree()
+        procs.append(proc)
+        return proc
+
+    yield spawn
+    for proc in procs:
+        kill_processes(process_tree([proc.pid]))
+        proc.wait(timeout=5)
+
+
+# ── /proc ────────────────────────────────────────────────────────────────────
+
+def test_list_processes_incluye_el_propio_proceso():
+    assert os.getpid() in list_processes()
+
+
+def test_process_tree_incluye_descendientes(spawned):
+    proc = spawned()
+    tree = process_tree([proc.pid])
+    assert proc.pid in tree
+    assert len(tree) == 2
+
+
+def test_is_alive_detecta_pid_reciclado(spawned):
+    proc = spawned()
+    starttime = process_tree([proc.pid])[proc.pid]
+    assert is_alive(proc.pid, starttime) is True
+    assert is_alive(proc.pid, starttime + 1) is False
+
+
+# ── ProcessTracker ───────────────────────────────────────────────────────────
+
+def test_release_y_kill_solo_mata_su_arbol(spawned):
+    tracker = ProcessTracker()
+    mine, other = spawned(), spawned()
+    driver = _fake_driver(mine)
+    tracker.register(driver)
+    other_tree = process_tree([other.pid])
+
+    procs = tracker.release(driver)
+    assert kill_processes(procs) == 2
+    mine.wait(timeout=5)
+
+    assert all(is_alive(pid, st) for pid, st in other_tree.items())
+    assert tracker.tracked() == 0
+
+
+def test_reap_mata_arbol_de_driver_perdido(spawned):
+    tracker = ProcessTracker()
+    proc = spawned()
+    driver = _fake_driver(proc)
+    tracker.register(driver)
+    tree = process_tree([proc.pid])
+
+    del driver  # El driver desaparece sin quit()
+    assert tracker.reap() == 2
+    proc.wait(timeout=5)
+    assert not any(is_alive(pid, st) for pid, st in tree.items())
+
+
+def test_driver_perdido_mantiene_su_perfil_hasta_el_reap(spawned, tmp_path):
+    tracker = ProcessTracker()
+    proc = spawned()
+    driver = _fake_driver(proc)
+    lease = acquire_profile(base_dir=str(tmp_path), slots=1)
+    attach_profile(driver, lease)
+    tracker.register(driver)
+    tree = process_tree([proc.pid])
+
+    del driver
+    gc.collect()
+    # Su Chrome sigue vivo: el slot no se puede tomar
+    assert all(is_alive(pid, st) for pid, st in tree.items())
+    assert not lease.released
+    assert acquire_profile(base_dir=str(tmp_path), slots=1) is None
+
+    assert tracker.reap() == 2
+    proc.wait(timeout=5)
+    assert lease.released
+    again = acquire_profile(base_dir=str(tmp_path), slots=1)
+    assert again is not None
+    again.release()
+
+
+def test_reap_mata_hijos_si_la_raiz_murio(spawned):
+    tracker = ProcessTracker()
+    proc = spawned()
+    driver = _fake_driver(proc)
+    tracker.register(driver)
+    tree = process_tree([proc.pid])
+    child = next(pid for pid in tree if pid != proc.pid)
+
+    # Muere solo la raíz: el hijo queda huérfano
+    os.kill(proc.pid, 9)
+    proc.wait(timeout=5)
+    assert tracker.reap() == 1
+    assert not is_alive(child, tree[child])
+
+
+def test_reap_no_toca_drivers_vivos(spawned):
+    tracker = ProcessTracker()
+    proc = spawned()
+    driver = _fake_driver(proc)
+    tracker.register(driver)
+
+    assert tracker.reap() == 0
+    assert tracker.tracked() == 1
+    assert len(tracker.pids(driver)) == 2
+
+
+# ── Memoria ──────────────────────────────────────────────────────────────────
+
+def test_rss_bytes_del_propio_proceso():
+    assert rss_bytes([os.getpid()]) > 1024 * 1024
+
+
+def test_rss_bytes_ignora_pids_inexistentes():
+    assert rss_bytes([999999999]) == 0
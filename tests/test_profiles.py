@@ -0,0 +1,100 @@
+import gc
+import os
+import subprocess
+import sys
+import pytest
+from unittest.mock import MagicMock
+from src.profiles import acquire_profile, attach_profile, release_profile
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="flock solo en Unix")
+
+
+# ── acquire_profile ──────────────────────────────────────────────────────────
+
+def test_toma_el_primer_slot_libre(tmp_path):
+    lease = acquire_profile(base_dir=str(tmp_path), slots=2)
+    assert lease.slot == 0
+    assert os.path.isdir(lease.path)
+    assert lease.path.endswith("slot-0")
+    lease.release()
+
+
+def test_dos_leases_nunca_comparten_slot(tmp_path):
+    first = acquire_profile(base_dir=str(tmp_path), slots=2)
+    second = acquire_profile(base_dir=str(tmp_path), slots=2)
+    assert first.path != second.path
+    first.release()
+    second.release()
+
+
+def test_sin_slots_libres_devuelve_none(tmp_path):
+    lease = acquire_profile(base_dir=str(tmp_path), slots=1)
+    assert acquire_profile(base_dir=str(tmp_path), slots=1) is None
+    lease.release()
+
+
+def test_release_deja_el_slot_libre_y_el_perfil_intacto(tmp_path):
+    lease = acquire_profile(base_dir=str(tmp_path), slots=1)
+    (tmp_path / "slot-0" / "Cookies").write_text("x")
+    lease.release()
+    again = acquire_profile(base_dir=str(tmp_path), slots=1)
+    assert again.path == lease.path
+    assert (tmp_path / "slot-0" / "Cookies").exists()
+    again.release()
+
+
+def test_slot_bloqueado_por_otro_proceso(tmp_path):
+    code = (
+        "import sys, time; sys.path.insert(0, %r)\n"
+        "from src.profiles import acquire_profile\n"
+        "lease = acquire_profile(base_dir=%r, slots=1)\n"
+        "print('ok' if lease else 'none', flush=True); time.sleep(5)\n"
+    ) % (os.getcwd(), str(tmp_path))
+    proc = subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.PIPE, text=True)
+    try:
+        assert proc.stdout.readline().strip() == "ok"
+        assert acquire_profile(base_dir=str(tmp_path), slots=1) is None
+    finally:
+        proc.kill()
+        proc.wait()
+    # Al morir el proceso el lock se suelta solo
+    lease = acquire_profile(base_dir=str(tmp_path), slots=1)
+    assert lease is not None
+    lease.release()
+
+
+def test_borra_locks_de_chrome_huerfanos(tmp_path):
+    profile = tmp_path / "slot-0"
+    profile.mkdir()
+    (profile / "SingletonLock").write_text("")
+    lease = acquire_profile(base_dir=str(tmp_path), slots=1)
+    assert not (profile / "SingletonLock").exists()
+    lease.release()
+
+
+# ── Asociación al driver ─────────────────────────────────────────────────────
+
+def test_release_profile_libera_el_perfil_del_driver(tmp_path):
+    driver = MagicMock()
+    lease = acquire_profile(base_dir=str(tmp_path), slots=1)
+    attach_profile(driver, lease)
+    release_profile(driver)
+    assert lease.released
+
+
+def test_driver_perdido_no_libera_su_perfil_al_recolectarlo(tmp_path):
+    class FakeDriver:
+        pass
+
+    driver = FakeDriver()
+    lease = acquire_profile(base_dir=str(tmp_path), slots=1)
+    attach_profile(driver, lease)
+    del driver
+    gc.collect()
+    # Su Chrome podría seguir vivo: lo libera el reaper (ver test_processes)
+    assert not lease.released
+    lease.release()
+
+
+def test_release_profile_sin_perfil_no_falla():
+    release_profile(MagicMock())
@@ -0,0 +1,122 @@
+import time
+import threading
+import pytest
+from src.rate_limiter import RateLimiter
+
+URL = "https://www.wallapop.com/item/1"
+
+
+class FakeClock:
+    """Reloj manual: sleep() avanza el tiempo en lugar de dormir."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def make_limiter(**kwargs):
+    clock = FakeClock()
+    kwargs.setdefault("jitter", 0)
+    return RateLimiter(clock=clock, sleep=clock.sleep, **kwargs), clock
+
+
+# ── Token bucket ─────────────────────────────────────────────────────────────
+
+def test_burst_sale_sin_esperar():
+    limiter, clock = make_limiter(rate=1.0, burst=3)
+    assert [limiter.acquire(URL) for _ in range(3)] == [0, 0, 0]
+
+
+def test_tras_el_burst_espacia_al_ritmo():
+    limiter, clock = make_limiter(rate=2.0, burst=1)
+    waits = [limiter.acquire(URL) for _ in range(4)]
+    assert waits == [0, 0.5, 0.5, 0.5]
+
+
+def test_jitter_solo_alarga_la_espera():
+    limiter, clock = make_limiter(rate=1.0, burst=1, jitter=0.5)
+    limiter.acquire(URL)
+    wait = limiter.acquire(URL)
+    assert 1.0 <= wait <= 1.5
+
+
+def test_hosts_tienen_buckets_independientes():
+    limiter, clock = make_limiter(rate=1.0, burst=1)
+    limiter.acquire("https://a.com/x")
+    assert limiter.acquire("https://b.com/x") == 0
+
+
+def test_threads_concurrentes_respetan_el_ritmo():
+    limiter = RateLimiter(rate=50, burst=1, jitter=0)
+    starts = []
+    lock = threading.Lock()
+
+    def worker():
+        limiter.acquire(URL)
+        with lock:
+            starts.append(time.monotonic())
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    starts.sort()
+    assert starts[-1] - starts[0] >= 4 / 50 * 0.9
+
+
+# ── Backoff adaptativo ───────────────────────────────────────────────────────
+
+def test_fallo_reduce_el_ritmo():
+    limiter, _ = make_limiter(rate=2.0, backoff=0.5)
+    limiter.report_failure(URL)
+    assert limiter.metrics()["www.wallapop.com"]["rate"] == 1.0
+
+
+def test_ritmo_no_baja_del_minimo():
+    limiter, _ = make_limiter(rate=1.0, min_rate=0.4, backoff=0.5)
+    for _ in range(5):
+        limiter.report_failure(URL)
+    assert limiter.metrics()["www.wallapop.com"]["rate"] == 0.4
+
+
+def test_bloqueo_fuerza_pausa():
+    limiter, _ = make_limiter(rate=1.0, burst=2, backoff=0.5)
+    limiter.report_failure(URL, blocked=True)
+    # Bucket vaciado y en deuda: la siguiente petición espera
+    assert limiter.acquire(URL) > 0
+
+
+def test_racha_de_exitos_recupera_el_ritmo():
+    limiter, _ = make_limiter(rate=2.0, backoff=0.5, recover_after=3, recover_step=2.0)
+    limiter.report_failure(URL)
+    for _ in range(3):
+        limiter.report_success(URL)
+    assert limiter.metrics()["www.wallapop.com"]["rate"] == 2.0
+
+
+def test_recuperacion_no_supera_el_maximo():
+    limiter, _ = make_limiter(rate=2.0, recover_after=1, recover_step=2.0)
+    for _ in range(5):
+        limiter.report_success(URL)
+    assert limiter.metrics()["www.wallapop.com"]["rate"] == 2.0
+
+
+# ── Métricas ─────────────────────────────────────────────────────────────────
+
+def test_metricas_de_espera():
+    limiter, _ = make_limiter(rate=1.0, burst=1)
+    limiter.acquire(URL)
+    limiter.acquire(URL)
+    m = limiter.metrics()["www.wallapop.com"]
+    assert m["requests"] == 2
+    assert m["avg_wait"] == 0.5
+    assert m["last_wait"] == 1.0
+    assert m["waiting"] == 0
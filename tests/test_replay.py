@@ -0,0 +1,176 @@
+import pytest
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+from src.driver import DriverPool
+from src.pages import HomePage, SearchResultsPage, ItemDetailPage
+from src.rate_limiter import RateLimiter
+from src.replay import ReplayCorpus, ReplayDriver, ReplayAdapter, css_to_xpath
+from src.scraper import WallapopScraper
+from tests.conftest import FIXTURES_DIR
+
+SEARCH_URL = SearchResultsPage.build_url("macbook")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def corpus():
+    return ReplayCorpus.from_files(
+        FIXTURES_DIR / "search_results.html",
+        [FIXTURES_DIR / "item_detail.html", FIXTURES_DIR / "item_detail_jsonld.html"],
+    )
+
+
+def make_driver(corpus, **kwargs):
+    clock = FakeClock()
+    return ReplayDriver(corpus, clock=clock, sleep=clock.sleep, **kwargs), clock
+
+
+# ── css_to_xpath ─────────────────────────────────────────────────────────────
+
+def test_css_to_xpath_selectores_de_los_page_objects():
+    assert css_to_xpath("a[href*='/item/']") == '//a[contains(@href, "/item/")]'
+    assert css_to_xpath("script#__NEXT_DATA__") == '//script[@id="__NEXT_DATA__"]'
+    assert css_to_xpath('meta[property^="og:"], main') == '//meta[starts-with(@property, "og:")] | //main'
+    # Todos los selectores de los Page Objects deben poder emularse
+    css_to_xpath(ItemDetailPage.EXTRA_CAPTURE)
+
+
+def test_css_to_xpath_rechaza_combinadores():
+    with pytest.raises(ValueError):
+        css_to_xpath("div > a")
+
+
+# ── ReplayCorpus ─────────────────────────────────────────────────────────────
+
+def test_corpus_clasifica_urls(corpus):
+    assert corpus.page("https://www.wallapop.com/")[0] == "home"
+    assert corpus.page(SEARCH_URL)[0] == "search"
+    assert corpus.page("https://www.wallapop.com/item/abc123")[0] == "detail"
+
+
+def test_corpus_detalle_estable_por_url(corpus):
+    url = "https://www.wallapop.com/item/abc123"
+    assert corpus.page(url) == corpus.page(url)
+
+
+def test_corpus_detalle_por_slug(corpus):
+    assert corpus.page("https://www.wallapop.com/item/item_detail_jsonld")[1] == corpus.details["item_detail_jsonld"]
+
+
+def test_corpus_desde_carpeta_de_capturas(tmp_path):
+    (tmp_path / "02_busqueda.html").write_text("<a href='/item/x'>x</a>", encoding="utf-8")
+    (tmp_path / "03_detalle.html").write_text("<h1>Detalle</h1>", encoding="utf-8")
+    (tmp_path / "detalles").mkdir()
+    (tmp_path / "detalles" / "x.html").write_text("<h1>X</h1>", encoding="utf-8")
+    corpus = ReplayCorpus.from_dir(str(tmp_path))
+    assert set(corpus.details) == {"03_detalle", "x"}
+    assert "<h1>X</h1>" in corpus.page("https://www.wallapop.com/item/x")[1]
+
+
+# ── ReplayDriver ─────────────────────────────────────────────────────────────
+
+def test_get_espera_la_latencia(corpus):
+    driver, clock = make_driver(corpus, latency=0.5)
+    driver.get(SEARCH_URL)
+    assert clock.now == 0.5
+    assert driver.current_url == SEARCH_URL
+
+
+def test_scroll_infinito_por_tandas(corpus):
+    driver, clock = make_driver(corpus, page_size=2, scroll_latency=1.0)
+    driver.get(SEARCH_URL)
+    count = SearchResultsPage._JS_COUNT_CARDS
+    assert driver.execute_script(count, SearchResultsPage.ITEM_CARD[1]) == 2
+    driver.execute_script(SearchResultsPage._JS_SCROLL_BOTTOM)
+    assert driver.execute_script(count, SearchResultsPage.ITEM_CARD[1]) == 2
+    clock.sleep(1.0)
+    assert driver.execute_script(count, SearchResultsPage.ITEM_CARD[1]) == 4
+    assert driver.page_source.count("/item/") == 4
+
+
+def test_navegacion_por_js_no_bloquea(corpus):
+    driver, clock = make_driver(corpus, latency=1.0)
+    driver.execute_script("window.location.href = arguments[0];", "https://www.wallapop.com/item/abc123")
+    assert clock.now == 0
+    assert driver.find_elements(By.TAG_NAME, "h1") == []
+    assert driver.execute_script("return document.readyState") == "loading"
+    clock.sleep(1.0)
+    assert driver.find_elements(By.TAG_NAME, "h1")
+
+
+def test_pestanas_independientes(corpus):
+    driver, _ = make_driver(corpus)
+    main = driver.current_window_handle
+    driver.get(SEARCH_URL)
+    driver.switch_to.new_window("tab")
+    driver.get("https://www.wallapop.com/item/abc123")
+    assert len(driver.window_handles) == 2
+    driver.close()
+    driver.switch_to.window(main)
+    assert driver.current_url == SEARCH_URL
+
+
+def test_find_element_sin_match(corpus):
+    driver, _ = make_driver(corpus)
+    driver.get(SEARCH_URL)
+    with pytest.raises(NoSuchElementException):
+        driver.find_element(By.ID, "no-existe")
+
+
+def test_buscador_de_la_home_lleva_a_resultados(corpus):
+    driver, _ = make_driver(corpus)
+    driver.get("https://www.wallapop.com/")
+    HomePage(driver, timeout=1).search("korg nano")
+    assert "keywords=korg+nano" in driver.current_url
+
+
+# ── Page Objects sobre el replay ─────────────────────────────────────────────
+
+def test_resultados_y_detalle_con_page_objects(corpus, mocker):
+    # Reloj real: el Page Object sondea con time.monotonic
+    driver = ReplayDriver(corpus, page_size=2, scroll_latency=0.02)
+    mocker.patch.object(SearchResultsPage, "SCROLL_IDLE_TIMEOUT", 0.1)
+    results = SearchResultsPage(driver, timeout=1)
+    results.open("macbook")
+    items = list(results.iter_items())
+    assert [i["title"] for i in items][:2] == ["MacBook Pro M1", "iPhone 14 Pro"]
+    assert len(items) == 5
+
+    enriched = ItemDetailPage(driver, timeout=1).enrich_item(items[0])
+    assert enriched["description"] not in ("pending", "No disponible")
+
+
+# ── run() de principio a fin ─────────────────────────────────────────────────
+
+@pytest.mark.parametrize("http_details", [True, False])
+def test_run_completo_sin_red(corpus, db_path, tmp_path, mocker, http_details):
+    from src.database import get_items
+    mocker.patch("src.config.Config.OUTPUT_DIR", str(tmp_path))
+    mocker.patch("src.config.Config.LOG_DIR", str(tmp_path))
+    # Sin reintentos de scroll al final: el corpus no tiene más cards
+    mocker.patch.object(SearchResultsPage, "SCROLL_IDLE_TIMEOUT", 0.01)
+    adapter = ReplayAdapter(corpus)
+    pool = DriverPool(size=1, factory=lambda: ReplayDriver(corpus), max_age=0, max_uses=0)
+    events = []
+    scraper = WallapopScraper(
+        headless=True, pool=pool, http_details=http_details, incremental=False,
+        on_progress=events.append, rate_limiter=RateLimiter(rate=1e6, burst=1e6),
+        http_adapter=adapter,
+    )
+    scraper.run("macbook")
+    pool.close()
+
+    assert events[-1] == {"type": "done", "saved": 5}
+    assert get_items()["total"] == 5
+    assert (adapter.requests == 5) is http_details
@@ -0,0 +1,54 @@
+from unittest.mock import MagicMock
+from src.resource_blocking import (
+    blocked_patterns, set_resource_blocking, page_load_metrics, BLOCK_PROFILES,
+)
+
+
+# ── blocked_patterns ─────────────────────────────────────────────────────────
+
+def test_perfil_detail_bloquea_imagenes_y_trackers():
+    patterns = blocked_patterns("detail")
+    assert "*.jpg*" in patterns
+    assert "*google-analytics.com*" in patterns
+
+
+def test_perfil_home_no_bloquea_scripts_de_terceros():
+    # El banner de cookies de la home depende de scripts externos
+    assert "trackers" not in BLOCK_PROFILES["home"]
+    assert "*googletagmanager.com*" not in blocked_patterns("home")
+
+
+def test_sin_perfil_no_bloquea_nada():
+    assert blocked_patterns(None) == []
+
+
+def test_perfil_como_lista_de_categorias():
+    assert blocked_patterns(["fonts"]) == ["*.woff*", "*.ttf*", "*.otf*"]
+
+
+# ── set_resource_blocking ────────────────────────────────────────────────────
+
+def test_set_resource_blocking_envia_patrones_por_cdp():
+    driver = MagicMock()
+    assert set_resource_blocking(driver, "search") is True
+    driver.execute_cdp_cmd.assert_any_call("Network.setBlockedURLs", {"urls": blocked_patterns("search")})
+
+
+def test_set_resource_blocking_none_limpia_bloqueo():
+    driver = MagicMock()
+    set_resource_blocking(driver, None)
+    driver.execute_cdp_cmd.assert_any_call("Network.setBlockedURLs", {"urls": []})
+
+
+def test_set_resource_blocking_sin_cdp_devuelve_false():
+    driver = MagicMock()
+    driver.execute_cdp_cmd.side_effect = AttributeError("sin CDP")
+    assert set_resource_blocking(driver, "detail") is False
+
+
+# ── page_load_metrics ────────────────────────────────────────────────────────
+
+def test_page_load_metrics_devuelve_dict_vacio_si_falla():
+    driver = MagicMock()
+    driver.execute_script.side_effect = Exception("boom")
+    assert page_load_metrics(driver) == {}
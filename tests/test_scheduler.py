@@ -130,7 +130,7 @@ def test_process_ejecuta_busqueda_cuando_toca(mocker):
     scheduler._next_run["MacBook"] = datetime.now() - timedelta(seconds=1)
 
     scheduler._process_searches()
-    mock_run.assert_called_once_with("MacBook")
+    mock_run.assert_called_once_with("MacBook", filters=None)
 
 
 def test_process_no_ejecuta_busqueda_futura(mocker):
@@ -176,7 +176,7 @@ def test_process_primera_ejecucion_sin_next_run(mocker):
     # Sin entry en _next_run: debe ejecutarse inmediatamente
 
     scheduler._process_searches()
-    mock_run.assert_called_once_with("MacBook")
+    mock_run.assert_called_once_with("MacBook", filters=None)
 
 
 # ── Scheduler.running ─────────────────────────────────────────────────────────
@@ -190,3 +190,83 @@ def test_running_false_despues_de_stop():
     scheduler = Scheduler()
     scheduler.stop()
     assert scheduler.running is False
+
+
+# ── Filtros de búsqueda ───────────────────────────────────────────────────────
+
+def test_load_searches_normaliza_filtros(tmp_path):
+    path = tmp_path / "searches.json"
+    path.write_text(json.dumps({"searches": [
+        {"query": "Korg", "filters": {"max_price": 100, "condition": "new"}},
+        {"query": "Nord"},
+    ]}), encoding="utf-8")
+    result = _load_searches(path)
+    assert result[0]["filters"] == {"max_price": 100, "condition": ["new"]}
+    assert result[1]["filters"] == {}
+
+
+def test_load_searches_ignora_busqueda_con_filtros_invalidos(tmp_path):
+    path = tmp_path / "searches.json"
+    path.write_text(json.dumps({"searches": [
+        {"query": "Korg", "filters": {"max_price": "mucho"}},
+        {"query": "Nord"},
+    ]}), encoding="utf-8")
+    assert [s["query"] for s in _load_searches(path)] == ["Nord"]
+
+
+def test_process_pasa_los_filtros_al_scrape(mocker):
+    mock_run = mocker.patch("src.scheduler._run_single_search")
+    scheduler = Scheduler()
+    scheduler._searches = [{"query": "Korg", "interval_minutes": 60, "filters": {"max_price": 100}}]
+    scheduler._process_searches()
+    mock_run.assert_called_once_with("Korg", filters={"max_price": 100})
+
+
+# ── Lotes ─────────────────────────────────────────────────────────────────────
+
+def _due(scheduler, *queries):
+    scheduler._searches = [{"query": q, "interval_minutes": 60, "filters": {}} for q in queries]
+    for q in queries:
+        scheduler._next_run[q] = datetime.now() - timedelta(seconds=1)
+
+
+def test_process_varias_que_tocan_van_en_un_lote(mocker):
+    mock_batch = mocker.patch("src.scheduler._run_batch")
+    mock_single = mocker.patch("src.scheduler._run_single_search")
+    scheduler = Scheduler()
+    _due(scheduler, "Korg Nano", "Korg nanoKONTROL")
+
+    scheduler._process_searches()
+
+    mock_single.assert_not_called()
+    assert [s["query"] for s in mock_batch.call_args.args[0]] == ["Korg Nano", "Korg nanoKONTROL"]
+    assert all(scheduler._next_run[q] > datetime.now() for q in ("Korg Nano", "Korg nanoKONTROL"))
+
+
+def test_process_sin_lotes_ejecuta_una_a_una(mocker):
+    mocker.patch("src.config.Config.BATCH_RUNS", False)
+    mock_batch = mocker.patch("src.scheduler._run_batch")
+    mock_single = mocker.patch("src.scheduler._run_single_search")
+    scheduler = Scheduler()
+    _due(scheduler, "Korg Nano", "Korg nanoKONTROL")
+
+    scheduler._process_searches()
+
+    mock_batch.assert_not_called()
+    assert mock_single.call_count == 2
+
+
+def test_run_batch_envia_eventos_a_cada_query(mocker):
+    import src.events as ev
+    from src.scheduler import _run_batch
+
+    mocker.patch("src.scheduler.get_shared_pool")
+    scraper_cls = mocker.patch("src.scheduler.WallapopScraper")
+    scraper_cls.return_value.run_batch.side_effect = (
+        lambda searches: scraper_cls.call_args.kwargs["on_progress"]({"type": "done", "saved": 3})
+    )
+
+    _run_batch([{"query": "a"}, {"query": "b"}])
+
+    assert ev.get_events("a") == [{"type": "done", "saved": 3}]
+    assert ev.get_events("b") == [{"type": "done", "saved": 3}]
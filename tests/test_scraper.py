@@ -1,10 +1,11 @@
+import time
 import pytest
 from unittest.mock import MagicMock, patch, call
 from src.scraper import WallapopScraper
 
 
 def make_scraper(mock_driver):
-    scraper = WallapopScraper(headless=True)
+    scraper = WallapopScraper(headless=True, http_details=False)
     scraper.driver = mock_driver
     return scraper
 
@@ -115,33 +116,744 @@ def test_enrich_contador_fallos_se_resetea_con_exito(mocker, mock_driver):
     scraper._restart_driver.assert_not_called()
 
 
-def test_enrich_batch_restart_en_batch_size(mocker, mock_driver):
-    batch_size = WallapopScraper.BATCH_SIZE  # 25
-    # 26 items para forzar un reinicio de batch en índice 25
-    items = [_make_item(i) for i in range(batch_size + 1)]
-    _, mock_detail = _mock_detail_page(mocker, items)
+def test_enrich_no_reinicia_sin_presion_de_memoria(mocker, mock_driver):
+    # 30 items ligeros: antes se reiniciaba a ciegas en el item 25
+    items = [_make_item(i) for i in range(30)]
+    _mock_detail_page(mocker, items)
     mocker.patch("time.sleep")
+    mocker.patch("src.scraper.driver_rss_mb", return_value=300.0)
 
     scraper = make_scraper(mock_driver)
     scraper._is_driver_alive = MagicMock(return_value=True)
     scraper._restart_driver = MagicMock()
 
     scraper._enrich_items_with_recovery(items, timeout=1)
-    # Debe reiniciar exactamente una vez (al llegar a i=25)
+    scraper._restart_driver.assert_not_called()
+
+
+def test_enrich_recicla_driver_al_superar_memoria(mocker, mock_driver):
+    items = [_make_item(i) for i in range(3)]
+    _mock_detail_page(mocker, items)
+    mocker.patch("time.sleep")
+    limit = WallapopScraper(headless=True).config.DRIVER_MAX_RSS_MB
+    mocker.patch("src.scraper.driver_rss_mb", side_effect=[300.0, limit + 100, 300.0])
+
+    scraper = make_scraper(mock_driver)
+    scraper.config = type("Cfg", (scraper.config,), {"DRIVER_MEMORY_SAMPLE_EVERY": 1})
+    scraper._is_driver_alive = MagicMock(return_value=True)
+    scraper._restart_driver = MagicMock()
+
+    scraper._enrich_items_with_recovery(items, timeout=1)
     assert scraper._restart_driver.call_count == 1
 
 
-def test_enrich_anti_detection_delay_n_menos_1_veces(mocker, mock_driver):
+def test_enrich_recicla_driver_por_navegaciones(mocker, mock_driver):
+    items = [_make_item(i) for i in range(5)]
+    _mock_detail_page(mocker, items)
+    mocker.patch("time.sleep")
+    mocker.patch("src.scraper.driver_rss_mb", return_value=None)
+
+    scraper = make_scraper(mock_driver)
+    scraper.config = type("Cfg", (scraper.config,), {"DRIVER_MAX_NAVIGATIONS": 2})
+    scraper._is_driver_alive = MagicMock(return_value=True)
+    scraper._restart_driver = MagicMock()
+
+    scraper._enrich_items_with_recovery(items, timeout=1)
+    # Reinicia tras la 2ª y la 4ª navegación
+    assert scraper._restart_driver.call_count == 2
+
+
+def test_enrich_eventos_incluyen_memoria(mocker, mock_driver):
+    items = [_make_item(i) for i in range(2)]
+    _mock_detail_page(mocker, items)
+    mocker.patch("time.sleep")
+    mocker.patch("src.scraper.driver_rss_mb", return_value=512.5)
+    events = []
+
+    scraper = make_scraper(mock_driver)
+    scraper._on_progress = events.append
+    scraper._is_driver_alive = MagicMock(return_value=True)
+    scraper._restart_driver = MagicMock()
+
+    scraper._enrich_items_with_recovery(items, timeout=1)
+    assert [e["memory_mb"] for e in events] == [512.5, 512.5]
+
+
+def test_enrich_mide_memoria_cada_n_navegaciones(mocker, mock_driver):
+    items = [_make_item(i) for i in range(5)]
+    _mock_detail_page(mocker, items)
+    mocker.patch("time.sleep")
+    rss = mocker.patch("src.scraper.driver_rss_mb", side_effect=[300.0, 400.0])
+    events = []
+
+    scraper = make_scraper(mock_driver)
+    scraper.config = type("Cfg", (scraper.config,), {"DRIVER_MEMORY_SAMPLE_EVERY": 3})
+    scraper._on_progress = events.append
+    scraper._is_driver_alive = MagicMock(return_value=True)
+    scraper._restart_driver = MagicMock()
+
+    scraper._enrich_items_with_recovery(items, timeout=1)
+    # Se mide en la 1ª y la 4ª navegación; entre medias se repite la última
+    assert rss.call_count == 2
+    assert [e["memory_mb"] for e in events] == [300.0, 300.0, 300.0, 400.0, 400.0]
+
+
+def test_enrich_cada_navegacion_pide_turno_al_rate_limiter(mocker, mock_driver):
     n = 4
     items = [_make_item(i) for i in range(n)]
-    _, mock_detail = _mock_detail_page(mocker, items)
-    mock_sleep = mocker.patch("time.sleep")
+    _mock_detail_page(mocker, items)
+    limiter = MagicMock()
+    limiter.acquire.return_value = 0
 
-    scraper = make_scraper(mock_driver)
+    scraper = WallapopScraper(headless=True, http_details=False, rate_limiter=limiter)
+    scraper.driver = mock_driver
     scraper._is_driver_alive = MagicMock(return_value=True)
     scraper._restart_driver = MagicMock()
 
     scraper._enrich_items_with_recovery(items, timeout=1)
-    # anti_detection_delay llama a time.sleep una vez, y hay N-1 delays
-    # (también puede haber sleep en _restart_driver, pero no se llama aquí)
-    assert mock_sleep.call_count == n - 1
+    assert [c.args[0] for c in limiter.acquire.call_args_list] == [i["url"] for i in items]
+    assert limiter.report_success.call_count == n
+
+
+def test_enrich_fallo_selenium_frena_el_rate_limiter(mocker, mock_driver):
+    items = [_make_item(0)]
+    _mock_detail_page(mocker, [{**items[0], "description": "No disponible"}])
+    limiter = MagicMock()
+    limiter.acquire.return_value = 0
+
+    scraper = WallapopScraper(headless=True, http_details=False, rate_limiter=limiter)
+    scraper.driver = mock_driver
+    scraper._is_driver_alive = MagicMock(return_value=True)
+
+    scraper._enrich_items_with_recovery(items, timeout=1)
+    limiter.report_failure.assert_called_once_with(items[0]["url"])
+
+
+# ── Detalle vía HTTP ──────────────────────────────────────────────────────────
+
+def _mock_http_fetcher(mocker, results):
+    """Mockea HttpDetailFetcher.from_driver; results mapea url -> resultado."""
+    fetcher = MagicMock()
+    fetcher.enrich_item.side_effect = lambda item: results[item["url"]]
+    mocker.patch("src.scraper.HttpDetailFetcher.from_driver", return_value=fetcher)
+    return fetcher
+
+
+def _http_scraper(mock_driver, on_progress=None):
+    scraper = WallapopScraper(headless=True, on_progress=on_progress, http_details=True)
+    scraper.driver = mock_driver
+    scraper._is_driver_alive = MagicMock(return_value=True)
+    scraper._restart_driver = MagicMock()
+    return scraper
+
+
+def test_enrich_http_evita_selenium(mocker, mock_driver):
+    items = [_make_item(i) for i in range(3)]
+    _, mock_detail = _mock_detail_page(mocker, items)
+    fetcher = _mock_http_fetcher(mocker, {i["url"]: i for i in items})
+    mocker.patch("time.sleep")
+
+    scraper = _http_scraper(mock_driver)
+    result = scraper._enrich_items_with_recovery(items, timeout=1)
+    assert len(result) == 3
+    assert fetcher.enrich_item.call_count == 3
+    mock_detail.enrich_item.assert_not_called()
+    fetcher.close.assert_called_once()
+
+
+def test_enrich_http_fallback_a_selenium_si_falla(mocker, mock_driver):
+    items = [_make_item(i) for i in range(3)]
+    _, mock_detail = _mock_detail_page(mocker, [items[1]])
+    _mock_http_fetcher(mocker, {items[0]["url"]: items[0], items[1]["url"]: None, items[2]["url"]: items[2]})
+    mocker.patch("time.sleep")
+
+    scraper = _http_scraper(mock_driver)
+    result = scraper._enrich_items_with_recovery(items, timeout=1)
+    # Se devuelven en el orden original aunque terminen desordenados
+    assert [r["url"] for r in result] == [i["url"] for i in items]
+    assert mock_detail.enrich_item.call_count == 1
+
+
+def test_enrich_http_eventos_con_indice_y_total(mocker, mock_driver):
+    items = [_make_item(i) for i in range(5)]
+    _mock_detail_page(mocker, [])
+    _mock_http_fetcher(mocker, {i["url"]: i for i in items})
+    mocker.patch("time.sleep")
+    events = []
+
+    scraper = _http_scraper(mock_driver, on_progress=events.append)
+    scraper._enrich_items_with_recovery(items, timeout=1)
+
+    scraped = [e for e in events if e["type"] == "item_scraped"]
+    assert [e["index"] for e in scraped] == [1, 2, 3, 4, 5]
+    assert all(e["total"] == 5 for e in scraped)
+    assert {e["item"]["url"] for e in scraped} == {i["url"] for i in items}
+
+
+def test_enrich_http_no_mide_memoria_del_driver(mocker, mock_driver):
+    items = [_make_item(i) for i in range(3)]
+    _mock_detail_page(mocker, [])
+    _mock_http_fetcher(mocker, {i["url"]: i for i in items})
+    mocker.patch("time.sleep")
+    rss = mocker.patch("src.scraper.driver_rss_mb", return_value=300.0)
+
+    scraper = _http_scraper(mock_driver)
+    scraper._enrich_items_with_recovery(items, timeout=1)
+    rss.assert_not_called()
+
+
+# ── Pool de drivers ───────────────────────────────────────────────────────────
+
+def test_initialize_y_cleanup_usan_el_pool(mocker, mock_driver):
+    mocker.patch("src.scraper.setup_logging", return_value="ts")
+    pool = MagicMock()
+    pool.acquire.return_value = mock_driver
+    scraper = WallapopScraper(headless=True, pool=pool)
+
+    scraper.initialize("macbook")
+    assert scraper.driver is mock_driver
+    scraper.cleanup()
+    pool.release.assert_called_once_with(mock_driver)
+    assert scraper.driver is None
+
+
+def test_restart_driver_con_pool_descarta_y_pide_otro(mock_driver):
+    pool = MagicMock()
+    nuevo = MagicMock()
+    pool.acquire.return_value = nuevo
+    scraper = WallapopScraper(headless=True, pool=pool)
+    scraper.driver = mock_driver
+
+    scraper._restart_driver()
+    pool.release.assert_called_once_with(mock_driver, discard=True)
+    assert scraper.driver is nuevo
+
+
+# ── Pipeline de pestañas ──────────────────────────────────────────────────────
+
+def _tab_scraper(driver, tabs):
+    scraper = WallapopScraper(headless=True, http_details=False, detail_tabs=tabs)
+    scraper.driver = driver
+    scraper._is_driver_alive = MagicMock(return_value=True)
+    scraper._restart_driver = MagicMock()
+    return scraper
+
+
+def _pending_items(n):
+    return [_make_item(i, description="pending") for i in range(n)]
+
+
+def test_enrich_con_pestanas_solapa_navegaciones(mocker, item_detail_html):
+    from tests.test_item_detail_page import FakeTabDriver
+    mocker.patch("time.sleep")
+    mocker.patch("src.scraper.driver_rss_mb", return_value=None)
+    driver = FakeTabDriver(item_detail_html)
+    items = _pending_items(5)
+
+    result = _tab_scraper(driver, tabs=3)._enrich_items_with_recovery(items, timeout=1)
+
+    assert [r["url"] for r in result] == [i["url"] for i in items]
+    assert all("perfecto estado" in r["description"] for r in result)
+    kinds = [kind for kind, _ in driver.log]
+    # Las 3 primeras navegaciones se lanzan antes del primer parseo
+    assert kinds[:4] == ["nav", "nav", "nav", "parse"]
+    assert driver.window_handles == ["main"]
+
+
+def test_enrich_con_pestanas_fallback_a_una_pestana(mocker, item_detail_html):
+    from tests.test_item_detail_page import FakeTabDriver
+    mocker.patch("time.sleep")
+    mocker.patch("src.scraper.driver_rss_mb", return_value=None)
+    driver = FakeTabDriver(item_detail_html, fail_new_window=True)
+    items = _pending_items(3)
+
+    result = _tab_scraper(driver, tabs=3)._enrich_items_with_recovery(items, timeout=1)
+
+    assert [r["url"] for r in result] == [i["url"] for i in items]
+    assert all("perfecto estado" in r["description"] for r in result)
+
+
+# ── Delta scraping ────────────────────────────────────────────────────────────
+
+def test_split_known_separa_nuevos_cambiados_y_sin_cambios(db_path):
+    from src.database import upsert_item
+    sin_cambios = _make_item(1)
+    cambia_precio = _make_item(2)
+    sin_descripcion = _make_item(3, description="No disponible")
+    for item in (sin_cambios, cambia_precio, sin_descripcion):
+        upsert_item(item, "test")
+
+    cards = [
+        {**sin_cambios, "description": "pending"},
+        {**cambia_precio, "price": "90€", "description": "pending"},
+        {**sin_descripcion, "description": "pending"},
+        _make_item(4, description="pending"),
+    ]
+    scraper = WallapopScraper(headless=True)
+    to_enrich, unchanged = scraper._split_known(cards)
+
+    assert unchanged == [sin_cambios["url"]]
+    assert [i["url"] for i in to_enrich] == [
+        cambia_precio["url"], sin_descripcion["url"], _make_item(4)["url"]
+    ]
+
+
+def test_split_known_descripcion_antigua_se_revisita(db_path):
+    from src.database import upsert_item, get_connection
+    item = _make_item(1)
+    upsert_item(item, "test")
+    conn = get_connection()
+    conn.execute("UPDATE items SET detail_fetched_at = '2000-01-01T00:00:00'")
+    conn.commit()
+    conn.close()
+
+    to_enrich, unchanged = WallapopScraper(headless=True)._split_known([item])
+    assert [i["url"] for i in to_enrich] == [item["url"]]
+    assert unchanged == []
+
+
+# ── _collect_items ────────────────────────────────────────────────────────────
+
+def test_collect_items_encola_cada_lote_durante_el_scroll(mock_driver, mocker):
+    scraper = WallapopScraper(headless=True, http_details=False, incremental=False)
+    batches = [[_make_item(1), _make_item(2)], [_make_item(3)]]
+    results = mocker.MagicMock()
+    enricher = mocker.MagicMock()
+
+    def iter_item_batches(**kwargs):
+        for batch in batches:
+            yield batch
+            # El lote anterior ya se encoló antes de pedir el siguiente
+            assert enricher.submit.call_count == sum(len(b) for b in batches[:batches.index(batch) + 1])
+
+    results.iter_item_batches.side_effect = iter_item_batches
+    items, unchanged = scraper._collect_items(results, None, None, enricher)
+
+    assert [i["url"] for i in items] == [_make_item(n)["url"] for n in (1, 2, 3)]
+    assert [c.args[0] for c in enricher.submit.call_args_list] == [0, 1, 2]
+    assert unchanged == []
+
+
+def test_collect_items_incremental_filtra_por_lote(db_path, mocker):
+    from src.database import upsert_item
+    known = _make_item(1)
+    upsert_item(known, "test")
+    results = mocker.MagicMock()
+    results.iter_item_batches.return_value = iter([[{**known, "description": "pending"}, _make_item(2)]])
+
+    scraper = WallapopScraper(headless=True, http_details=False, incremental=True)
+    items, unchanged = scraper._collect_items(results, None, None)
+
+    assert [i["url"] for i in items] == [_make_item(2)["url"]]
+    assert unchanged == [known["url"]]
+
+
+def test_collect_items_apunta_checkpoint_antes_de_encolar(db_path, mocker):
+    from src.database import get_checkpoint
+    results = mocker.MagicMock()
+    results.iter_item_batches.return_value = iter([[_make_item(1)], [_make_item(2)]])
+    enricher = mocker.MagicMock()
+    enricher.submit.side_effect = lambda i, item, priority=None: seen.append(len(get_checkpoint("test")))
+    seen = []
+
+    scraper = WallapopScraper(headless=True, http_details=False, incremental=False)
+    scraper._collect_items(results, None, None, enricher, checkpoint_query="test")
+
+    assert seen == [1, 2]
+    assert len(get_checkpoint("test")) == 2
+
+
+# ── Guardado incremental y reanudación ────────────────────────────────────────
+
+def test_enrich_guarda_cada_item_al_terminar(mocker, mock_driver):
+    items = [_make_item(i) for i in range(3)]
+    _mock_detail_page(mocker, items)
+    writer = MagicMock()
+    scraper = make_scraper(mock_driver)
+    scraper._is_driver_alive = MagicMock(return_value=True)
+
+    scraper._enrich_items_with_recovery(items, timeout=1, writer=writer)
+    assert [c.args[0]["url"] for c in writer.add.call_args_list] == [i["url"] for i in items]
+
+
+def _run_scraper(mocker, mock_driver):
+    scraper = WallapopScraper(headless=True, http_details=False, incremental=False)
+    mocker.patch.object(scraper, "initialize", side_effect=lambda q: setattr(scraper, "driver", mock_driver))
+    mocker.patch.object(scraper, "cleanup")
+    scraper.timestamp = "ts"
+    mocker.patch("src.scraper.save_to_csv", return_value=True)
+    mocker.patch("src.scraper.HomePage")
+    scraper._is_driver_alive = MagicMock(return_value=True)
+    return scraper
+
+
+def test_run_reanuda_solo_los_pendientes(db_path, mocker, mock_driver):
+    from src.database import save_checkpoint, get_checkpoint, get_items
+    pending = [_make_item(i, description="pending") for i in (7, 8)]
+    save_checkpoint("korg", pending)
+    _mock_detail_page(mocker, [_make_item(7), _make_item(8)])
+    scraper = _run_scraper(mocker, mock_driver)
+    open_results = mocker.patch.object(scraper, "_open_results")
+
+    scraper.run("korg")
+
+    open_results.assert_not_called()
+    assert get_checkpoint("korg") == []
+    assert get_items()["total"] == 2
+
+
+def test_run_cortado_deja_guardado_lo_hecho_y_pendiente_el_resto(db_path, mocker, mock_driver):
+    from src.database import get_checkpoint, get_items
+    cards = [_make_item(i, description="pending") for i in range(3)]
+    scraper = _run_scraper(mocker, mock_driver)
+    results = mocker.patch.object(scraper, "_open_results").return_value
+    results.iter_item_batches.return_value = iter([cards])
+
+    detail = mocker.patch("src.scraper.ItemDetailPage").return_value
+    detail.enrich_item.side_effect = [_make_item(0), KeyboardInterrupt()]
+    mocker.patch("src.config.Config.DB_BATCH_SIZE", 100)
+
+    with pytest.raises(KeyboardInterrupt):
+        scraper.run("korg")
+
+    assert get_items()["total"] == 1
+    assert [i["url"] for i in get_checkpoint("korg")] == [cards[1]["url"], cards[2]["url"]]
+
+
+# ── _block_resources ──────────────────────────────────────────────────────────
+
+def test_block_resources_aplica_perfil_del_tipo_de_pagina(mock_driver, mocker):
+    blocking = mocker.patch("src.scraper.set_resource_blocking")
+    scraper = make_scraper(mock_driver)
+    scraper._block_resources("detail")
+    blocking.assert_called_once_with(mock_driver, "detail")
+
+
+def test_block_resources_desactivado_por_config(mock_driver, mocker):
+    blocking = mocker.patch("src.scraper.set_resource_blocking")
+    mocker.patch("src.config.Config.BLOCK_RESOURCES", False)
+    make_scraper(mock_driver)._block_resources("detail")
+    blocking.assert_not_called()
+
+
+# ── _open_results ─────────────────────────────────────────────────────────────
+
+def _mock_pages(mocker):
+    home = mocker.patch("src.scraper.HomePage").return_value
+    results = mocker.patch("src.scraper.SearchResultsPage").return_value
+    return home, results
+
+
+def test_open_results_directo_salta_la_home(mock_driver, mocker):
+    home, results = _mock_pages(mocker)
+    scraper = make_scraper(mock_driver)
+    scraper._open_results("korg", {"max_price": 100}, known_urls=None, timeout=1)
+    results.open.assert_called_once_with("korg", {"max_price": 100})
+    home.search.assert_not_called()
+    mock_driver.get.assert_not_called()
+    # El banner puede salir igualmente en la página de resultados
+    home.accept_cookies.assert_called_once()
+
+
+def test_open_results_con_conocidos_ordena_por_recientes(mock_driver, mocker):
+    home, results = _mock_pages(mocker)
+    scraper = make_scraper(mock_driver)
+    scraper._open_results("korg", {"max_price": 100}, known_urls={"u"}, timeout=1)
+    assert results.open.call_args.args[1]["order_by"] == "newest"
+
+
+def test_open_results_respeta_el_orden_de_la_busqueda(mock_driver, mocker):
+    home, results = _mock_pages(mocker)
+    scraper = make_scraper(mock_driver)
+    scraper._open_results("korg", {"order_by": "price_low_to_high"}, known_urls={"u"}, timeout=1)
+    assert results.open.call_args.args[1]["order_by"] == "price_low_to_high"
+
+
+def test_orden_propio_desactiva_la_parada_temprana(db_path, mock_driver):
+    from src.database import upsert_item
+    upsert_item(_make_item(1), "korg")
+    scraper = make_scraper(mock_driver)
+    scraper.incremental = True
+    assert scraper._known_urls_for_early_stop("korg") == {_make_item(1)["url"]}
+    assert scraper._known_urls_for_early_stop("korg", {"order_by": "newest"}) == {_make_item(1)["url"]}
+    assert scraper._known_urls_for_early_stop("korg", {"order_by": "price_low_to_high"}) is None
+
+
+def test_open_results_por_la_home_aplica_filtros(mock_driver, mocker):
+    home, results = _mock_pages(mocker)
+    mocker.patch("src.config.Config.DIRECT_SEARCH_URL", False)
+    scraper = make_scraper(mock_driver)
+    scraper._open_results("korg", {"max_price": 100}, known_urls=None, timeout=1)
+    mock_driver.get.assert_called_once_with(scraper.config.BASE_URL)
+    home.search.assert_called_once_with("korg")
+    results.apply_filters.assert_called_once_with("korg", {"max_price": 100})
+
+
+# ── Búsqueda por API ──────────────────────────────────────────────────────────
+
+def test_open_search_api_lista_por_http(mock_driver, mocker, search_api_server):
+    mocker.patch("src.scraper.HomePage")
+    mocker.patch("src.config.Config.SEARCH_API_URL", search_api_server.url)
+    scraper = make_scraper(mock_driver)
+    client = scraper._open_search_api("korg", None, known_urls={"u"}, timeout=1)
+    assert search_api_server.requests[0]["params"]["order_by"] == "newest"
+    assert len(client.extract_items()) == 5
+    client.close()
+
+
+def test_open_search_api_fallida_devuelve_none(mock_driver, mocker, search_api_server):
+    mocker.patch("src.scraper.HomePage")
+    mocker.patch("src.config.Config.SEARCH_API_URL", search_api_server.url)
+    search_api_server.server.status = 403
+    assert make_scraper(mock_driver)._open_search_api("korg", None, known_urls=None, timeout=1) is None
+
+
+def test_run_con_api_vuelve_al_navegador_si_falla(db_path, mocker, mock_driver):
+    scraper = _run_scraper(mocker, mock_driver)
+    scraper.search_client = "api"
+    mocker.patch.object(scraper, "_open_search_api", return_value=None)
+    results = mocker.patch.object(scraper, "_open_results").return_value
+    results.iter_item_batches.return_value = iter([])
+
+    scraper.run("korg")
+
+    scraper._open_results.assert_called_once()
+
+
+# ── run_batch ─────────────────────────────────────────────────────────────────
+
+def _batch_results(mocker, scraper, listings):
+    """_open_search devuelve, por query, unos resultados con esos lotes."""
+    def open_search(query, filters, known_urls, timeout):
+        results = MagicMock()
+        results.iter_item_batches.return_value = iter(listings[query])
+        return results, None
+    return mocker.patch.object(scraper, "_open_search", side_effect=open_search)
+
+
+def test_run_batch_enriquece_cada_url_una_vez(db_path, mocker, mock_driver):
+    from src.database import get_query_urls
+    shared = _make_item(1, description="pending")
+    listings = {
+        "korg nano": [[shared, _make_item(2, description="pending")]],
+        "korg nanokontrol": [[_make_item(3, description="pending"), shared]],
+    }
+    _, detail = _mock_detail_page(mocker, [_make_item(1), _make_item(2), _make_item(3)])
+    scraper = _run_scraper(mocker, mock_driver)
+    _batch_results(mocker, scraper, listings)
+
+    scraper.run_batch([{"query": "korg nano"}, {"query": "korg nanokontrol"}])
+
+    assert detail.enrich_item.call_count == 3
+    assert get_query_urls("korg nano") == {_make_item(1)["url"], _make_item(2)["url"]}
+    assert get_query_urls("korg nanokontrol") == {_make_item(1)["url"], _make_item(3)["url"]}
+
+
+def test_run_batch_sin_cambios_se_asocia_a_la_nueva_busqueda(db_path, mocker, mock_driver):
+    from src.database import upsert_item, get_query_urls
+    known = _make_item(1)
+    upsert_item(known, "korg nano")
+    _, detail = _mock_detail_page(mocker, [])
+    scraper = _run_scraper(mocker, mock_driver)
+    scraper.incremental = True
+    _batch_results(mocker, scraper, {"korg nano": [[known]], "korg nanokontrol": [[known]]})
+
+    scraper.run_batch([{"query": "korg nano"}, {"query": "korg nanokontrol"}])
+
+    detail.enrich_item.assert_not_called()
+    assert get_query_urls("korg nanokontrol") == {known["url"]}
+
+
+def test_run_batch_busqueda_fallida_no_corta_el_lote(db_path, mocker, mock_driver):
+    from src.database import get_items
+    _mock_detail_page(mocker, [_make_item(2)])
+    scraper = _run_scraper(mocker, mock_driver)
+    ok = MagicMock()
+    ok.iter_item_batches.return_value = iter([[_make_item(2, description="pending")]])
+    mocker.patch.object(scraper, "_open_search", side_effect=[RuntimeError("captcha"), (ok, None)])
+
+    scraper.run_batch([{"query": "rota"}, {"query": "korg"}])
+
+    assert get_items()["total"] == 1
+
+
+
+def test_run_batch_reanuda_los_pendientes_de_cada_busqueda(db_path, mocker, mock_driver):
+    from src.database import save_checkpoint, get_checkpoint, get_query_urls
+    save_checkpoint("korg nano", [_make_item(7, description="pending")])
+    _mock_detail_page(mocker, [_make_item(7), _make_item(2)])
+    scraper = _run_scraper(mocker, mock_driver)
+    open_search = _batch_results(mocker, scraper, {"korg nanokontrol": [[_make_item(2, description="pending")]]})
+
+    scraper.run_batch([{"query": "korg nano"}, {"query": "korg nanokontrol"}])
+
+    # La búsqueda con pendientes no se vuelve a listar
+    assert [c.args[0] for c in open_search.call_args_list] == ["korg nanokontrol"]
+    assert get_query_urls("korg nano") == {_make_item(7)["url"]}
+    assert get_checkpoint("korg nano") == [] and get_checkpoint("korg nanokontrol") == []
+
+
+def test_run_batch_cortado_deja_pendientes_en_cada_busqueda(db_path, mocker, mock_driver):
+    from src.database import get_checkpoint
+    shared = _make_item(1, description="pending")
+    listings = {
+        "korg nano": [[_make_item(0, description="pending"), shared]],
+        "korg nanokontrol": [[shared]],
+    }
+    detail = mocker.patch("src.scraper.ItemDetailPage").return_value
+    detail.enrich_item.side_effect = [_make_item(0), KeyboardInterrupt()]
+    mocker.patch("src.config.Config.DB_BATCH_SIZE", 100)
+    scraper = _run_scraper(mocker, mock_driver)
+    _batch_results(mocker, scraper, listings)
+
+    with pytest.raises(KeyboardInterrupt):
+        scraper.run_batch([{"query": "korg nano"}, {"query": "korg nanokontrol"}])
+
+    assert [i["url"] for i in get_checkpoint("korg nano")] == [shared["url"]]
+    assert [i["url"] for i in get_checkpoint("korg nanokontrol")] == [shared["url"]]
+
+# ── Prioridad y presupuesto por ejecución ─────────────────────────────────────
+
+def test_enrich_selenium_va_por_prioridad(mocker, mock_driver):
+    items = [_make_item(i, description="pending") for i in range(3)]
+    detail = mocker.patch("src.scraper.ItemDetailPage").return_value
+    detail.enrich_item.side_effect = lambda item: {**item, "description": "real"}
+    scraper = make_scraper(mock_driver)
+    scraper._is_driver_alive = MagicMock(return_value=True)
+    priorities = {items[0]["url"]: (2, 1, ""), items[1]["url"]: (1, 1, ""), items[2]["url"]: (0, 1, "")}
+
+    scraper._enrich_items_with_recovery(items, timeout=1, priorities=priorities)
+
+    visited = [c.args[0]["url"] for c in detail.enrich_item.call_args_list]
+    assert visited == [items[2]["url"], items[1]["url"], items[0]["url"]]
+
+
+def test_presupuesto_de_items_aplaza_el_resto_a_la_siguiente_ejecucion(db_path, mocker, mock_driver):
+    from src.database import get_items
+    cards = [_make_item(i, description="pending") for i in range(3)]
+    mocker.patch("src.config.Config.RUN_ITEM_BUDGET", 2)
+    detail = mocker.patch("src.scraper.ItemDetailPage").return_value
+    detail.enrich_item.side_effect = lambda item: {**item, "description": "real"}
+    scraper = _run_scraper(mocker, mock_driver)
+    events = []
+    scraper._on_progress = events.append
+    results = mocker.patch.object(scraper, "_open_results").return_value
+    results.iter_item_batches.return_value = iter([cards])
+
+    scraper.run("korg")
+    assert get_items()["total"] == 2
+    assert events[-1] == {"type": "done", "saved": 2, "deferred": 1}
+
+    # La siguiente ejecución recoge el aplazado aunque ya no salga en el listado
+    results.iter_item_batches.return_value = iter([])
+    scraper.run("korg")
+    assert get_items()["total"] == 3
+    assert detail.enrich_item.call_args.args[0]["url"] == cards[2]["url"]
+
+
+def test_aplazados_sobreviven_a_una_ejecucion_cortada(db_path, mocker, mock_driver):
+    from src.database import defer_items, get_deferred
+    deferred = _make_item(5, description="pending")
+    defer_items("korg", [deferred])
+    detail = mocker.patch("src.scraper.ItemDetailPage").return_value
+    detail.enrich_item.side_effect = KeyboardInterrupt()
+    scraper = _run_scraper(mocker, mock_driver)
+    results = mocker.patch.object(scraper, "_open_results").return_value
+    results.iter_item_batches.return_value = iter([])
+
+    with pytest.raises(KeyboardInterrupt):
+        scraper.run("korg")
+    assert [i["url"] for i in get_deferred("korg")] == [deferred["url"]]
+
+    # Se borra solo cuando el item llega a la DB
+    detail.enrich_item.side_effect = lambda item: {**item, "description": "real"}
+    results.iter_item_batches.return_value = iter([])
+    scraper.run("korg")
+    assert get_deferred("korg") == []
+
+
+def test_presupuesto_de_tiempo_agotado_no_lanza_mas_detalles(mocker, mock_driver):
+    items = [_make_item(i, description="pending") for i in range(3)]
+    detail = mocker.patch("src.scraper.ItemDetailPage").return_value
+    detail.enrich_item.side_effect = lambda item: {**item, "description": "real"}
+    scraper = make_scraper(mock_driver)
+    scraper._is_driver_alive = MagicMock(return_value=True)
+
+    full_items = scraper._enrich_items_with_recovery(items, timeout=1, deadline=0)
+
+    detail.enrich_item.assert_not_called()
+    assert full_items == [None, None, None]
+
+
+def test_run_batch_aplaza_bajo_cada_busqueda_que_lo_listo(db_path, mocker, mock_driver):
+    from src.database import get_deferred
+    shared = _make_item(1, description="pending")
+    listings = {
+        "korg nano": [[_make_item(2, description="pending"), shared]],
+        "korg nanokontrol": [[shared]],
+    }
+    mocker.patch("src.config.Config.RUN_ITEM_BUDGET", 1)
+    detail = mocker.patch("src.scraper.ItemDetailPage").return_value
+    detail.enrich_item.side_effect = lambda item: {**item, "description": "real"}
+    scraper = _run_scraper(mocker, mock_driver)
+    _batch_results(mocker, scraper, listings)
+
+    scraper.run_batch([{"query": "korg nano"}, {"query": "korg nanokontrol"}])
+
+    assert [i["url"] for i in get_deferred("korg nano")] == [shared["url"]]
+    assert [i["url"] for i in get_deferred("korg nanokontrol")] == [shared["url"]]
+
+
+# ── Parseo en el pool de procesos ─────────────────────────────────────────────
+
+def test_enrich_selenium_parsea_fuera_del_driver(mocker, mock_driver, item_detail_html):
+    from src.pages.item_detail_page import ItemDetailPage as RealDetailPage, parse_detail_html
+    from src.parse_pool import ParsePool
+    items = [_make_item(i, description="pending") for i in range(3)]
+    real = RealDetailPage(None)
+    detail = mocker.patch("src.scraper.ItemDetailPage").return_value
+    detail.load_html.return_value = item_detail_html
+    detail.fields_to_parse.side_effect = real.fields_to_parse
+    detail.fill_item.side_effect = real.fill_item
+    inline = ParsePool(processes=0)
+    pool = MagicMock(offloads=True)
+    pool.submit.side_effect = inline.submit
+    scraper = WallapopScraper(headless=True, http_details=False, parse_pool=pool)
+    scraper.driver = mock_driver
+    scraper._is_driver_alive = MagicMock(return_value=True)
+
+    full_items = scraper._enrich_items_with_recovery(items, timeout=1)
+
+    detail.enrich_item.assert_not_called()
+    assert pool.submit.call_count == 3
+    assert pool.submit.call_args.args[0] is parse_detail_html
+    assert all("perfecto estado" in item["description"] for item in full_items)
+
+
+def test_presupuesto_con_detalle_http_no_descarga_el_resto(db_path, mocker, mock_driver):
+    from src.database import get_items, get_deferred
+    cards = [_make_item(i, description="pending") for i in range(20)]
+    mocker.patch("src.config.Config.RUN_ITEM_BUDGET", 2)
+    mocker.patch("src.config.Config.DETAIL_WORKERS", 2)
+    fetched = []
+
+    def slow_fetch(item):
+        time.sleep(0.02)
+        fetched.append(item["url"])
+        return {**item, "description": "real"}
+
+    fetcher = MagicMock()
+    fetcher.enrich_item.side_effect = slow_fetch
+    mocker.patch("src.scraper.HttpDetailFetcher.from_driver", return_value=fetcher)
+    mocker.patch("src.scraper.ItemDetailPage")
+    scraper = _run_scraper(mocker, mock_driver)
+    scraper.http_details = True
+    results = mocker.patch.object(scraper, "_open_results").return_value
+    results.iter_item_batches.return_value = iter([cards])
+
+    scraper.run("korg")
+
+    assert get_items()["total"] == 2
+    assert len(get_deferred("korg")) == 18
+    # Solo las descargas que ya estaban en curso al agotarse el presupuesto
+    assert len(fetched) <= 2 + 2
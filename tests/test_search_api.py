@@ -0,0 +1,166 @@
+import json
+import base64
+import pytest
+from unittest.mock import MagicMock
+
+from src.search_api import (
+    SearchApiCapture, parse_search_response, item_from_api, discard_performance_log,
+)
+
+SEARCH_URL = "https://api.wallapop.com/api/v3/search/section?keywords=korg"
+
+
+def api_item(slug, **extra):
+    obj = {
+        "id": f"id-{slug}",
+        "title": f"  Korg  {slug} ",
+        "web_slug": slug,
+        "price": {"amount": 250.0, "currency": "EUR"},
+        "location": {"city": "Madrid", "postal_code": "28001"},
+        "images": [{"urls": {"small": f"https://cdn/{slug}-s.jpg", "big": f"https://cdn/{slug}-b.jpg"}}],
+        "created_at": 1700000000000,
+        "modified_at": 1700003600000,
+    }
+    obj.update(extra)
+    return obj
+
+
+def section_response(*slugs):
+    return {"data": {"section": {"payload": {"items": [api_item(s) for s in slugs]}}}, "meta": {}}
+
+
+# ── parse_search_response ────────────────────────────────────────────────────
+
+def test_item_from_api_campos():
+    item = item_from_api(api_item("korg-minilogue-1"))
+    assert item["url"] == "https://www.wallapop.com/item/korg-minilogue-1"
+    assert item["title"] == "Korg korg-minilogue-1"
+    assert item["price"] == 250.0
+    assert item["currency"] == "EUR"
+    assert item["location"] == "Madrid"
+    assert item["images"] == ["https://cdn/korg-minilogue-1-b.jpg"]
+    assert item["item_id"] == "id-korg-minilogue-1"
+    assert item["created_at"].startswith("2023-11-")
+    assert item["description"] == "pending"
+
+
+def test_item_from_api_formato_antiguo():
+    obj = {"id": 7, "title": "Korg", "web_slug": "korg-7", "price": 90, "currency": "EUR",
+           "location": {"city": "Bilbao"}, "images": [{"original": "https://cdn/7.jpg"}],
+           "creation_date": 1700000000000}
+    item = item_from_api(obj)
+    assert item["price"] == 90.0
+    assert item["images"] == ["https://cdn/7.jpg"]
+    assert item["created_at"] is not None
+
+
+def test_item_from_api_campos_ausentes():
+    item = item_from_api({"web_slug": "x"})
+    assert item["title"] == "No disponible"
+    assert item["price"] == "No disponible"
+    assert item["location"] == "pending"
+    assert item["images"] == []
+
+
+def test_item_from_api_sin_url_devuelve_none():
+    assert item_from_api({"title": "Sin slug"}) is None
+
+
+def test_parse_search_response_busca_la_lista_de_items():
+    assert [i["url"][-1] for i in parse_search_response(section_response("a", "b"))] == ["a", "b"]
+    assert len(parse_search_response({"search_objects": [api_item("c")]})) == 1
+    assert parse_search_response({"data": {"otra": 1}}) == []
+
+
+# ── SearchApiCapture ─────────────────────────────────────────────────────────
+
+def log_entry(method, **params):
+    return {"message": json.dumps({"message": {"method": method, "params": params}})}
+
+
+def response_received(request_id, url=SEARCH_URL, status=200):
+    return log_entry("Network.responseReceived", requestId=request_id,
+                     response={"url": url, "status": status})
+
+
+def loading_finished(request_id):
+    return log_entry("Network.loadingFinished", requestId=request_id)
+
+
+def make_capture(logs, bodies):
+    """Driver cuyo get_log devuelve cada vez la siguiente lista de `logs`."""
+    driver = MagicMock()
+    pending = [[]] + [list(batch) for batch in logs]
+    driver.get_log.side_effect = lambda kind: pending.pop(0) if pending else []
+
+    def cdp(cmd, params):
+        if cmd == "Network.getResponseBody":
+            return bodies[params["requestId"]]
+        return {}
+
+    driver.execute_cdp_cmd.side_effect = cdp
+    return SearchApiCapture.start(driver), driver
+
+
+def test_capture_lee_respuestas_terminadas():
+    body = {"body": json.dumps(section_response("a", "b")), "base64Encoded": False}
+    capture, _ = make_capture([[response_received("1"), loading_finished("1")]], {"1": body})
+    assert [i["url"] for i in capture.drain()] == [
+        "https://www.wallapop.com/item/a", "https://www.wallapop.com/item/b",
+    ]
+    assert capture.responses == 1
+
+
+def test_capture_espera_a_loading_finished():
+    body = {"body": json.dumps(section_response("a")), "base64Encoded": False}
+    capture, _ = make_capture([[response_received("1")], [loading_finished("1")]], {"1": body})
+    assert capture.drain() == []
+    assert len(capture.drain()) == 1
+
+
+def test_capture_cuerpo_en_base64():
+    encoded = base64.b64encode(json.dumps(section_response("a")).encode()).decode()
+    capture, _ = make_capture([[response_received("1"), loading_finished("1")]],
+                              {"1": {"body": encoded, "base64Encoded": True}})
+    assert len(capture.drain()) == 1
+
+
+def test_capture_ignora_otras_urls_y_errores_http():
+    capture, driver = make_capture([[
+        response_received("1", url="https://api.wallapop.com/api/v3/users/me"),
+        response_received("2", status=429),
+        loading_finished("1"), loading_finished("2"),
+    ]], {})
+    assert capture.drain() == []
+    assert not any(c.args[0] == "Network.getResponseBody" for c in driver.execute_cdp_cmd.call_args_list)
+
+
+def test_capture_no_repite_items_ya_devueltos():
+    bodies = {
+        "1": {"body": json.dumps(section_response("a", "b"))},
+        "2": {"body": json.dumps(section_response("b", "c"))},
+    }
+    capture, _ = make_capture([
+        [response_received("1"), loading_finished("1")],
+        [response_received("2"), loading_finished("2")],
+    ], bodies)
+    assert len(capture.drain()) == 2
+    assert [i["url"][-1] for i in capture.drain()] == ["c"]
+
+
+def test_capture_cuerpo_invalido_cuenta_error():
+    capture, _ = make_capture([[response_received("1"), loading_finished("1")]], {"1": {"body": "<html>"}})
+    assert capture.drain() == []
+    assert capture.errors == 1
+
+
+def test_start_sin_log_de_rendimiento_devuelve_none():
+    driver = MagicMock()
+    driver.get_log.side_effect = Exception("log type 'performance' not found")
+    assert SearchApiCapture.start(driver) is None
+
+
+def test_discard_performance_log_ignora_errores():
+    driver = MagicMock()
+    driver.get_log.side_effect = Exception("sin log")
+    discard_performance_log(driver)
@@ -0,0 +1,124 @@
+import pytest
+import requests
+from unittest.mock import MagicMock
+
+from src.config import Config
+from src.rate_limiter import RateLimiter
+from src.search_client import SearchApiClient
+
+
+def make_client(server, **kwargs):
+    kwargs.setdefault("rate_limiter", RateLimiter(rate=10_000, burst=10_000))
+    return SearchApiClient(api_url=server.url, timeout=5, **kwargs)
+
+
+# ── Paginación ───────────────────────────────────────────────────────────────
+
+def test_open_pide_la_primera_pagina_con_los_filtros(search_api_server):
+    client = make_client(search_api_server)
+    client.open("korg", {"max_price": 500, "order_by": "newest"})
+    params = search_api_server.requests[0]["params"]
+    assert params["keywords"] == "korg"
+    assert params["max_sale_price"] == "500"
+    assert params["order_by"] == "newest"
+    client.close()
+
+
+def test_iter_item_batches_pagina_hasta_el_final(search_api_server):
+    client = make_client(search_api_server)
+    client.open("korg")
+    batches = list(client.iter_item_batches())
+    # El MS-20 sale en las dos páginas: solo se devuelve una vez
+    assert [len(b) for b in batches] == [3, 2]
+    assert search_api_server.requests[1]["params"] == {"next_page": "p2"}
+    client.close()
+
+
+def test_items_con_el_formato_del_listado(search_api_server):
+    client = make_client(search_api_server)
+    client.open("korg")
+    item = client.extract_items()[0]
+    assert item["url"] == "https://www.wallapop.com/item/korg-minilogue-xd-1001"
+    assert item["title"] == "Korg Minilogue XD"
+    assert item["price"] == 450.0
+    assert item["location"] == "Madrid"
+    assert item["description"] == "pending"
+    assert item["images"][0].endswith("W800.jpg")
+    client.close()
+
+
+def test_respeta_max_items_sin_pedir_mas_paginas(search_api_server):
+    client = make_client(search_api_server)
+    client.open("korg")
+    assert len(client.extract_items(max_items=2)) == 2
+    assert len(search_api_server.requests) == 1
+    client.close()
+
+
+def test_para_tras_racha_de_conocidos(search_api_server):
+    client = make_client(search_api_server)
+    client.open("korg")
+    known = {
+        "https://www.wallapop.com/item/korg-volca-keys-1002",
+        "https://www.wallapop.com/item/korg-ms-20-mini-1003",
+    }
+    items = client.extract_items(known_urls=known, stop_after_known=2)
+    assert len(items) == 3
+    assert len(search_api_server.requests) == 1
+    client.close()
+
+
+def test_respeta_max_pages(search_api_server):
+    client = make_client(search_api_server, max_pages=1)
+    client.open("korg")
+    assert len(client.extract_items()) == 3
+    client.close()
+
+
+# ── Sesión y errores ─────────────────────────────────────────────────────────
+
+def test_from_driver_usa_cookies_y_user_agent_del_navegador(search_api_server, mock_driver):
+    mock_driver.execute_script.return_value = "UA-navegador"
+    mock_driver.get_cookies.return_value = [{"name": "__cmpconsent", "value": "ok"}]
+    client = SearchApiClient.from_driver(
+        mock_driver, api_url=search_api_server.url, rate_limiter=RateLimiter(rate=10_000, burst=10_000)
+    )
+    client.open("korg")
+    headers = search_api_server.requests[0]["headers"]
+    assert headers["User-Agent"] == "UA-navegador"
+    assert "__cmpconsent=ok" in headers["Cookie"]
+    assert headers["X-DeviceOS"] == "0"
+    client.close()
+
+
+def test_origin_y_referer_salen_de_base_url(search_api_server, monkeypatch):
+    monkeypatch.setattr(Config, "BASE_URL", "https://www.wallapop.com/")
+    client = make_client(search_api_server)
+    client.open("korg")
+    headers = search_api_server.requests[0]["headers"]
+    assert headers["Origin"] == "https://www.wallapop.com"
+    assert headers["Referer"] == "https://www.wallapop.com/"
+    client.close()
+
+
+def test_open_bloqueado_lanza_y_frena_el_rate_limiter(search_api_server):
+    search_api_server.server.status = 429
+    limiter = MagicMock()
+    client = make_client(search_api_server, rate_limiter=limiter)
+    with pytest.raises(requests.HTTPError):
+        client.open("korg")
+    limiter.report_failure.assert_called_once_with(search_api_server.url, blocked=True)
+    client.close()
+
+
+def test_error_en_pagina_intermedia_corta_con_lo_ya_devuelto(search_api_server):
+    client = make_client(search_api_server)
+    client.open("korg")
+    search_api_server.server.status = 500
+    assert len(client.extract_items()) == 3
+    client.close()
+
+
+def test_iter_sin_open_lanza(search_api_server):
+    with pytest.raises(RuntimeError):
+        list(make_client(search_api_server).iter_item_batches())
@@ -0,0 +1,63 @@
+import pytest
+from src.search_filters import normalize_filters, search_params
+
+
+# ── normalize_filters ────────────────────────────────────────────────────────
+
+def test_sin_filtros_devuelve_dict_vacio():
+    assert normalize_filters(None) == {}
+    assert normalize_filters({}) == {}
+
+
+def test_filtros_validos_se_conservan():
+    filters = {
+        "min_price": 50, "max_price": 300.5, "order_by": "newest",
+        "latitude": 40.4, "longitude": -3.7, "distance_km": 25,
+        "condition": ["new", "good"],
+    }
+    assert normalize_filters(filters) == filters
+
+
+def test_condition_como_string():
+    assert normalize_filters({"condition": "new"}) == {"condition": ["new"]}
+
+
+@pytest.mark.parametrize("filters", [
+    {"max_precio": 10},
+    {"max_price": "barato"},
+    {"max_price": -1},
+    {"min_price": 200, "max_price": 100},
+    {"order_by": "oldest"},
+    {"latitude": 40.4},
+    {"distance_km": 10},
+    {"latitude": 100, "longitude": 0},
+    {"condition": ["nuevo"]},
+    "newest",
+])
+def test_filtros_invalidos_lanzan_value_error(filters):
+    with pytest.raises(ValueError):
+        normalize_filters(filters)
+
+
+# ── search_params ────────────────────────────────────────────────────────────
+
+def test_search_params_solo_query():
+    assert search_params("korg nano") == {"keywords": "korg nano"}
+
+
+def test_search_params_traduce_a_parametros_de_wallapop():
+    params = search_params("korg", {
+        "min_price": 10, "max_price": 100, "order_by": "newest",
+        "latitude": 40.4, "longitude": -3.7, "distance_km": 2.5,
+        "condition": ["new", "as_good_as_new"],
+    })
+    assert params == {
+        "keywords": "korg",
+        "min_sale_price": 10,
+        "max_sale_price": 100,
+        "order_by": "newest",
+        "latitude": 40.4,
+        "longitude": -3.7,
+        "distance": 2500,
+        "condition": "new,as_good_as_new",
+    }
@@ -1,5 +1,7 @@
+import itertools
 import pytest
 from unittest.mock import MagicMock, patch
+from src.config import Config
 from src.pages.search_results_page import SearchResultsPage
 
 
@@ -97,3 +99,301 @@ def test_extract_items_sin_precio_devuelve_no_disponible(mock_driver, search_res
     # El teclado mecánico no tiene precio en el fixture
     teclado = next(i for i in items if i["title"] == "Teclado mecánico")
     assert teclado["price"] == "No disponible"
+
+
+# ── _scroll_to_load_all ──────────────────────────────────────────────────────
+
+def make_scroll_page(mock_driver, counts):
+    """Página cuyo nº de cards va tomando los valores de `counts` en cada sondeo."""
+    remaining = list(counts)
+
+    def execute_script(script, *args):
+        if "length" in script:
+            return remaining.pop(0) if len(remaining) > 1 else remaining[0]
+        return None
+
+    mock_driver.execute_script.side_effect = execute_script
+    page = SearchResultsPage(mock_driver, timeout=1)
+    page.SCROLL_POLL = 0.001
+    page.SCROLL_IDLE_TIMEOUT = 0.01
+    page.SCROLL_IDLE_MAX = 0.04
+    return page
+
+
+def _scrolls(mock_driver):
+    return [c for c in mock_driver.execute_script.call_args_list if "scrollTo" in c.args[0]]
+
+
+def test_scroll_sigue_en_cuanto_aparecen_cards(mock_driver):
+    page = make_scroll_page(mock_driver, [10, 20, 30, 30])
+    page._scroll_to_load_all()
+    news = [s["new"] for s in page.scroll_stats]
+    assert news[:2] == [10, 10]
+    assert all(n == 0 for n in news[2:])
+
+
+def test_scroll_para_tras_max_retries_sin_novedades(mock_driver):
+    page = make_scroll_page(mock_driver, [10])
+    page._scroll_to_load_all()
+    assert len(_scrolls(mock_driver)) == page.MAX_SCROLL_RETRIES
+
+
+def test_scroll_espera_crece_exponencialmente(mock_driver):
+    page = make_scroll_page(mock_driver, [10])
+    page._scroll_to_load_all()
+    seconds = [s["seconds"] for s in page.scroll_stats]
+    assert seconds == sorted(seconds)
+    assert seconds[-1] >= 0.03
+
+
+def test_scroll_para_al_alcanzar_max_items(mock_driver):
+    page = make_scroll_page(mock_driver, [10, 25, 40])
+    page._scroll_to_load_all(max_items=20)
+    assert len(_scrolls(mock_driver)) == 1
+
+
+def test_scroll_no_duerme_si_las_cards_llegan_rapido(mock_driver, mocker):
+    mock_sleep = mocker.patch("time.sleep")
+    page = make_scroll_page(mock_driver, [10, 20, 30])
+    page._scroll_to_load_all(max_items=30)
+    mock_sleep.assert_not_called()
+
+
+# ── Parada temprana con items conocidos ──────────────────────────────────────
+
+def make_known_page(mock_driver, batches):
+    """Cada scroll añade un lote de hrefs; el DOM acumula todos los cargados."""
+    dom = list(batches[0])
+    pending = [list(b) for b in batches[1:]]
+
+    def execute_script(script, *args):
+        if "scrollTo" in script and pending:
+            dom.extend(pending.pop(0))
+        elif "getAttribute" in script:
+            return dom[args[1]:]
+        elif "length" in script:
+            return len(dom)
+        return None
+
+    mock_driver.execute_script.side_effect = execute_script
+    page = SearchResultsPage(mock_driver, timeout=1)
+    page.SCROLL_POLL = 0.001
+    page.SCROLL_IDLE_TIMEOUT = 0.01
+    page.SCROLL_IDLE_MAX = 0.02
+    return page
+
+
+def _hrefs(prefix, n):
+    return [f"/item/{prefix}{i}" for i in range(n)]
+
+
+def _known(prefix, n):
+    return {f"https://www.wallapop.com/item/{prefix}{i}" for i in range(n)}
+
+
+def test_scroll_para_tras_racha_de_conocidos(mock_driver):
+    page = make_known_page(mock_driver, [_hrefs("new", 5), _hrefs("old", 5), _hrefs("older", 5)])
+    page._scroll_to_load_all(known_urls=_known("old", 5) | _known("older", 5), stop_after_known=3)
+    # Solo hizo falta un scroll: el segundo lote ya eran todo conocidos
+    assert len(_scrolls(mock_driver)) == 1
+
+
+def test_scroll_conocido_aislado_no_para(mock_driver):
+    # Un conocido entre nuevos (p.ej. destacado) resetea la racha
+    first = ["/item/old0"] + _hrefs("new", 4)
+    page = make_known_page(mock_driver, [first, _hrefs("new2", 5)])
+    page._scroll_to_load_all(known_urls=_known("old", 1), stop_after_known=2)
+    assert len(_scrolls(mock_driver)) > 1
+
+
+def test_scroll_sin_known_urls_ignora_parada(mock_driver):
+    page = make_known_page(mock_driver, [_hrefs("old", 5)])
+    page._scroll_to_load_all(known_urls=None, stop_after_known=1)
+    assert len(_scrolls(mock_driver)) == page.MAX_SCROLL_RETRIES
+
+
+def test_sort_by_newest_anade_order_by(mock_driver):
+    mock_driver.current_url = "https://www.wallapop.com/app/search?keywords=korg"
+    page = SearchResultsPage(mock_driver, timeout=1)
+    page.wait_until_ready = MagicMock(return_value=True)
+    page.sort_by_newest()
+    url = mock_driver.get.call_args.args[0]
+    assert "keywords=korg" in url
+    assert "order_by=newest" in url
+    # Espera a dejar la página sin ordenar, que seguía cargada
+    page.wait_until_ready.assert_called_once_with("https://www.wallapop.com/app/search?keywords=korg")
+
+
+def test_sort_by_newest_no_recarga_si_ya_ordenado(mock_driver):
+    mock_driver.current_url = "https://www.wallapop.com/app/search?keywords=korg&order_by=newest"
+    page = SearchResultsPage(mock_driver, timeout=1)
+    page.sort_by_newest()
+    mock_driver.get.assert_not_called()
+
+
+def test_build_url_con_filtros():
+    url = SearchResultsPage.build_url("korg nano", {"max_price": 100, "order_by": "newest"})
+    assert url.startswith("https://www.wallapop.com/app/search?")
+    assert "keywords=korg+nano" in url
+    assert "max_sale_price=100" in url
+    assert "order_by=newest" in url
+
+
+def test_build_url_sale_de_config(monkeypatch):
+    monkeypatch.setattr(Config, "BASE_URL", "https://es.wallapop.com/")
+    monkeypatch.setattr(Config, "SEARCH_PATH", "/search")
+    assert SearchResultsPage.build_url("korg").startswith("https://es.wallapop.com/search?")
+    page = SearchResultsPage(MagicMock(), timeout=1)
+    assert page._absolute_url("/item/korg-1") == "https://es.wallapop.com/item/korg-1"
+
+
+def test_open_navega_directo_a_resultados(mock_driver):
+    mock_driver.current_url = "https://www.wallapop.com/"
+    page = SearchResultsPage(mock_driver, timeout=1)
+    page.wait_until_ready = MagicMock(return_value=True)
+    page.open("korg", {"min_price": 20})
+    url = mock_driver.get.call_args.args[0]
+    assert "min_sale_price=20" in url
+    # Se espera a dejar la página anterior, aunque el sitio reescriba filtros
+    page.wait_until_ready.assert_called_once_with("https://www.wallapop.com/")
+
+
+def test_apply_filters_recarga_la_busqueda_abierta(mock_driver):
+    mock_driver.current_url = "https://www.wallapop.com/app/search?keywords=korg"
+    page = SearchResultsPage(mock_driver, timeout=1)
+    page.wait_until_ready = MagicMock(return_value=True)
+    page.apply_filters("korg", {"max_price": 100})
+    url = mock_driver.get.call_args.args[0]
+    assert "keywords=korg" in url
+    assert "max_sale_price=100" in url
+
+
+def test_apply_filters_sin_filtros_no_recarga(mock_driver):
+    mock_driver.current_url = "https://www.wallapop.com/app/search?keywords=korg"
+    page = SearchResultsPage(mock_driver, timeout=1)
+    page.apply_filters("korg", {})
+    mock_driver.get.assert_not_called()
+
+
+# ── iter_item_batches ────────────────────────────────────────────────────────
+
+def make_card_page(mock_driver, batches):
+    """Como make_known_page, pero el snippet de cards devuelve sus datos."""
+    page = make_known_page(mock_driver, batches)
+    known_side_effect = mock_driver.execute_script.side_effect
+
+    def execute_script(script, *args):
+        if "patterns" in script:
+            hrefs = known_side_effect("getAttribute", *args[:2])
+            return [{"href": h, "title": f"T {h}", "price": "10 €", "location": None} for h in hrefs]
+        return known_side_effect(script, *args)
+
+    mock_driver.execute_script.side_effect = execute_script
+    page.wait_for_all_elements = MagicMock(return_value=[])
+    return page
+
+
+def test_iter_item_batches_un_lote_por_scroll(mock_driver):
+    page = make_card_page(mock_driver, [_hrefs("a", 3), _hrefs("b", 2)])
+    batches = list(page.iter_item_batches())
+    assert [len(b) for b in batches] == [3, 2]
+    assert batches[1][0]["url"] == "https://www.wallapop.com/item/b0"
+
+
+def test_iter_item_batches_formato_de_item(mock_driver):
+    page = make_card_page(mock_driver, [_hrefs("a", 1)])
+    item = next(page.iter_items())
+    assert item["title"] == "T /item/a0"
+    assert item["price"] == "10 €"
+    assert item["location"] == "pending"
+    assert item["description"] == "pending"
+
+
+def test_iter_item_batches_respeta_max_items(mock_driver):
+    page = make_card_page(mock_driver, [_hrefs("a", 3), _hrefs("b", 3), _hrefs("c", 3)])
+    items = list(page.iter_items(max_items=4))
+    assert len(items) == 4
+    # Con el 2º lote ya hay suficientes: no se sigue haciendo scroll
+    assert len(_scrolls(mock_driver)) == 1
+
+
+def test_iter_item_batches_sin_duplicados(mock_driver):
+    page = make_card_page(mock_driver, [["/item/x", "/item/x", "/item/y"]])
+    urls = [i["url"] for i in page.iter_items()]
+    assert urls == ["https://www.wallapop.com/item/x", "https://www.wallapop.com/item/y"]
+
+
+def test_iter_item_batches_no_usa_page_source(mock_driver):
+    page = make_card_page(mock_driver, [_hrefs("a", 2)])
+    page.get_soup = MagicMock()
+    list(page.iter_items())
+    page.get_soup.assert_not_called()
+
+
+# ── Captura acotada ──────────────────────────────────────────────────────────
+
+def test_extract_items_con_captura_de_solo_los_cards(mock_driver, search_results_html):
+    full = make_page(mock_driver, search_results_html).extract_items()
+
+    # El JS devuelve solo el outerHTML de los cards, sin el resto del DOM
+    from src.parsing import parse_html, find_all
+    cards = find_all(parse_html(search_results_html, "html.parser"), "a", href=SearchResultsPage.CARD_HREF_RE)
+    mock_driver.execute_script.return_value = "<html><body>" + "".join(str(c) for c in cards) + "</body></html>"
+    mock_driver.page_source = "<html></html>"
+    page = make_page(mock_driver)
+    assert page.extract_items() == full
+
+
+# ── Listado desde la API de búsqueda ─────────────────────────────────────────
+
+def _api_items(prefix, n):
+    return [{"url": f"https://www.wallapop.com/item/{prefix}{i}", "title": "API", "price": 10.0,
+             "location": "Madrid", "description": "pending"} for i in range(n)]
+
+
+def _api_capture(*responses):
+    """Captura falsa: cada drain() devuelve la siguiente respuesta y luego nada."""
+    capture = MagicMock()
+    capture.drain.side_effect = itertools.chain(responses, itertools.repeat([]))
+    return capture
+
+
+def test_iter_item_batches_usa_items_de_la_api(mock_driver):
+    page = make_card_page(mock_driver, [_hrefs("a", 2), _hrefs("b", 2)])
+    page.api_capture = _api_capture(_api_items("a", 2), _api_items("b", 2))
+    items = list(page.iter_items())
+    assert [i["title"] for i in items] == ["API"] * 4
+    assert not any("patterns" in c.args[0] for c in mock_driver.execute_script.call_args_list)
+
+
+def test_iter_item_batches_sin_captura_lee_el_dom(mock_driver):
+    # Primera página renderizada en servidor: la API solo da la segunda
+    page = make_card_page(mock_driver, [_hrefs("a", 2), _hrefs("b", 2)])
+    page.api_capture = _api_capture([], _api_items("b", 2))
+    items = list(page.iter_items())
+    assert [i["title"] for i in items] == ["T /item/a0", "T /item/a1", "API", "API"]
+
+
+def test_iter_item_batches_lote_de_la_api_no_desplaza_los_cards(mock_driver):
+    # La API trae 3 items con 2 cards en el DOM: los siguientes cards se leen desde el 2
+    page = make_card_page(mock_driver, [_hrefs("a", 2), _hrefs("b", 2)])
+    page.api_capture = _api_capture(_api_items("x", 3))
+    items = list(page.iter_items())
+    assert [i["url"].rsplit("/", 1)[1] for i in items] == ["x0", "x1", "x2", "b0", "b1"]
+
+
+def test_iter_item_batches_lee_la_api_aunque_no_crezca_el_dom(mock_driver):
+    # La respuesta de la API llega en un scroll en el que no aparecen cards nuevos
+    page = make_card_page(mock_driver, [_hrefs("a", 2)])
+    page.api_capture = _api_capture(_api_items("a", 2), [], _api_items("b", 2))
+    items = list(page.iter_items())
+    assert [i["url"].rsplit("/", 1)[1] for i in items] == ["a0", "a1", "b0", "b1"]
+
+
+def test_apply_params_descarta_respuestas_anteriores(mock_driver):
+    mock_driver.current_url = "https://www.wallapop.com/app/search?keywords=korg"
+    page = SearchResultsPage(mock_driver, timeout=1)
+    page.wait_until_ready = MagicMock()
+    page.api_capture = MagicMock()
+    page.sort_by_newest()
+    page.api_capture.reset.assert_called_once()
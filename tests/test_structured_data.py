@@ -0,0 +1,59 @@
+import pytest
+from bs4 import BeautifulSoup
+from src.structured_data import extract_structured, format_price
+
+
+def parse(html):
+    return BeautifulSoup(html, "html.parser")
+
+
+# ── format_price ─────────────────────────────────────────────────────────────
+
+@pytest.mark.parametrize("amount,currency,expected", [
+    (45, "EUR", "45€"),
+    (1200, "EUR", "1.200€"),
+    (12.5, "EUR", "12,50€"),
+    ("1234.5", None, "1.234,50€"),
+    (10, "USD", "10 USD"),
+])
+def test_format_price(amount, currency, expected):
+    assert format_price(amount, currency) == expected
+
+
+def test_format_price_invalido_devuelve_none():
+    assert format_price("gratis") is None
+
+
+# ── extract_structured ───────────────────────────────────────────────────────
+
+def test_json_ld_product_en_graph(item_detail_jsonld_html):
+    found = extract_structured(parse(item_detail_jsonld_html))
+    assert found["title"] == ("Roland TR-8S caja de ritmos", "json-ld")
+    assert found["price"] == ("1.200€", "json-ld")
+    assert found["location"] == ("Barcelona", "json-ld")
+    # Espacios y saltos de línea normalizados
+    assert found["description"][0] == "Caja de ritmos en perfecto estado, con caja original y fuente."
+
+
+def test_estado_de_la_app_ignora_bloque_seo(item_detail_state_html):
+    found = extract_structured(parse(item_detail_state_html))
+    assert found["title"] == ("Elektron Digitakt", "app-state")
+    assert found["price"] == ("549,50€", "app-state")
+    assert found["location"] == ("Sevilla", "app-state")
+    assert found["description"] == ("Sampler con bolsa.", "app-state")
+
+
+def test_meta_og_como_ultima_fuente():
+    html = '<meta property="og:title" content="Titulo og"><meta property="og:description" content="Resumen">'
+    found = extract_structured(parse(html))
+    assert found == {"title": ("Titulo og", "og"), "description": ("Resumen", "og")}
+
+
+def test_json_ld_invalido_no_rompe():
+    html = '<script type="application/ld+json">{roto</script><meta property="og:title" content="T">'
+    assert extract_structured(parse(html)) == {"title": ("T", "og")}
+
+
+def test_pagina_sin_datos_estructurados(item_detail_html):
+    found = extract_structured(parse(item_detail_html))
+    assert "price" not in found